@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import dataset
+from src.config import ANALYSIS_COLUMNS
+from src.data_loader import load_data, clear_cache, sidecar_path, load_geoip
+from src.data_cleaner import clean_data, add_time_columns
+from src.geoip import add_country_columns
+from src.filter_engine import FilterIndex
+from src.ip_utils import cidr_range
+from src.cube import TrafficCube
+from src.moments import MomentCube
+from src.sketches import SketchCube
+from src.timeseries import TimeSeriesEngine
+from src.heavy_hitters import TalkerSketches
+from src.anomaly_detector import detect
+from src.ddos_detector import detect_ddos
+from src.baseline import ServiceBaseline
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# Розміри вхідних даних; великі запускаються явно: --sizes 10m 50m
+SIZES = {'23k': 23_000, '1m': 1_000_000, '10m': 10_000_000, '50m': 50_000_000}
+DEFAULT_SIZES = ['23k', '1m']
+# Понад стільки рядків генератор пише шарди паралельно, потім вони зшиваються в один CSV
+SHARD_ROWS = 5_000_000
+# Фіксований початок часу: однаковий seed дає байт-у-байт той самий файл
+BASE_TIME = datetime(2026, 1, 1)
+DEFAULT_THRESHOLD = 0.2
+# Етапи коротші за це не порівнюються за часом: для них шум таймера більший за будь-яку зміну
+MIN_COMPARED_SECONDS = 0.01
+
+
+def _concat_csv(parts, output):
+    # Шарди мають однаковий заголовок - лишаємо лише перший
+    with open(output, 'wb') as out:
+        for i, part in enumerate(parts):
+            with open(part, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out, 16 * 1024 * 1024)
+
+
+def input_path(rows, seed, data_dir):
+    return os.path.join(data_dir, f"traffic-{rows}-{seed}.csv")
+
+
+def generate_input(rows, seed, data_dir, workers=None):
+    # Той самий генератор і розподіли, що й dataset.py; вхід кешується між запусками
+    path = input_path(rows, seed, data_dir)
+    shards = max(1, -(-rows // SHARD_ROWS))
+    results = dataset.generate_sharded(rows, seed, shards, path, 'csv', workers, BASE_TIME)
+    if shards > 1:
+        parts = [part for part, _ in results]
+        _concat_csv(parts, path)
+        shutil.rmtree(os.path.dirname(parts[0]))
+    return path
+
+
+def _stages(path, rows, seed, data_dir, workers, generate):
+    """Етапи у порядку конвеєра панелі; кожен отримує стан попередніх і повертає свої результати."""
+
+    def load_csv(state):
+        clear_cache()
+        if os.path.exists(sidecar_path(path)):
+            os.remove(sidecar_path(path))
+        return {'raw': load_data(path)}
+
+    def load_binary(state):
+        clear_cache()
+        return {'raw': load_data(path)}
+
+    def clean(state):
+        df = clean_data(state['raw'], ANALYSIS_COLUMNS)
+        return {'df': add_country_columns(add_time_columns(df), load_geoip())}
+
+    def filter_index(state):
+        return {'index': FilterIndex(state['df'])}
+
+    def filter_select(state):
+        index, df = state['index'], state['df']
+        start, end = index.time_bounds() or (None, None)
+        queries = [{'equals': {'proto': 'TCP'}},
+                   {'equals': {'proto': 'TCP', 'service': 'http'}},
+                   {'subnets': {'dst_ip': cidr_range('10.0.0.0/8')}}]
+        if start is not None:
+            queries.append({'time_range': (start + (end - start) * 0.45, start + (end - start) * 0.55)})
+        return {'selections': [index.select(**query) for query in queries]}
+
+    def cube(state):
+        return {'cube': TrafficCube.build(state['df'])}
+
+    def cube_queries(state):
+        cube = state['cube']
+        return {'rollups': [cube.rollup(['proto']), cube.rollup(['hour', 'day_of_week']),
+                            cube.rollup(['service'], {'proto': 'TCP'})]}
+
+    def moments(state):
+        moments = MomentCube.build(state['df'], ANALYSIS_COLUMNS)
+        return {'moments': moments, 'corr': moments.correlation({'proto': 'TCP'})}
+
+    def sketches(state):
+        sketches = SketchCube.build(state['df'], ANALYSIS_COLUMNS)
+        return {'sketches': sketches, 'dur': sketches.sketches('dur', 'proto')}
+
+    def timeseries(state):
+        engine = TimeSeriesEngine(state['df'])
+        return {'series': [engine.series(resolution) for resolution in ('5min', '1h')]}
+
+    def talkers(state):
+        return {'talkers': TalkerSketches.build(state['df'])}
+
+    def rules(state):
+        return {'mask': detect(state['df'])}
+
+    def ddos(state):
+        return {'ddos': detect_ddos(state['df'])}
+
+    def baseline(state):
+        model = ServiceBaseline().update(state['df'])
+        return {'scores': model.score(state['df'])}
+
+    stages = [('load_csv', load_csv), ('load_binary', load_binary), ('clean', clean),
+              ('filter_index', filter_index), ('filter_select', filter_select),
+              ('cube', cube), ('cube_queries', cube_queries), ('moments', moments),
+              ('sketches', sketches), ('timeseries', timeseries), ('talkers', talkers),
+              ('rules', rules), ('ddos', ddos), ('baseline', baseline)]
+    if generate:
+        stages.insert(0, ('generate', lambda state: {'path': generate_input(rows, seed, data_dir, workers)}))
+    return stages
+
+
+def _max_rss_bytes():
+    # ru_maxrss - кілобайти в Linux, байти в macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def run_stage(fn, state, repeat, memory):
+    """Мінімальний час із repeat запусків без трасування і, за потреби, пік пам'яті окремим запуском.
+
+    tracemalloc бачить виділення numpy і Python, але не пули Arrow, тому поруч записується
+    ще й максимальний RSS процесу (монотонний, тож корисний для найбільшого етапу).
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(state)
+        timings.append(time.perf_counter() - started)
+    record = {'seconds': min(timings)}
+    if memory:
+        tracemalloc.start()
+        fn(state)
+        record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    record['max_rss_bytes'] = _max_rss_bytes()
+    state.update(result)
+    return record
+
+
+def run_size(label, rows, seed, data_dir, repeat, memory, workers, stages_filter=None):
+    path = input_path(rows, seed, data_dir)
+    generate = not os.path.exists(path) or (stages_filter is not None and 'generate' in stages_filter)
+    results = {}
+    state = {}
+    for name, fn in _stages(path, rows, seed, data_dir, workers, generate):
+        # Етапи, яких немає у фільтрі, все одно виконуються (від них залежать наступні), але не записуються
+        record = run_stage(fn, state, 1 if name == 'generate' else repeat,
+                           memory and name != 'generate')
+        if stages_filter is None or name in stages_filter:
+            results[name] = record
+            print(f"  {label:>4} {name:<14} {record['seconds']:9.3f} s"
+                  + (f" {record['peak_bytes'] / 2**20:10.1f} MiB" if 'peak_bytes' in record else ''))
+    results['rows'] = len(state['df']) if 'df' in state else rows
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=BENCH_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold, min_seconds=MIN_COMPARED_SECONDS):
+    """Регресії: етапи, що стали повільнішими (або вимагають більше пам'яті) понад threshold."""
+    regressions = []
+    for label, stages in current['results'].items():
+        for stage, record in stages.items():
+            base = baseline.get('results', {}).get(label, {}).get(stage)
+            if not isinstance(record, dict) or not isinstance(base, dict):
+                continue
+            for metric in ('seconds', 'peak_bytes'):
+                if metric not in record or not base.get(metric):
+                    continue
+                if metric == 'seconds' and max(record[metric], base[metric]) < min_seconds:
+                    continue
+                change = record[metric] / base[metric] - 1
+                if change > threshold:
+                    regressions.append({'size': label, 'stage': stage, 'metric': metric,
+                                        'baseline': base[metric], 'current': record[metric],
+                                        'change': change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки етапів конвеєра панелі на синтетичних даних")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=DEFAULT_SIZES)
+    parser.add_argument('--stages', nargs='+', default=None, help="записувати лише ці етапи")
+    parser.add_argument('--seed', type=int, default=dataset.SEED)
+    parser.add_argument('--repeat', type=int, default=1, help="запусків на етап для часу (береться мінімум)")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="не вимірювати пік пам'яті (окремий запуск кожного етапу під tracemalloc)")
+    parser.add_argument('--workers', type=int, default=None, help="процесів для генерації шардів")
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'),
+                        help="каталог для згенерованих вхідних файлів (кешуються між запусками)")
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'latest.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'),
+                        help="результати для порівняння (якщо файл існує)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="допустиме погіршення, частка (0.2 = 20%%)")
+    parser.add_argument('--min-seconds', type=float, default=MIN_COMPARED_SECONDS,
+                        help="коротші етапи не порівнюються за часом")
+    parser.add_argument('--save-baseline', action='store_true', help="записати результати як нову базу")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    current = {'environment': environment(),
+               'settings': {'seed': args.seed, 'repeat': args.repeat, 'memory': args.memory},
+               'results': {}}
+    for label in args.sizes:
+        current['results'][label] = run_size(label, SIZES[label], args.seed, args.data_dir, args.repeat,
+                                             args.memory, args.workers, args.stages)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=1)
+    print(f"Results: {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold, args.min_seconds)
+    for r in regressions:
+        print(f"REGRESSION {r['size']} {r['stage']} {r['metric']}: "
+              f"{r['baseline']:.4g} -> {r['current']:.4g} (+{r['change']:.0%})")
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,59 +4,290 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from src.data_loader import load_dataset
-from src.data_cleaner import clean_data
-import ipaddress
+from src.data_loader import (load_clean_dataset, dataset_path, dataset_fingerprint, geoip_fingerprint,
+                             cached_derived, cached_view)
+from src.filter_engine import FilterIndex
+from src.cube import TrafficCube, measure_mean
+from src.moments import MomentCube
+from src.sketches import SketchCube, QuantileSketch
+from src.config import COUNTRY_METRICS, BASELINE_Z_THRESHOLD, ANALYSIS_COLUMNS
+from src.live_tail import LiveTail
+from src.timeseries import TimeSeriesEngine, RESOLUTIONS
+from src.anomaly_detector import detect, type_labels, rule_counts
+from src.ddos_detector import detect_ddos, StreamingDDoSDetector
+from src.baseline import ServiceBaseline
+from src.render import histogram_figure, box_figure, box_trace, scatter_figure
+from src.ip_utils import cidr_range, ints_to_ips
+from src.heavy_hitters import TalkerSketches
+from src.geoip import country_iso3
+from src.batch_runner import load_artifact
+from src.profiling import Profiler, span, export
 
 # Визначаємо колонки з числовими даними для аналізу
-NUMERIC_COLUMNS = ['dur', 'spkts', 'dpkts', 'sbytes', 'dbytes', 'rate', 
-                   'sttl', 'dttl', 'sload', 'dload', 'sloss', 'dloss',
-                   'sinpkt', 'dinpkt', 'sjit', 'djit', 'tcprtt', 'synack', 'ackdat']
+NUMERIC_COLUMNS = ANALYSIS_COLUMNS
+
+DAYS = ['Понеділок', 'Вівторок', 'Середа', 'Четвер', "П'ятниця", 'Субота', 'Неділя']
+
+
+def with_readable_ips(df):
+    # IP зберігаються як uint32; для таблиць повертаємо звичний запис
+    converted = {col: ints_to_ips(df[col].to_numpy()) for col in ('src_ip', 'dst_ip')
+                 if col in df.columns and df[col].dtype == np.uint32}
+    return df.assign(**converted) if converted else df
+
+
+def plotly_chart(fig, **kwargs):
+    # Серіалізація фігури в JSON відбувається тут, тож її час - окремий етап
+    with span('plotly_chart'):
+        st.plotly_chart(fig, **kwargs)
+
+
+def prebuilt(source_path, name, build):
+    # Артефакт пакетного запуску (python -m src.batch_runner) для цієї версії файлу, інакше побудова
+    artifact = load_artifact(source_path, name, NUMERIC_COLUMNS)
+    return artifact if artifact is not None else build()
+
+
+class ViewContext:
+    """Стан, спільний для всіх розділів панелі на одному перезапуску.
+
+    Відфільтровані рядки матеріалізуються лише тоді, коли їх справді потребує активний розділ,
+    а результати розділів кешуються за (версія датасету, стан фільтрів, параметри розділу).
+    """
+
+    def __init__(self, df, fingerprint, filter_index, cube, equals, time_range, subnets=None,
+                 source_path=None):
+        self.df = df
+        self.fingerprint = fingerprint
+        self.source_path = source_path
+        self.filter_index = filter_index
+        self.cube = cube
+        self.equals = equals
+        self.time_range = time_range
+        self.subnets = subnets or {}
+        self.filter_key = (tuple(sorted(equals.items())), time_range, tuple(sorted(self.subnets.items())))
+        self._filtered_df = None
+
+    @property
+    def selected_rows(self):
+        # Номери рядків, що проходять фільтри, або None, якщо фільтрів немає
+        def build():
+            with span('filter_select', rows_in=len(self.df)) as s:
+                rows = self.filter_index.select(self.equals, self.time_range, self.subnets)
+                s.rows_out = len(self.df) if rows is None else len(rows)
+            return rows
+        return self.cached('selection', (), build)
+
+    @property
+    def filtered_df(self):
+        if self._filtered_df is None:
+            with span('filter_take', rows_in=len(self.df)) as s:
+                self._filtered_df = self.filter_index.take(self.df, self.selected_rows)
+                s.rows_out = len(self._filtered_df)
+        return self._filtered_df
+
+    def timeseries(self):
+        return cached_derived(self.fingerprint, 'timeseries', lambda: TimeSeriesEngine(self.df))
+
+    def sketch_cube(self):
+        # Скетчі всього датасету, без урахування фільтрів
+        return cached_derived(self.fingerprint, 'sketches', lambda: prebuilt(
+            self.source_path, 'sketches', lambda: SketchCube.build(self.df, NUMERIC_COLUMNS)))
+
+    def sketches(self, column, by=None):
+        # Квантильні скетчі колонки для поточних фільтрів, {значення by: скетч}
+        def build():
+            cube, equals, time_range = self.aggregate(
+                'sketches', lambda df: SketchCube.build(df, NUMERIC_COLUMNS))
+            return cube.sketches(column, by, equals, time_range)
+        return self.cached('sketches', (column, by), build)
+
+    def talkers(self):
+        # Без фільтрів - скетчі, побудовані під час завантаження; з фільтрами - раз на стан фільтрів
+        if self.selected_rows is None:
+            return cached_derived(self.fingerprint, 'talkers', lambda: TalkerSketches.build(self.df))
+        return self.cached('talkers', (), lambda: TalkerSketches.build(self.filtered_df))
+
+    def aggregate(self, name, build):
+        """Попередньо агрегована структура і фільтри, які їй ще треба застосувати.
+
+        Куби не мають IP-вимірів, тож із фільтром підмережі структура будується з уже
+        відфільтрованих рядків (один раз на стан фільтрів) і фільтри до неї не застосовуються.
+        """
+        if self.subnets:
+            return self.cached(name, (), lambda: build(self.filtered_df)), None, None
+        structure = cached_derived(self.fingerprint, name,
+                                   lambda: prebuilt(self.source_path, name, lambda: build(self.df)))
+        return structure, self.equals, self.time_range
+
+    def rollup(self, by):
+        def build():
+            cube, equals, time_range = self.aggregate('cube', TrafficCube.build)
+            return cube.rollup(by, equals, time_range)
+        return self.cached('rollup', tuple(by), build)
+
+    def cached(self, view, params, builder):
+        return cached_view((self.fingerprint, self.filter_key, view, params), builder)
+
+
+def render_live_view(tail):
+    # Перерахунок лише за новими рядками; графіки будуються з агрегатів, а не з сирих даних
+    new_rows = tail.poll()
+    aggregates = tail.aggregates
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Кількість сесій", f"{aggregates.rows:,}", delta=f"+{new_rows:,}")
+    col2.metric("Загальний обсяг даних", f"{aggregates.hourly_bytes.sum():,.0f} байтів")
+    if aggregates.anomaly_counts is not None:
+        col3.metric("Аномальні з'єднання", f"{int(aggregates.anomaly_counts.get(1, 0)):,}")
+
+    if aggregates.rows == 0:
+        st.info("Очікування даних...")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.line(aggregates.hourly_traffic(), x='hour', y='sbytes',
+                      labels={'hour': 'Година доби', 'sbytes': 'Обсяг даних'},
+                      title="Розподіл трафіку за годинами доби")
+        plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = px.imshow(aggregates.day_hour_bytes,
+                        labels=dict(x="Година доби", y="День тижня", color="Обсяг даних"),
+                        y=DAYS, color_continuous_scale="Viridis")
+        plotly_chart(fig, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        proto_counts = aggregates.value_counts('proto')
+        fig = px.pie(values=proto_counts.values, names=proto_counts.index, title="Розподіл протоколів")
+        plotly_chart(fig, use_container_width=True)
+    with col2:
+        service_counts = aggregates.value_counts('service').head(10)
+        fig = px.bar(x=service_counts.index, y=service_counts.values,
+                     title="Топ-10 сервісів", labels={'x': 'Сервіс', 'y': 'Кількість'})
+        plotly_chart(fig, use_container_width=True)
+
+    if aggregates.country_flows['src_country'] is not None:
+        st.subheader("Трафік за країнами (джерело)")
+        country_traffic = aggregates.country_traffic('src_country')
+        st.dataframe(country_traffic.sort_values('total_bytes', ascending=False).rename(columns={
+            'src_country': 'Країна',
+            'count': 'Кількість з\'єднань',
+            'total_bytes': 'Загальний обсяг (байти)'
+        }))
+
+    if aggregates.anomaly_type_counts is not None:
+        st.subheader("Типи аномалій")
+        st.write(aggregates.anomaly_type_counts.astype('int64').sort_values(ascending=False))
+
+    talkers = tail.consumers['talkers']
+    if 'src_ip' in talkers.available():
+        st.subheader("Найактивніші джерела (байти)")
+        st.dataframe(with_readable_ips(talkers.top('src_ip', 'bytes', 10)).round(0))
+
+    alerts = tail.consumers['ddos'].alerts
+    if not alerts.empty:
+        st.subheader("Сповіщення DDoS (закриті вікна)")
+        st.dataframe(with_readable_ips(alerts.sort_values('window_start', ascending=False).head(50)))
+
+
+def run_live_mode():
+    live_path = st.sidebar.text_input("Файл або каталог захоплення:", value="data/stream")
+    refresh_seconds = st.sidebar.slider("Інтервал оновлення (с):", 1, 60, 5)
+
+    # Зміщення у файлах і накопичені агрегати живуть у сесії між оновленнями
+    tail = st.session_state.get('live_tail')
+    if tail is None or tail.path != live_path:
+        # Віконний детектор DDoS і скетчі найактивніших вузлів отримують ті самі порції, що й агрегати
+        tail = LiveTail(live_path, consumers={'ddos': StreamingDDoSDetector, 'talkers': TalkerSketches})
+        st.session_state['live_tail'] = tail
+
+    st.fragment(render_live_view, run_every=refresh_seconds)(tail)
+
+
+def render_profile_panel(profiler, show_profile):
+    st.sidebar.header("Налагодження")
+    st.sidebar.checkbox("Панель профілювання", key='profile_panel')
+    st.sidebar.checkbox("Вимірювати пам'ять (tracemalloc, повільніше)", key='profile_memory',
+                        disabled=not show_profile)
+    if not show_profile:
+        return
+    table = profiler.table()
+    # Вкладені етапи зсуваються відповідно до глибини
+    table['span'] = ['· ' * depth + name for depth, name in zip(table['depth'], table['span'])]
+    table['seconds'] = table['seconds'] * 1000
+    for col in ('allocated_bytes', 'peak_bytes'):
+        table[col] = table[col] / 2 ** 20
+    with st.sidebar.expander("Етапи перезапуску", expanded=True):
+        st.caption(f"Перезапуск #{profiler.run_id}: {table['seconds'].iloc[0]:,.0f} мс")
+        columns = {'span': 'Етап', 'seconds': 'мс', 'rows_in': 'Рядків на вході',
+                   'rows_out': 'Рядків на виході'}
+        if profiler.trace_memory:
+            columns.update({'allocated_bytes': 'Виділено, МіБ', 'peak_bytes': 'Пік, МіБ'})
+        st.dataframe(table[list(columns)].rename(columns=columns).round(2), hide_index=True)
+
 
 def main():
     st.set_page_config(layout="wide", page_title="Аналіз мережевого трафіку")
-    
+
+    # Прапорці панелі профілювання малюються внизу бокової панелі, але потрібні до початку замірів
+    show_profile = st.session_state.get('profile_panel', False)
+    profiler = Profiler(trace_memory=show_profile and st.session_state.get('profile_memory', False))
+    try:
+        with profiler.activate(), span('rerun'):
+            render_dashboard()
+    finally:
+        # Етапи пишуться в журнал і файл метрик незалежно від панелі
+        export(profiler)
+    render_profile_panel(profiler, show_profile)
+
+
+def render_dashboard():
     st.title("Інтерактивна панель аналізу мережевого трафіку")
-    
-    # Load and process data
-    with st.spinner("Завантаження даних..."):
-        df_real = load_dataset('real')
-        df_synthetic = load_dataset()
-        df = df_synthetic  
-        df = clean_data(df, NUMERIC_COLUMNS)
+
+    if st.sidebar.checkbox("Режим реального часу (відстеження файлу)"):
+        run_live_mode()
+        return
     
     dataset_option = st.sidebar.selectbox(
         "Оберіть набір даних:",
         options=["Синтетичні дані", "Реальні дані"]
     )
-    
-    if dataset_option == "Реальні дані":
-        df = df_real
-    else:
-        df = df_synthetic
-    
-    # Додамо обробку timestamp колонок
-    if 'start_time' in df.columns:
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df['hour'] = df['start_time'].dt.hour
-        df['date'] = df['start_time'].dt.date
+
+    # Load only the selected dataset; repeated reruns are served from the loader cache
+    dataset_type = 'real' if dataset_option == "Реальні дані" else 'synthetic'
+    with st.spinner("Завантаження даних..."):
+        with span('load_dataset') as s:
+            df = load_clean_dataset(dataset_type, NUMERIC_COLUMNS)
+            s.rows_out = len(df)
+        # Версія бази GeoIP теж входить у відбиток: від неї залежать колонки країн
+        fingerprint = (dataset_fingerprint(dataset_type), tuple(NUMERIC_COLUMNS), geoip_fingerprint())
+        with span('filter_index', rows_in=len(df)):
+            filter_index = cached_derived(fingerprint, 'filter_index', lambda: FilterIndex(df))
+        source_path = dataset_path(dataset_type)
+        with span('cube', rows_in=len(df)):
+            cube = cached_derived(fingerprint, 'cube',
+                                  lambda: prebuilt(source_path, 'cube', lambda: TrafficCube.build(df)))
     
     # Sidebar for filters
     st.sidebar.header("Фільтри")
     
-    protocols = ['Всі'] + sorted(df['proto'].unique().tolist())
+    protocols = ['Всі'] + sorted(filter_index.values('proto'))
     selected_protocol = st.sidebar.selectbox("Протокол:", protocols)
     
-    services = ['Всі'] + sorted(df['service'].unique().tolist())
+    services = ['Всі'] + sorted(filter_index.values('service'))
     selected_service = st.sidebar.selectbox("Сервіс:", services)
     
-    states = ['Всі'] + sorted(df['state'].unique().tolist())
+    states = ['Всі'] + sorted(filter_index.values('state'))
     selected_state = st.sidebar.selectbox("Стан:", states)
     
     # Filter by date range
-    if 'date' in df.columns:
-        date_min = df['date'].min()
-        date_max = df['date'].max()
+    time_range = None
+    time_bounds = filter_index.time_bounds() if filter_index.times is not None else None
+    if time_bounds is not None:
+        date_min = time_bounds[0].date()
+        date_max = time_bounds[1].date()
         selected_date_range = st.sidebar.date_input(
             "Діапазон дат:",
             value=(date_min, date_max),
@@ -67,11 +298,10 @@ def main():
         # Ensure we have both start and end dates
         if len(selected_date_range) == 2:
             start_date, end_date = selected_date_range
-            date_mask = (df['date'] >= start_date) & (df['date'] <= end_date)
         else:
-            date_mask = df['date'] == selected_date_range[0]
-    else:
-        date_mask = pd.Series(True, index=df.index)
+            start_date = end_date = selected_date_range[0]
+        # Включно з усім останнім днем
+        time_range = (pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1))
     
     # New filter specifically for anomalies
     st.sidebar.header("Фільтр аномалій")
@@ -82,417 +312,509 @@ def main():
     else:
         anomaly_filter = 'Всі дані'
     
-    # Apply filters to dataframe
-    filtered_df = df.copy()
+    # Фільтр за підмережею: двійковий пошук у відсортованих адресах замість порівняння рядків
+    subnets = {}
+    if filter_index.ip_indexes:
+        st.sidebar.header("Фільтр підмережі")
+        subnet_text = st.sidebar.text_input("Підмережа (CIDR), напр. 10.0.0.0/8:", value="")
+        subnet_direction = st.sidebar.radio("Адреса:", ["Призначення", "Джерело"], horizontal=True)
+        if subnet_text.strip():
+            ip_col = 'dst_ip' if subnet_direction == "Призначення" else 'src_ip'
+            try:
+                subnets[ip_col] = cidr_range(subnet_text)
+            except ValueError:
+                st.sidebar.error("Некоректна підмережа")
     
+    # Apply filters: one selection vector from the prebuilt index, one take() at the end
+    equals = {}
     if selected_protocol != 'Всі':
-        filtered_df = filtered_df[filtered_df['proto'] == selected_protocol]
-    
+        equals['proto'] = selected_protocol
     if selected_service != 'Всі':
-        filtered_df = filtered_df[filtered_df['service'] == selected_service]
-    
+        equals['service'] = selected_service
     if selected_state != 'Всі':
-        filtered_df = filtered_df[filtered_df['state'] == selected_state]
+        equals['state'] = selected_state
+    if anomaly_filter != 'Всі дані':
+        equals['anomaly'] = 0 if anomaly_filter == 'Тільки нормальні' else 1
     
-    # Apply date filter
-    filtered_df = filtered_df[date_mask]
+    # Повний діапазон дат не обмежує вибірку
+    if time_range is not None and (date_min, date_max) == (start_date, end_date):
+        time_range = None
     
-    # Apply anomaly filter
-    if 'anomaly' in filtered_df.columns and anomaly_filter != 'Всі дані':
-        if anomaly_filter == 'Тільки нормальні':
-            filtered_df = filtered_df[filtered_df['anomaly'] == 0]
-        else:  # 'Тільки аномалії'
-            filtered_df = filtered_df[filtered_df['anomaly'] == 1]
+    ctx = ViewContext(df, fingerprint, filter_index, cube, equals, time_range, subnets, source_path)
     
-    # Display basic statistics
+    # Display basic statistics (з куба, без звернення до сирих рядків)
     st.subheader("Основна статистика")
     col1, col2, col3, col4 = st.columns(4)
     
-    col1.metric("Кількість сесій", f"{len(filtered_df):,}")
-    col2.metric("Середня тривалість", f"{filtered_df['dur'].mean():.2f} с")
-    col3.metric("Загальний обсяг даних", f"{filtered_df['sbytes'].sum():,} байтів")
-    col4.metric("Найпоширеніший протокол", filtered_df['proto'].value_counts().index[0])
-    
-    # Create tabs for different visualizations
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Розподіли", "Кореляції", "Протоколи", 
-                                                      "Загальний огляд", "Часовий аналіз", 
-                                                      "Геовізуалізація", "Виявлення аномалій"])
-    
-    with tab1:
-        st.subheader("Розподіл числових показників")
-        column = st.selectbox("Оберіть показник:", options=NUMERIC_COLUMNS)
-        fig = px.histogram(filtered_df, x=column, nbins=50, marginal="box", 
-                           color='anomaly' if 'anomaly' in filtered_df.columns else None,
-                           color_discrete_map={0: 'blue', 1: 'red'})
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with tab2:
-        st.subheader("Кореляційна матриця")
-        corr = filtered_df[NUMERIC_COLUMNS].corr()
-        fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu_r")
-        st.plotly_chart(fig, use_container_width=True)
-        
-    with tab3:
-        st.subheader("Аналіз протоколів")
-        col1, col2 = st.columns(2)
+    with span('summary'):
+        proto_totals = ctx.rollup(['proto'])
+    session_count = int(proto_totals['count'].sum())
+    col1.metric("Кількість сесій", f"{session_count:,}")
+    col2.metric("Середня тривалість", f"{proto_totals['dur_sum'].sum() / max(proto_totals['dur_n'].sum(), 1):.2f} с")
+    col3.metric("Загальний обсяг даних", f"{proto_totals['sbytes_sum'].sum():,} байтів")
+    col4.metric("Найпоширеніший протокол",
+                proto_totals.loc[proto_totals['count'].idxmax(), 'proto'] if session_count else "-")
+    
+    # Лише активний розділ виконує обчислення; решта не рахується на цьому перезапуску
+    active_view = st.radio("Розділ:", options=list(VIEWS), horizontal=True)
+    with span(f"view:{active_view}"):
+        VIEWS[active_view](ctx)
+
+
+def render_distributions(ctx):
+    st.subheader("Розподіл числових показників")
+    column = st.selectbox("Оберіть показник:", options=NUMERIC_COLUMNS)
+
+    def build():
+        # Біни та коробки будуються з квантильних скетчів, сирі рядки не потрібні
+        if 'anomaly' in ctx.df.columns:
+            colors = {0: 'blue', 1: 'red'}
+            groups = [(str(key), sketch, colors.get(key))
+                      for key, sketch in ctx.sketches(column, 'anomaly').items()]
+        else:
+            groups = [(column, ctx.sketches(column)[None], None)]
+        fig = histogram_figure(groups, nbins=50, marginal_box=True)
+        fig.update_layout(legend_title_text='anomaly' if 'anomaly' in ctx.df.columns else None)
+        fig.update_xaxes(title_text=column, row=2, col=1)
+        fig.update_yaxes(title_text='count', row=2, col=1)
+        return fig
+
+    plotly_chart(ctx.cached('distributions', (column,), build), use_container_width=True)
+
+
+def render_correlations(ctx):
+    st.subheader("Кореляційна матриця")
+    # Кореляції збираються з попередньо підсумованих моментів комірок, без проходу по рядках
+    def build():
+        moments, equals, time_range = ctx.aggregate('moments', lambda df: MomentCube.build(df, NUMERIC_COLUMNS))
+        return moments.correlation(equals, time_range)
+    corr = ctx.cached('correlations', (), build)
+    fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu_r")
+    plotly_chart(fig, use_container_width=True)
+
+
+def render_protocols(ctx):
+    st.subheader("Аналіз протоколів")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        proto_counts = ctx.rollup(['proto']).set_index('proto')['count']
+        proto_counts = proto_counts.sort_values(ascending=False)
+        fig = px.pie(values=proto_counts.values, names=proto_counts.index, 
+                     title="Розподіл протоколів")
+        plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        service_counts = ctx.rollup(['service']).set_index('service')['count']
+        service_counts = service_counts.nlargest(10)
+        fig = px.bar(x=service_counts.index, y=service_counts.values, 
+                 title="Топ-10 сервісів", labels={'x': 'Сервіс', 'y': 'Кількість'})
+        plotly_chart(fig, use_container_width=True)
+
+
+def render_overview(ctx):
+    st.subheader("Загальний огляд трафіку")
+    
+    # Scatter plot of bytes vs packets
+    fig = ctx.cached('overview_scatter', (), lambda: scatter_figure(
+        ctx.filtered_df, x="spkts", y="sbytes", 
+        size="dur", color="proto", hover_name="service",
+        log_x=True, log_y=True, 
+        labels={"spkts": "Пакети", "sbytes": "Байти", "dur": "Тривалість"},
+        title="Співвідношення пакетів та байт за протоколами"))
+    plotly_chart(fig, use_container_width=True)
+    
+    # Boxplot of duration by protocol
+    fig = ctx.cached('overview_box', (), lambda: box_figure(
+        ctx.sketches('dur', 'proto').items(), x="proto", y="dur", 
+        labels={"proto": "Протокол", "dur": "Тривалість (с)"},
+        title="Розподіл тривалості з'єднань за протоколами"))
+    plotly_chart(fig, use_container_width=True)
+
+
+def render_time_analysis(ctx):
+    st.subheader("Часовий аналіз")
+    
+    if 'hour' in ctx.cube.dimensions:
+        # Hourly traffic volume
+        hourly_traffic = ctx.rollup(['hour']).sort_values('hour')
+        hourly_traffic = hourly_traffic[['hour', 'sbytes_sum']].rename(columns={'sbytes_sum': 'sbytes'})
+        fig = px.line(hourly_traffic, x='hour', y='sbytes', 
+                      labels={'hour': 'Година доби', 'sbytes': 'Обсяг даних'},
+                      title="Розподіл трафіку за годинами доби")
+        plotly_chart(fig, use_container_width=True)
         
-        with col1:
-            proto_counts = filtered_df['proto'].value_counts()
-            fig = px.pie(values=proto_counts.values, names=proto_counts.index, 
-                         title="Розподіл протоколів")
-            st.plotly_chart(fig, use_container_width=True)
+        # Трафік у часі з обраним кроком
+        resolution = st.radio("Крок часового ряду:", options=list(RESOLUTIONS), index=2, horizontal=True)
+        traffic = ctx.cached('traffic_over_time', (resolution,), lambda: ctx.timeseries().series(
+            resolution, measure='sbytes', rows=ctx.selected_rows))
+        fig = px.line(traffic.reset_index(), x='time', y='sbytes',
+                      labels={'time': 'Час', 'sbytes': 'Обсяг даних'},
+                      title=f"Обсяг трафіку в часі (крок {resolution})")
+        plotly_chart(fig, use_container_width=True)
         
-        with col2:
-            service_counts = filtered_df['service'].value_counts().head(10)
-            fig = px.bar(x=service_counts.index, y=service_counts.values, 
-                     title="Топ-10 сервісів", labels={'x': 'Сервіс', 'y': 'Кількість'})
-            st.plotly_chart(fig, use_container_width=True)
+        # Теплова карта навантаження за днями тижня і годинами
+        day_hour_traffic = cached_derived(ctx.fingerprint, 'day_hour', lambda: ctx.cube.rollup(['day_of_week', 'hour']))
+        day_hour_traffic = day_hour_traffic.sort_values(['day_of_week', 'hour'])
+        day_hour_pivot = day_hour_traffic.pivot(index='day_of_week', columns='hour', values='sbytes_sum')
         
-    with tab4:
-        st.subheader("Загальний огляд трафіку")
+        fig2 = px.imshow(day_hour_pivot, 
+                        labels=dict(x="Година доби", y="День тижня", color="Обсяг даних"),
+                        y=DAYS,
+                        color_continuous_scale="Viridis")
+        plotly_chart(fig2, use_container_width=True)
         
-        # Scatter plot of bytes vs packets
-        fig = px.scatter(filtered_df, x="spkts", y="sbytes", 
-                         size="dur", color="proto", hover_name="service",
-                         log_x=True, log_y=True, 
-                         labels={"spkts": "Пакети", "sbytes": "Байти", "dur": "Тривалість"},
-                         title="Співвідношення пакетів та байт за протоколами")
-        st.plotly_chart(fig, use_container_width=True)
+        # Визначення піків навантаження
+        peak_hours = hourly_traffic.nlargest(3, 'sbytes')
+        st.subheader("Пікові години навантаження")
+        st.write(f"Години з найбільшим трафіком: {', '.join(map(str, peak_hours['hour'].tolist()))}")
+
+
+def render_geography(ctx):
+    st.subheader("Географічна візуалізація трафіку")
+    
+    # Вибір напряму трафіку для аналізу
+    traffic_direction = st.radio(
+        "Напрямок трафіку:",
+        options=["Джерело", "Призначення"], 
+        horizontal=True
+    )
+    
+    country_col = 'src_country' if traffic_direction == "Джерело" else 'dst_country'
+    if country_col not in ctx.df.columns:
+        st.write("Колонки країн відсутні. Додайте локальну базу GeoIP (data/geoip.csv), "
+                 "щоб визначати країни за IP-адресами.")
+        return
+    
+    # Агрегація даних за країнами
+    country_cells = ctx.rollup([country_col])
+    country_traffic = pd.DataFrame({
+        country_col: country_cells[country_col],
+        'total_bytes': country_cells['sbytes_sum'],
+        'count': country_cells['count'],
+    })
+    
+    # Додаємо ISO коди для хороплету
+    country_traffic['iso_alpha'] = country_iso3(country_traffic[country_col]).to_numpy()
+    
+    # Створюємо хороплет
+    fig = px.choropleth(country_traffic, 
+                       locations="iso_alpha",
+                       color="total_bytes",
+                       hover_name=country_col,
+                       title=f"Розподіл трафіку за країнами ({traffic_direction.lower()})",
+                       color_continuous_scale=px.colors.sequential.Plasma)
+    
+    plotly_chart(fig, use_container_width=True)
+    
+    # Таблиця з детальною інформацією
+    st.subheader("Деталі трафіку за країнами")
+    country_traffic['total_mb'] = country_traffic['total_bytes'] / (1024 * 1024)
+    country_traffic = country_traffic.sort_values('total_bytes', ascending=False)
+    st.dataframe(
+        country_traffic.rename(columns={
+            country_col: 'Країна',
+            'count': 'Кількість з\'єднань',
+            'total_bytes': 'Загальний обсяг (байти)',
+            'total_mb': 'Загальний обсяг (МБ)'
+        }).round(2)
+    )
+    
+    # Додаємо аналіз характеристик трафіку за країнами
+    st.subheader("Характеристики трафіку за країнами")
+    
+    metrics_options = COUNTRY_METRICS
+    selected_metric = st.selectbox("Оберіть метрику для порівняння:", options=metrics_options)
+    
+    # Розрахунок середнього значення метрики за країнами
+    country_metrics = pd.DataFrame({
+        country_col: country_cells[country_col],
+        selected_metric: measure_mean(country_cells, selected_metric),
+    })
+    country_metrics = country_metrics.sort_values(selected_metric, ascending=False)
+    
+    # Горизонтальна діаграма для порівняння метрики за країнами
+    fig = px.bar(country_metrics, 
+                x=selected_metric, 
+                y=country_col,
+                orientation='h',
+                title=f"Середнє значення {selected_metric} за країнами",
+                labels={country_col: "Країна", selected_metric: f"Середнє значення {selected_metric}"})
+    
+    plotly_chart(fig, use_container_width=True)
+    
+    # Додаємо інтерактивну довідку про особливості трафіку різних країн
+    st.info("""
+    ### Особливості мережевого трафіку за країнами
+    - **Індія**: Вищий обсяг даних (на 80% більше байтів)
+    - **Китай**: Більша кількість пакетів
+    - **США**: Триваліші з'єднання
+    - **Бразилія**: Вища втрата пакетів
+    - **Європейські країни**: Нижчий джитер (затримка)
+    """)
+
+
+def render_anomalies(ctx):
+    df = ctx.df
+    st.subheader("Виявлення та аналіз аномалій")
+    
+    if 'anomaly' in df.columns:
+        # Display overview of anomalies
+        anomaly_counts = df['anomaly'].value_counts()
+        total_connections = len(df)
+        anomaly_percent = (anomaly_counts.get(1, 0) / total_connections) * 100 if total_connections > 0 else 0
         
-        # Boxplot of duration by protocol
-        fig = px.box(filtered_df, x="proto", y="dur", 
-                     color="proto", 
-                     labels={"proto": "Протокол", "dur": "Тривалість (с)"},
-                     title="Розподіл тривалості з'єднань за протоколами")
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with tab5:
-        st.subheader("Часовий аналіз")
+        st.write(f"### Загальна статистика аномалій")
+        st.write(f"Всього з'єднань: {total_connections}")
+        st.write(f"Нормальні з'єднання: {anomaly_counts.get(0, 0)} ({100 - anomaly_percent:.2f}%)")
+        st.write(f"Аномальні з'єднання: {anomaly_counts.get(1, 0)} ({anomaly_percent:.2f}%)")
         
-        if 'hour' in filtered_df.columns:
-            # Hourly traffic volume
-            hourly_traffic = filtered_df.groupby('hour')['sbytes'].sum().reset_index()
-            fig = px.line(hourly_traffic, x='hour', y='sbytes', 
-                          labels={'hour': 'Година доби', 'sbytes': 'Обсяг даних'},
-                          title="Розподіл трафіку за годинами доби")
-            st.plotly_chart(fig, use_container_width=True)
+        # Distribution of anomaly types
+        if 'anomaly_type' in df.columns and anomaly_counts.get(1, 0) > 0:
+            anomaly_types = df[df['anomaly'] == 1]['anomaly_type'].value_counts()
             
-            # Теплова карта навантаження за днями тижня і годинами
-            df['day_of_week'] = pd.to_datetime(df['start_time']).dt.dayofweek
-            day_hour_traffic = df.groupby(['day_of_week', 'hour'])['sbytes'].sum().reset_index()
-            day_hour_pivot = day_hour_traffic.pivot(index='day_of_week', columns='hour', values='sbytes')
+            fig = px.pie(
+                values=anomaly_types.values,
+                names=anomaly_types.index,
+                title="Розподіл типів аномалій"
+            )
+            plotly_chart(fig, use_container_width=True)
             
-            days = ['Понеділок', 'Вівторок', 'Середа', 'Четвер', "П'ятниця", 'Субота', 'Неділя']
-            fig2 = px.imshow(day_hour_pivot, 
-                            labels=dict(x="Година доби", y="День тижня", color="Обсяг даних"),
-                            y=days,
-                            color_continuous_scale="Viridis")
-            st.plotly_chart(fig2, use_container_width=True)
+            # Create detailed analysis by anomaly type
+            st.write("### Детальний аналіз аномалій за типами")
             
-            # Визначення піків навантаження
-            peak_hours = hourly_traffic.nlargest(3, 'sbytes')
-            st.subheader("Пікові години навантаження")
-            st.write(f"Години з найбільшим трафіком: {', '.join(map(str, peak_hours['hour'].tolist()))}")
-    
-    with tab6:
-        st.subheader("Географічна візуалізація трафіку")
-        
-        # Вибір напряму трафіку для аналізу
-        traffic_direction = st.radio(
-            "Напрямок трафіку:",
-            options=["Джерело", "Призначення"], 
-            horizontal=True
-        )
-        
-        # Словник для перетворення українських назв країн в ISO коди
-        country_iso_map = {
-            'Україна': 'UKR',
-            'США': 'USA',
-            'Німеччина': 'DEU',
-            'Польща': 'POL',
-            'Франція': 'FRA',
-            'Китай': 'CHN',
-            'Велика Британія': 'GBR',
-            'Канада': 'CAN',
-            # Додані країни
-            'Індія': 'IND',
-            'Японія': 'JPN',
-            'Австралія': 'AUS',
-            'Бразилія': 'BRA',
-            'Південна Корея': 'KOR',
-            'Італія': 'ITA',
-            'Іспанія': 'ESP',
-            'Нідерланди': 'NLD',
-            'Швеція': 'SWE',
-            'Сінгапур': 'SGP',
-            'Ізраїль': 'ISR',
-            'ОАЕ': 'ARE'
-        }
-        
-        country_col = 'src_country' if traffic_direction == "Джерело" else 'dst_country'
-        
-        # Агрегація даних за країнами
-        country_traffic = filtered_df.groupby(country_col).agg(
-            total_bytes=pd.NamedAgg(column='sbytes', aggfunc='sum'),
-            count=pd.NamedAgg(column='id', aggfunc='count')
-        ).reset_index()
-        
-        # Додаємо ISO коди для хороплету
-        country_traffic['iso_alpha'] = country_traffic[country_col].map(country_iso_map)
-        
-        # Створюємо хороплет
-        fig = px.choropleth(country_traffic, 
-                           locations="iso_alpha",
-                           color="total_bytes",
-                           hover_name=country_col,
-                           title=f"Розподіл трафіку за країнами ({traffic_direction.lower()})",
-                           color_continuous_scale=px.colors.sequential.Plasma)
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Таблиця з детальною інформацією
-        st.subheader("Деталі трафіку за країнами")
-        country_traffic['total_mb'] = country_traffic['total_bytes'] / (1024 * 1024)
-        country_traffic = country_traffic.sort_values('total_bytes', ascending=False)
-        st.dataframe(
-            country_traffic.rename(columns={
-                country_col: 'Країна',
-                'count': 'Кількість з\'єднань',
-                'total_bytes': 'Загальний обсяг (байти)',
-                'total_mb': 'Загальний обсяг (МБ)'
-            }).round(2)
-        )
-        
-        # Додаємо аналіз характеристик трафіку за країнами
-        st.subheader("Характеристики трафіку за країнами")
-        
-        metrics_options = ['sbytes', 'dbytes', 'spkts', 'dpkts', 'dur', 'sloss', 'dloss', 'sjit', 'djit']
-        selected_metric = st.selectbox("Оберіть метрику для порівняння:", options=metrics_options)
-        
-        # Розрахунок середнього значення метрики за країнами
-        country_metrics = filtered_df.groupby(country_col)[selected_metric].mean().reset_index()
-        country_metrics = country_metrics.sort_values(selected_metric, ascending=False)
-        
-        # Горизонтальна діаграма для порівняння метрики за країнами
-        fig = px.bar(country_metrics, 
-                    x=selected_metric, 
-                    y=country_col,
-                    orientation='h',
-                    title=f"Середнє значення {selected_metric} за країнами",
-                    labels={country_col: "Країна", selected_metric: f"Середнє значення {selected_metric}"})
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Додаємо інтерактивну довідку про особливості трафіку різних країн
-        st.info("""
-        ### Особливості мережевого трафіку за країнами
-        - **Індія**: Вищий обсяг даних (на 80% більше байтів)
-        - **Китай**: Більша кількість пакетів
-        - **США**: Триваліші з'єднання
-        - **Бразилія**: Вища втрата пакетів
-        - **Європейські країни**: Нижчий джитер (затримка)
-        """)
-        
-    with tab7:
-        st.subheader("Виявлення та аналіз аномалій")
-        
-        if 'anomaly' in df.columns:
-            # Display overview of anomalies
-            anomaly_counts = df['anomaly'].value_counts()
-            total_connections = len(df)
-            anomaly_percent = (anomaly_counts.get(1, 0) / total_connections) * 100 if total_connections > 0 else 0
+            # Get unique anomaly types
+            anomaly_type_options = ['Всі типи'] + sorted(df[df['anomaly'] == 1]['anomaly_type'].unique().tolist())
+            selected_anomaly_type = st.selectbox("Оберіть тип аномалії для аналізу:", anomaly_type_options)
             
-            st.write(f"### Загальна статистика аномалій")
-            st.write(f"Всього з'єднань: {total_connections}")
-            st.write(f"Нормальні з'єднання: {anomaly_counts.get(0, 0)} ({100 - anomaly_percent:.2f}%)")
-            st.write(f"Аномальні з'єднання: {anomaly_counts.get(1, 0)} ({anomaly_percent:.2f}%)")
+            # Filter data based on selected anomaly type
+            if selected_anomaly_type != 'Всі типи':
+                anomaly_data = df[(df['anomaly'] == 1) & (df['anomaly_type'] == selected_anomaly_type)]
+            else:
+                anomaly_data = df[df['anomaly'] == 1]
             
-            # Distribution of anomaly types
-            if 'anomaly_type' in df.columns and anomaly_counts.get(1, 0) > 0:
-                anomaly_types = df[df['anomaly'] == 1]['anomaly_type'].value_counts()
+            # Calculate some statistics for the selected anomaly type
+            if not anomaly_data.empty:
+                col1, col2, col3 = st.columns(3)
                 
-                fig = px.pie(
-                    values=anomaly_types.values,
-                    names=anomaly_types.index,
-                    title="Розподіл типів аномалій"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                col1.metric("Кількість з'єднань", len(anomaly_data))
+                col2.metric("Середня тривалість", f"{anomaly_data['dur'].mean():.4f} с")
+                col3.metric("Середній розмір", f"{int(anomaly_data['sbytes'].mean())} байт")
                 
-                # Create detailed analysis by anomaly type
-                st.write("### Детальний аналіз аномалій за типами")
+                # Compare normal vs anomaly characteristics
+                st.write("### Порівняння нормального та аномального трафіку")
                 
-                # Get unique anomaly types
-                anomaly_type_options = ['Всі типи'] + sorted(df[df['anomaly'] == 1]['anomaly_type'].unique().tolist())
-                selected_anomaly_type = st.selectbox("Оберіть тип аномалії для аналізу:", anomaly_type_options)
+                comparison_metric = st.selectbox(
+                    "Оберіть метрику для порівняння:",
+                    options=['pkt_to_byte_ratio', 'connection_rate', 'duration'] + NUMERIC_COLUMNS
+                )
                 
-                # Filter data based on selected anomaly type
-                if selected_anomaly_type != 'Всі типи':
-                    anomaly_data = df[(df['anomaly'] == 1) & (df['anomaly_type'] == selected_anomaly_type)]
-                else:
-                    anomaly_data = df[df['anomaly'] == 1]
+                def comparison_sketches(column):
+                    # Скетчі нормального і (обраного типу) аномального трафіку по всьому датасету
+                    cube = ctx.sketch_cube()
+                    anomaly_filter = {'anomaly': 1}
+                    if selected_anomaly_type != 'Всі типи':
+                        anomaly_filter['anomaly_type'] = selected_anomaly_type
+                    empty = QuantileSketch([], [])
+                    return (cube.sketches(column, equals={'anomaly': 0}).get(None, empty),
+                            cube.sketches(column, equals=anomaly_filter).get(None, empty))
                 
-                # Calculate some statistics for the selected anomaly type
-                if not anomaly_data.empty:
-                    col1, col2, col3 = st.columns(3)
+                # Calculate metrics for comparison
+                if comparison_metric == 'pkt_to_byte_ratio':
+                    normal_data = df[df['anomaly'] == 0].copy()
+                    normal_data['pkt_to_byte_ratio'] = normal_data['spkts'] / (normal_data['sbytes'] + 1)
+                    anomaly_data['pkt_to_byte_ratio'] = anomaly_data['spkts'] / (anomaly_data['sbytes'] + 1)
                     
-                    col1.metric("Кількість з'єднань", len(anomaly_data))
-                    col2.metric("Середня тривалість", f"{anomaly_data['dur'].mean():.4f} с")
-                    col3.metric("Середній розмір", f"{int(anomaly_data['sbytes'].mean())} байт")
+                    fig = histogram_figure([
+                        ('Нормальний трафік', normal_data['pkt_to_byte_ratio'].clip(upper=0.1), 'blue'),
+                        ('Аномальний трафік', anomaly_data['pkt_to_byte_ratio'].clip(upper=0.1), 'red'),
+                    ], barmode='overlay', opacity=0.7)
                     
-                    # Compare normal vs anomaly characteristics
-                    st.write("### Порівняння нормального та аномального трафіку")
-                    
-                    comparison_metric = st.selectbox(
-                        "Оберіть метрику для порівняння:",
-                        options=['pkt_to_byte_ratio', 'connection_rate', 'duration'] + NUMERIC_COLUMNS
-                    )
-                    
-                    # Calculate metrics for comparison
-                    if comparison_metric == 'pkt_to_byte_ratio':
-                        normal_data = df[df['anomaly'] == 0].copy()
-                        normal_data['pkt_to_byte_ratio'] = normal_data['spkts'] / (normal_data['sbytes'] + 1)
-                        anomaly_data['pkt_to_byte_ratio'] = anomaly_data['spkts'] / (anomaly_data['sbytes'] + 1)
-                        
-                        fig = go.Figure()
-                        fig.add_trace(go.Histogram(x=normal_data['pkt_to_byte_ratio'].clip(upper=0.1),
-                                                name='Нормальний трафік', opacity=0.7,
-                                                marker_color='blue'))
-                        fig.add_trace(go.Histogram(x=anomaly_data['pkt_to_byte_ratio'].clip(upper=0.1),
-                                                name='Аномальний трафік', opacity=0.7,
-                                                marker_color='red'))
+                    fig.update_layout(title='Порівняння відношення пакетів до байтів',
+                                    xaxis_title='Пакетів на байт (обмежено до 0.1)',
+                                    yaxis_title='Кількість з\'єднань')
+                    plotly_chart(fig, use_container_width=True)
+                
+                elif comparison_metric == 'connection_rate':
+                    if 'start_time' in df.columns:
+                        # Кількість з'єднань за 5-хвилинні інтервали з готових хвилинних бінів
+                        rate_df = ctx.timeseries().series('5min', by='anomaly')
+                        rate_df = rate_df.reindex(columns=[0, 1], fill_value=0).rename(columns={
+                            0: 'Нормальний трафік', 1: 'Аномальний трафік'}).reset_index()
                         
-                        fig.update_layout(title='Порівняння відношення пакетів до байтів',
-                                        xaxis_title='Пакетів на байт (обмежено до 0.1)',
-                                        yaxis_title='Кількість з\'єднань',
-                                        barmode='overlay')
-                        st.plotly_chart(fig, use_container_width=True)
-                    
-                    elif comparison_metric == 'connection_rate':
-                        if 'start_time' in df.columns:
-                            # Group connections by 5-minute intervals
-                            df['time_window'] = df['start_time'].dt.floor('5min')
-                            normal_rate = df[df['anomaly'] == 0].groupby('time_window').size()
-                            anomaly_rate = df[df['anomaly'] == 1].groupby('time_window').size()
-                            
-                            # Combine into one dataframe for visualization
-                            rate_df = pd.DataFrame({
-                                'time': normal_rate.index,
-                                'Нормальний трафік': normal_rate.values
-                            })
-                            
-                            # Add anomaly rate if it exists for that time window
-                            for time, count in anomaly_rate.items():
-                                if time in rate_df['time'].values:
-                                    rate_df.loc[rate_df['time'] == time, 'Аномальний трафік'] = count
-                                else:
-                                    new_row = pd.DataFrame({'time': [time], 'Нормальний трафік': [0], 'Аномальний трафік': [count]})
-                                    rate_df = pd.concat([rate_df, new_row], ignore_index=True)
-                            
-                            rate_df = rate_df.fillna(0).sort_values('time')
-                            
-                            fig = px.line(rate_df, x='time', y=['Нормальний трафік', 'Аномальний трафік'],
-                                        title='Інтенсивність з\'єднань з часом',
-                                        labels={'value': 'Кількість з\'єднань', 'time': 'Час',
-                                                'variable': 'Тип трафіку'})
-                            st.plotly_chart(fig, use_container_width=True)
+                        fig = px.line(rate_df, x='time', y=['Нормальний трафік', 'Аномальний трафік'],
+                                    title='Інтенсивність з\'єднань з часом',
+                                    labels={'value': 'Кількість з\'єднань', 'time': 'Час',
+                                            'variable': 'Тип трафіку'})
+                        plotly_chart(fig, use_container_width=True)
+                
+                elif comparison_metric == 'duration':
+                    normal_sketch, anomaly_sketch = comparison_sketches('dur')
+                    fig = go.Figure()
+                    fig.add_trace(box_trace(normal_sketch.clip(upper=20),
+                                            'Нормальний трафік', marker_color='blue'))
+                    fig.add_trace(box_trace(anomaly_sketch.clip(upper=20),
+                                            'Аномальний трафік', marker_color='red'))
+                    fig.update_layout(title='Порівняння тривалості з\'єднань',
+                                    yaxis_title='Тривалість (с, обмежено до 20с)')
+                    plotly_chart(fig, use_container_width=True)
+                
+                else:  # For standard numeric metrics
+                    normal_sketch, anomaly_sketch = comparison_sketches(comparison_metric)
+                    fig = go.Figure()
+                    fig.add_trace(box_trace(normal_sketch,
+                                            'Нормальний трафік', marker_color='blue'))
+                    fig.add_trace(box_trace(anomaly_sketch,
+                                            'Аномальний трафік', marker_color='red'))
+                    fig.update_layout(title=f'Порівняння {comparison_metric}',
+                                    yaxis_title=f'{comparison_metric}')
+                    plotly_chart(fig, use_container_width=True)
+                
+                # Show examples of anomalies
+                st.write("### Приклади аномальних з'єднань")
+                sample_size = min(10, len(anomaly_data))
+                display_cols = ['start_time', 'proto', 'service', 'dur', 'spkts', 'sbytes', 'src_ip', 'dst_ip', 'anomaly_type']
+                st.dataframe(with_readable_ips(anomaly_data[display_cols].sample(sample_size)))
+        
+        else:
+            # Run anomaly detection if not already present
+            st.write("### Виявлення аномалій в датасеті")
+            st.write("У цьому датасеті відсутні мітки аномалій. Натисніть кнопку нижче, щоб запустити алгоритми виявлення аномалій:")
+            
+            if st.button("Виявити аномалії"):
+                with st.spinner("Аналіз даних і виявлення аномалій..."):
+                    # Усі правила (DDoS, TTL, вікно TCP, розмір пакетів, порти сервісів) за один прохід
+                    st.write("Перевірка правил: DDoS, помилкові конфігурації, нестандартні порти...")
+                    mask = detect(df)
+                    # Наявні мітки лишаються, правила лише додають нові
+                    df['anomaly'] = np.maximum(df['anomaly'].to_numpy(), (mask != 0).astype('uint8'))
+                    df['anomaly_type'] = type_labels(mask)
                     
-                    elif comparison_metric == 'duration':
-                        fig = go.Figure()
-                        fig.add_trace(go.Box(y=df[df['anomaly'] == 0]['dur'].clip(upper=20),
-                                            name='Нормальний трафік',
-                                            marker_color='blue'))
-                        fig.add_trace(go.Box(y=anomaly_data['dur'].clip(upper=20),
-                                            name='Аномальний трафік',
-                                            marker_color='red'))
-                        fig.update_layout(title='Порівняння тривалості з\'єднань',
-                                        yaxis_title='Тривалість (с, обмежено до 20с)')
-                        st.plotly_chart(fig, use_container_width=True)
+                    st.success(f"Аналіз завершено! Виявлено {int(df['anomaly'].sum())} аномалій.")
+                    st.write(f"Розподіл аномалій за типами:")
                     
-                    else:  # For standard numeric metrics
-                        fig = go.Figure()
-                        fig.add_trace(go.Box(y=df[df['anomaly'] == 0][comparison_metric],
-                                            name='Нормальний трафік',
-                                            marker_color='blue'))
-                        fig.add_trace(go.Box(y=anomaly_data[comparison_metric],
-                                            name='Аномальний трафік',
-                                            marker_color='red'))
-                        fig.update_layout(title=f'Порівняння {comparison_metric}',
-                                        yaxis_title=f'{comparison_metric}')
-                        st.plotly_chart(fig, use_container_width=True)
+                    anomaly_counts = df[df['anomaly'] == 1]['anomaly_type'].value_counts()
+                    st.write(anomaly_counts[anomaly_counts > 0])
                     
-                    # Show examples of anomalies
-                    st.write("### Приклади аномальних з'єднань")
-                    sample_size = min(10, len(anomaly_data))
-                    display_cols = ['start_time', 'proto', 'service', 'dur', 'spkts', 'sbytes', 'src_ip', 'dst_ip', 'anomaly_type']
-                    st.dataframe(anomaly_data[display_cols].sample(sample_size))
-            
-            else:
-                # Run anomaly detection if not already present
-                st.write("### Виявлення аномалій в датасеті")
-                st.write("У цьому датасеті відсутні мітки аномалій. Натисніть кнопку нижче, щоб запустити алгоритми виявлення аномалій:")
-                
-                if st.button("Виявити аномалії"):
-                    with st.spinner("Аналіз даних і виявлення аномалій..."):
-                        # Initialize anomaly column if it doesn't exist
-                        if 'anomaly' not in df.columns:
-                            df['anomaly'] = 0
-                        if 'anomaly_type' not in df.columns:
-                            df['anomaly_type'] = ''
-                        
-                        # 1. Detect DDoS attacks (existing code)
-                        st.write("1. Виявлення атак DDoS...")
-                        
-                        # Group by destination IP and time window
-                        df['time_window'] = pd.to_datetime(df['start_time']).dt.floor('10min')
-                        ddos_threshold_pkt_rate = 1000  # Поріг для швидкості пакетів
-                        
-                        # Шукаємо з'єднання з надзвичайно високою швидкістю пакетів
-                        ddos_mask = (df['spkts'] / df['dur'] > ddos_threshold_pkt_rate) & (df['dur'] < 0.1)
-                        df.loc[ddos_mask, 'anomaly'] = 1
-                        df.loc[ddos_mask, 'anomaly_type'] = 'ddos'
-                        
-                        # 2. Detect misconfigurations (enhanced)
-                        st.write("2. Виявлення помилкових конфігурацій...")
-                        
-                        # a. Неправильні TTL значення
-                        wrong_ttl_mask = ((df['sttl'] <= 2) | (df['sttl'] >= 254) | 
-                                         (df['dttl'] <= 2) | (df['dttl'] >= 254))
-                        df.loc[wrong_ttl_mask, 'anomaly'] = 1
-                        df.loc[wrong_ttl_mask, 'anomaly_type'] = 'misconfig:wrong_ttl'
-                        
-                        # b. Нетипові розміри вікна TCP
-                        window_size_mask = ((df['swin'] <= 3) | (df['swin'] >= 65534) | 
-                                           (df['dwin'] <= 3) | (df['dwin'] >= 65534))
-                        df.loc[window_size_mask, 'anomaly'] = 1
-                        df.loc[window_size_mask, 'anomaly_type'] = 'misconfig:window_size'
-                        
-                        # c. Аномальне співвідношення пакетів до байтів
-                        pkt_byte_ratio_mask = ((df['spkts'] > 100) & (df['sbytes'] / df['spkts'] < 10))
-                        df.loc[pkt_byte_ratio_mask, 'anomaly'] = 1
-                        df.loc[pkt_byte_ratio_mask, 'anomaly_type'] = 'misconfig:packet_size'
-                        
-                        # 3. Detect nonstandard ports
-                        st.write("3. Виявлення нестандартних портів...")
-                        
-                        # Створюємо словник відповідності сервісів та стандартних портів
-                        service_port_map = {
-                            'http': 80, 'https': 443, 'dns': 53, 'ftp': 21, 'ssh': 22, 'smtp': 25, 
-                            'pop3': 110, 'imap': 143, 'telnet': 23, 'ntp': 123, 'rdp': 3389
-                        }
-                        
-                        # Перевіряємо порти на відповідність сервісу
-                        for service, port in service_port_map.items():
-                            nonstandard_port_mask = (df['service'] == service) & (df['dst_port'] != port)
-                            df.loc[nonstandard_port_mask, 'anomaly'] = 1
-                            df.loc[nonstandard_port_mask, 'anomaly_type'] = 'nonstandard_port'
-                        
-                        st.success(f"Аналіз завершено! Виявлено {df['anomaly'].sum()} аномалій.")
-                        st.write(f"Розподіл аномалій за типами:")
-                        
-                        anomaly_counts = df[df['anomaly'] == 1]['anomaly_type'].value_counts()
-                        st.write(anomaly_counts)
-        else:
-            st.write("Колонка 'anomaly' відсутня у датасеті. Для виявлення аномалій потрібно оновити структуру даних.")
+                    # Рядок може порушувати кілька правил одночасно - показуємо всі спрацювання
+                    st.write("Спрацювання окремих правил:")
+                    st.write(rule_counts(mask))
+    else:
+        st.write("Колонка 'anomaly' відсутня у датасеті. Для виявлення аномалій потрібно оновити структуру даних.")
+    
+    render_ddos_targets(ctx)
+    render_baseline_scores(ctx)
+
+
+def render_ddos_targets(ctx):
+    # Розподілені атаки: багато дрібних з'єднань до однієї цілі в ковзному вікні
+    df = ctx.df
+    if not all(col in df.columns for col in ['dst_ip', 'src_ip', 'spkts', 'start_time']):
+        return
+    st.write("### Розподілені DDoS-атаки за ціллю")
+    by_port = st.checkbox("Окремо для кожного порту призначення", value=False)
+    _, targets = ctx.cached('ddos_targets', (by_port,), lambda: detect_ddos(df, by_port=by_port))
+    if targets.empty:
+        st.write("Цілей з перевищенням порогів не знайдено.")
+        return
+    st.write(f"Цілей з перевищенням порогів: {len(targets)}")
+    st.dataframe(with_readable_ips(targets).rename(columns={
+        'first_seen': 'Перше перевищення',
+        'last_seen': 'Останнє перевищення',
+        'flagged_flows': "З'єднань під час атаки",
+        'max_flows': "Макс. з'єднань у вікні",
+        'max_pkt_rate': 'Макс. пакетів/с',
+        'max_sources': 'Макс. джерел',
+    }))
+
+
+def render_baseline_scores(ctx):
+    # Відхилення від типової поведінки свого сервісу/протоколу замість фіксованих порогів
+    df = ctx.df
+    model = ServiceBaseline()
+    if not all(col in df.columns for col in model.columns + model.group_columns):
+        return
+    baseline = cached_derived(ctx.fingerprint, 'baseline',
+                              lambda: prebuilt(ctx.source_path, 'baseline', lambda: model.update(df)))
+    st.write("### Відхилення від базової лінії сервісів")
+    scores = ctx.cached('baseline_scores', (), lambda: baseline.score(df))
+    threshold = st.slider("Поріг z-оцінки:", 2.0, 10.0, float(BASELINE_Z_THRESHOLD), 0.5)
+    flagged = scores['score'] > threshold
+    st.write(f"З'єднань з відхиленням понад {threshold}σ: {int(flagged.sum())} з {len(df)}")
+    
+    fig = histogram_figure([('z', scores['score'].to_numpy(), None)], nbins=60)
+    fig.update_layout(title='Розподіл максимальної |z| за метриками', xaxis_title='|z|',
+                      yaxis_title='Кількість з\'єднань', showlegend=False)
+    plotly_chart(fig, use_container_width=True)
+    
+    top = scores[flagged].nlargest(20, 'score')
+    display_cols = [col for col in ['start_time', 'proto', 'service', 'src_ip', 'dst_ip'] if col in df.columns]
+    st.dataframe(with_readable_ips(df.loc[top.index, display_cols]).join(top.round(2)))
+
+
+TALKER_DIMENSION_LABELS = {
+    'src_ip': 'IP джерела',
+    'dst_ip': 'IP призначення',
+    'pair': 'Пара джерело → призначення',
+    'dst_port': 'Порт призначення',
+}
+TALKER_WEIGHT_LABELS = {'flows': "З'єднання", 'bytes': 'Байти', 'packets': 'Пакети'}
+
+
+def render_top_talkers(ctx):
+    st.subheader("Найактивніші вузли")
+    talkers = ctx.talkers()
+    dimensions = [d for d in TALKER_DIMENSION_LABELS if d in talkers.available()]
+    if not dimensions:
+        st.write("У датасеті немає колонок IP-адрес чи портів.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    dimension = col1.radio("Ключ:", dimensions, format_func=TALKER_DIMENSION_LABELS.get)
+    weight = col2.radio("Вага:", list(TALKER_WEIGHT_LABELS), format_func=TALKER_WEIGHT_LABELS.get)
+    top_n = col3.slider("Кількість:", 5, 50, 20)
+
+    top = talkers.top(dimension, weight, top_n)
+    if top is None or top.empty:
+        st.write("Немає даних для обраної ваги.")
+        return
+    top = with_readable_ips(top)
+    key_columns = [col for col in top.columns if col not in ('lower', 'estimate', 'upper')]
+    top.insert(0, 'label', top[key_columns].astype(str).agg(' → '.join, axis=1))
+
+    # Планка похибки - від гарантованої нижньої межі до оцінки
+    fig = go.Figure(go.Bar(
+        x=top['label'], y=top['estimate'],
+        error_y=dict(type='data', symmetric=False, array=np.zeros(len(top)),
+                     arrayminus=top['estimate'] - top['lower'])))
+    fig.update_layout(title=f"Топ-{top_n}: {TALKER_DIMENSION_LABELS[dimension]}",
+                      xaxis_title=TALKER_DIMENSION_LABELS[dimension],
+                      yaxis_title=TALKER_WEIGHT_LABELS[weight], xaxis_type='category')
+    plotly_chart(fig, use_container_width=True)
+
+    slack, cms_error, confidence = talkers.error_bounds(dimension, weight)
+    st.caption(f"Справжня вага кожного ключа лежить між «Не менше» і «Не більше»; "
+               f"ключі, важчі за {slack:,.0f}, гарантовано потрапляють у скетч. "
+               f"Оцінка Count-Min завищена не більше ніж на {cms_error:,.0f} з імовірністю {confidence:.0%}.")
+    st.dataframe(top.drop(columns='label').rename(columns={
+        **{col: TALKER_DIMENSION_LABELS.get(col, col) for col in key_columns},
+        'lower': 'Не менше',
+        'estimate': 'Оцінка',
+        'upper': 'Не більше',
+    }).round(0))
+
+
+VIEWS = {
+    "Розподіли": render_distributions,
+    "Кореляції": render_correlations,
+    "Протоколи": render_protocols,
+    "Загальний огляд": render_overview,
+    "Часовий аналіз": render_time_analysis,
+    "Геовізуалізація": render_geography,
+    "Виявлення аномалій": render_anomalies,
+    "Найактивніші вузли": render_top_talkers,
+}
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
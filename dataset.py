@@ -1,12 +1,16 @@
 import pandas as pd
 import numpy as np
-import random
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-import ipaddress
 
-# Встановлюємо seed для відтворюваності результатів
-np.random.seed(42)
-random.seed(82)
+from src.ip_utils import ints_to_ips
+
+# Seed для відтворюваності результатів
+SEED = 42
 
 # Параметри аномалій
 ANOMALY_CONFIG = {
@@ -29,8 +33,8 @@ ANOMALY_CONFIG = {
     'repeat_conn_interval_sec': 5, # Інтервал між повтореннями в секундах
 }
 
-# Кількість рядків у датасеті
-n_rows = 23000
+# Кількість рядків у датасеті за замовчуванням
+N_ROWS = 23000
 
 # Визначення категоріальних значень
 protocols = ['TCP', 'UDP', 'ICMP', 'HTTP', 'HTTPS', 'DNS', 'FTP', 'SMTP', 'SSH']
@@ -60,46 +64,6 @@ nonstandard_ports = {
     'vnc': [5901, 5902, 5800]
 }
 
-# Генерація часу початку (випадково за останній місяць)
-base_time = datetime.now() - timedelta(days=30)
-start_times = [base_time + timedelta(seconds=random.randint(0, 30*24*60*60)) for _ in range(n_rows)]
-
-# Створення базового DataFrame
-df = pd.DataFrame({
-    'id': range(1, n_rows + 1),
-    'proto': np.random.choice(protocols, size=n_rows, p=[0.4, 0.3, 0.1, 0.05, 0.05, 0.04, 0.02, 0.02, 0.02]),
-    'service': np.random.choice(services, size=n_rows, p=[0.25, 0.2, 0.15, 0.1, 0.1, 0.05, 0.05, 0.03, 0.02, 0.01, 0.01, 0.01, 0.01, 0.005, 0.005]),
-    'state': np.random.choice(states, size=n_rows),
-    'dur': np.random.exponential(10, n_rows),  # Тривалість у секундах (експоненційний розподіл)
-    'spkts': np.random.randint(1, 1000, n_rows),  # Відправлені пакети
-    'dpkts': np.random.randint(1, 1000, n_rows),  # Отримані пакети
-    'sbytes': np.random.randint(100, 10000000, n_rows),  # Відправлені байти
-    'dbytes': np.random.randint(100, 10000000, n_rows),  # Отримані байти
-    'rate': np.random.exponential(1000, n_rows),  # Швидкість передачі даних (біти/с)
-    'sttl': np.random.randint(30, 255, n_rows),  # Source TTL
-    'dttl': np.random.randint(30, 255, n_rows),  # Destination TTL
-    'sload': np.random.exponential(5, n_rows),  # Source load
-    'dload': np.random.exponential(5, n_rows),  # Destination load
-    'sloss': np.random.randint(0, 100, n_rows),  # Source loss (packets)
-    'dloss': np.random.randint(0, 100, n_rows),  # Destination loss (packets)
-    'sinpkt': np.random.exponential(0.01, n_rows),  # Source inter-packet arrival time
-    'dinpkt': np.random.exponential(0.01, n_rows),  # Destination inter-packet arrival time
-    'sjit': np.random.exponential(0.005, n_rows),  # Source jitter
-    'djit': np.random.exponential(0.005, n_rows),  # Destination jitter
-    'swin': np.random.randint(1000, 65535, n_rows),  # Source window size
-    'dwin': np.random.randint(1000, 65535, n_rows),  # Destination window size
-    'stcpb': np.random.randint(100000, 1000000000, n_rows),  # Source TCP base sequence number
-    'dtcpb': np.random.randint(100000, 1000000000, n_rows),  # Destination TCP base sequence number
-    'tcprtt': np.random.exponential(0.1, n_rows),  # TCP connection round trip time
-    'synack': np.random.exponential(0.05, n_rows),  # TCP connection setup time
-    'ackdat': np.random.exponential(0.05, n_rows),  # TCP connection setup time
-    'is_attack': np.random.choice([0, 1], size=n_rows, p=[0.9, 0.1]),  # Флаг атаки (0-нормальний трафік, 1-атака)
-})
-
-# Генерація IP-адрес
-def generate_random_ip():
-    return f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
-
 # Розширений список країн для IP-геолокації
 countries = [
     'Україна', 'США', 'Німеччина', 'Польща', 'Франція', 'Китай', 'Велика Британія', 'Канада',
@@ -107,27 +71,7 @@ countries = [
     'Нідерланди', 'Швеція', 'Сінгапур', 'Ізраїль', 'ОАЕ'
 ]
 
-# Різні ваги для розподілу трафіку за країнами (додаємо високий трафік з Індії)
-country_weights = [
-    0.25, 0.12, 0.08, 0.06, 0.05, 0.05, 0.05, 0.04,  # Original countries with adjusted weights
-    0.10, 0.03, 0.02, 0.03, 0.02, 0.02, 0.02,  # Added countries with various weights (Індія має високий трафік)
-    0.02, 0.01, 0.01, 0.01, 0.01
-]
-
-# Make sure weights sum to 1.0
-country_weights = [w/sum(country_weights) for w in country_weights]
-
-# Додамо IP-адреси і країни до датафрейму
-df['src_ip'] = [generate_random_ip() for _ in range(n_rows)]
-df['dst_ip'] = [generate_random_ip() for _ in range(n_rows)]
-df['src_country'] = np.random.choice(countries, size=n_rows, p=country_weights)
-df['dst_country'] = np.random.choice(countries, size=n_rows, p=country_weights)
-
-# Додаємо порти (стандартні для початку)
-df['src_port'] = np.random.randint(1024, 65535, n_rows)  # Динамічні порти джерела
-df['dst_port'] = df['service'].apply(lambda s: standard_ports.get(s, random.randint(1, 1023)))
-
-# Define different weights for source and destination countries
+# Different weights for source and destination countries
 src_country_weights = [
     0.3, 0.1, 0.05, 0.08, 0.05, 0.05, 0.03, 0.02,  # First 8 countries
     0.04, 0.03, 0.03, 0.03, 0.03, 0.03, 0.03,      # Next 7 countries  
@@ -144,108 +88,374 @@ dst_country_weights = [
 src_country_weights = [w/sum(src_country_weights) for w in src_country_weights]
 dst_country_weights = [w/sum(dst_country_weights) for w in dst_country_weights]
 
-# Apply different distributions
-df['src_country'] = np.random.choice(countries, size=n_rows, p=src_country_weights)
-df['dst_country'] = np.random.choice(countries, size=n_rows, p=dst_country_weights)
-
-# Create correlation between countries (e.g., Ukraine often communicates with Poland)
-mask_ukraine = df['src_country'] == 'Україна'
-poland_index = np.random.choice(np.where(mask_ukraine)[0], size=int(sum(mask_ukraine)*0.4))
-df.loc[poland_index, 'dst_country'] = 'Польща'
-
-# Add byte volume differences (more bytes sent from certain countries)
-multiplier = df['src_country'].map({
+# Add byte volume differences (more bytes sent from certain countries).
+# Для решти країн множник не задано, тому їхні sbytes лишаються порожніми (як і раніше)
+country_byte_multiplier = {
     'Україна': 1.0, 'США': 1.5, 'Німеччина': 1.2, 'Польща': 0.8, 
     'Франція': 0.9, 'Китай': 1.7, 'Велика Британія': 1.3, 'Канада': 0.7
-})
-df['sbytes'] = df['sbytes'] * multiplier
+}
+
+proto_weights = [0.4, 0.3, 0.1, 0.05, 0.05, 0.04, 0.02, 0.02, 0.02]
+service_weights = [0.25, 0.2, 0.15, 0.1, 0.1, 0.05, 0.05, 0.03, 0.02, 0.01, 0.01, 0.01, 0.01, 0.005, 0.005]
+
+FLOAT_COLUMNS = ['dur', 'rate', 'sload', 'dload', 'sinpkt', 'dinpkt', 'sjit', 'djit', 'tcprtt', 'synack', 'ackdat']
+
+# Таблиці підстановки за індексом сервісу: стандартний порт (0 - немає) і нестандартні порти
+_standard_port_lut = np.array([standard_ports.get(s, 0) for s in services])
+_nonstandard_port_counts = np.array([len(nonstandard_ports.get(s, [])) for s in services])
+_nonstandard_port_lut = np.zeros((len(services), _nonstandard_port_counts.max()), dtype=np.int64)
+for _i, _service in enumerate(services):
+    _ports = nonstandard_ports.get(_service, [])
+    _nonstandard_port_lut[_i, :len(_ports)] = _ports
+
+
+# Генерація IP-адрес
+def generate_random_ips(rng, size):
+    octets = (
+        rng.integers(1, 224, size, dtype=np.uint32),
+        rng.integers(0, 256, size, dtype=np.uint32),
+        rng.integers(0, 256, size, dtype=np.uint32),
+        rng.integers(1, 255, size, dtype=np.uint32),
+    )
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+
+def generate_traffic(n_rows, rng, base_time=None, span_seconds=30*24*60*60):
+    # Генерація часу початку (випадково за останній місяць або за заданий інтервал)
+    if base_time is None:
+        base_time = datetime.now() - timedelta(days=30)
+    offsets = rng.integers(0, int(span_seconds * 1_000_000), n_rows).astype('timedelta64[us]')
+    start_times = np.datetime64(base_time, 'us') + offsets
+
+    service_idx = rng.choice(len(services), size=n_rows, p=service_weights)
+
+    # Створення базового DataFrame
+    df = pd.DataFrame({
+        'id': np.arange(1, n_rows + 1),
+        'proto': pd.Categorical.from_codes(rng.choice(len(protocols), size=n_rows, p=proto_weights), protocols),
+        'service': pd.Categorical.from_codes(service_idx, services),
+        'state': pd.Categorical.from_codes(rng.integers(0, len(states), n_rows), states),
+        'dur': rng.exponential(10, n_rows),  # Тривалість у секундах (експоненційний розподіл)
+        'spkts': rng.integers(1, 1000, n_rows),  # Відправлені пакети
+        'dpkts': rng.integers(1, 1000, n_rows),  # Отримані пакети
+        'sbytes': rng.integers(100, 10000000, n_rows),  # Відправлені байти
+        'dbytes': rng.integers(100, 10000000, n_rows),  # Отримані байти
+        'rate': rng.exponential(1000, n_rows),  # Швидкість передачі даних (біти/с)
+        'sttl': rng.integers(30, 255, n_rows),  # Source TTL
+        'dttl': rng.integers(30, 255, n_rows),  # Destination TTL
+        'sload': rng.exponential(5, n_rows),  # Source load
+        'dload': rng.exponential(5, n_rows),  # Destination load
+        'sloss': rng.integers(0, 100, n_rows),  # Source loss (packets)
+        'dloss': rng.integers(0, 100, n_rows),  # Destination loss (packets)
+        'sinpkt': rng.exponential(0.01, n_rows),  # Source inter-packet arrival time
+        'dinpkt': rng.exponential(0.01, n_rows),  # Destination inter-packet arrival time
+        'sjit': rng.exponential(0.005, n_rows),  # Source jitter
+        'djit': rng.exponential(0.005, n_rows),  # Destination jitter
+        'swin': rng.integers(1000, 65535, n_rows),  # Source window size
+        'dwin': rng.integers(1000, 65535, n_rows),  # Destination window size
+        'stcpb': rng.integers(100000, 1000000000, n_rows),  # Source TCP base sequence number
+        'dtcpb': rng.integers(100000, 1000000000, n_rows),  # Destination TCP base sequence number
+        'tcprtt': rng.exponential(0.1, n_rows),  # TCP connection round trip time
+        'synack': rng.exponential(0.05, n_rows),  # TCP connection setup time
+        'ackdat': rng.exponential(0.05, n_rows),  # TCP connection setup time
+        'is_attack': rng.choice([0, 1], size=n_rows, p=[0.9, 0.1]),  # Флаг атаки (0-нормальний трафік, 1-атака)
+    })
+
+    # Додамо IP-адреси і країни до датафрейму
+    df['src_ip'] = ints_to_ips(generate_random_ips(rng, n_rows))
+    df['dst_ip'] = ints_to_ips(generate_random_ips(rng, n_rows))
+    src_country_idx = rng.choice(len(countries), size=n_rows, p=src_country_weights)
+    dst_country_idx = rng.choice(len(countries), size=n_rows, p=dst_country_weights)
+
+    # Create correlation between countries (e.g., Ukraine often communicates with Poland)
+    ukraine_rows = np.flatnonzero(src_country_idx == countries.index('Україна'))
+    if len(ukraine_rows):
+        poland_rows = rng.choice(ukraine_rows, size=int(len(ukraine_rows) * 0.4))
+        dst_country_idx[poland_rows] = countries.index('Польща')
+
+    df['src_country'] = pd.Categorical.from_codes(src_country_idx, countries)
+    df['dst_country'] = pd.Categorical.from_codes(dst_country_idx, countries)
+
+    # Додаємо порти (стандартні для початку)
+    df['src_port'] = rng.integers(1024, 65535, n_rows)  # Динамічні порти джерела
+    dst_port = _standard_port_lut[service_idx]
+    no_standard = dst_port == 0
+    dst_port[no_standard] = rng.integers(1, 1024, int(no_standard.sum()))
+    df['dst_port'] = dst_port
+
+    multiplier_lut = np.array([country_byte_multiplier.get(c, np.nan) for c in countries])
+    df['sbytes'] = df['sbytes'] * multiplier_lut[src_country_idx]
+
+    # Додавання часових міток
+    df['start_time'] = start_times
+    df['end_time'] = start_times + np.round(df['dur'].to_numpy() * 1e6).astype('timedelta64[us]')
+    return df
 
-# Додавання часових міток
-df['start_time'] = start_times
-df['end_time'] = [st + timedelta(seconds=dur) for st, dur in zip(start_times, df['dur'])]
 
 # Замість генерації міток аномалій, створюємо записи з нетиповими значеннями
-def generate_anomalies_without_labeling(df):
+def generate_anomalies_without_labeling(df, rng):
     # Кількість аномальних записів
     anomaly_count = int(len(df) * ANOMALY_CONFIG['anomaly_ratio'])
     
-    # Вибираємо випадкові індекси для модифікації
-    anomaly_indices = np.random.choice(df.index, size=anomaly_count, replace=False)
+    # Вибираємо випадкові позиції для модифікації
+    anomaly_rows = rng.choice(len(df), size=anomaly_count, replace=False)
     
     # Розділяємо аномальні записи на категорії
     ddos_count = int(anomaly_count * ANOMALY_CONFIG['ddos_ratio'])
     misconfig_count = int(anomaly_count * ANOMALY_CONFIG['misconfig_ratio'])
     nonstandard_port_count = int(anomaly_count * ANOMALY_CONFIG['nonstandard_port_ratio'])
     
-    # Індекси для різних типів аномалій
-    ddos_indices = anomaly_indices[:ddos_count]
-    misconfig_indices = anomaly_indices[ddos_count:ddos_count+misconfig_count]
-    nonstandard_port_indices = anomaly_indices[ddos_count+misconfig_count:ddos_count+misconfig_count+nonstandard_port_count]
-    
-    # 1. DDoS-подібні записи - завищені показники пакетів та швидкості
-    for idx in ddos_indices:
-        # Висока швидкість пакетів
-        df.at[idx, 'spkts'] = random.randint(3000, 10000)
-        # Короткі з'єднання
-        df.at[idx, 'dur'] = random.uniform(0.0001, 0.01)
-        # Малі розміри пакетів
-        df.at[idx, 'sbytes'] = df.at[idx, 'spkts'] * random.randint(1, 5)
-        # Висока швидкість
-        df.at[idx, 'rate'] = df.at[idx, 'spkts'] / df.at[idx, 'dur'] if df.at[idx, 'dur'] > 0 else 9999999
+    ddos_rows = anomaly_rows[:ddos_count]
+    misconfig_rows = anomaly_rows[ddos_count:ddos_count+misconfig_count]
+    nonstandard_port_rows = anomaly_rows[ddos_count+misconfig_count:ddos_count+misconfig_count+nonstandard_port_count]
+
+    columns = {col: df[col].to_numpy().copy()
+               for col in ['spkts', 'dur', 'sbytes', 'rate', 'sttl', 'dttl', 'swin', 'dwin', 'dst_port']}
+
+    # 1. DDoS-подібні записи: висока швидкість пакетів, короткі з'єднання, малі пакети
+    spkts = rng.integers(3000, 10000, len(ddos_rows), endpoint=True)
+    dur = rng.uniform(0.0001, 0.01, len(ddos_rows))
+    columns['spkts'][ddos_rows] = spkts
+    columns['dur'][ddos_rows] = dur
+    columns['sbytes'][ddos_rows] = spkts * rng.integers(1, 5, len(ddos_rows), endpoint=True)
+    columns['rate'][ddos_rows] = spkts / dur
 
     # 2. Неправильні конфігурації
-    for idx in misconfig_indices:
-        misconfig_type = random.choice(['wrong_ttl', 'window_size', 'packet_size'])
-        
-        if misconfig_type == 'wrong_ttl':
-            # Нетипові TTL значення
-            df.at[idx, 'sttl'] = random.choice([1, 2, 255, 254])
-            df.at[idx, 'dttl'] = random.choice([1, 2, 255, 254])
-        
-        elif misconfig_type == 'window_size':
-            # Нетипові розміри вікна TCP
-            df.at[idx, 'swin'] = random.choice([1, 2, 3, 65535, 65534])
-            df.at[idx, 'dwin'] = random.choice([1, 2, 3, 65535, 65534])
-            
-        elif misconfig_type == 'packet_size':
-            # Невідповідність пакетів і байтів
-            df.at[idx, 'spkts'] = random.randint(500, 1000)
-            df.at[idx, 'sbytes'] = random.randint(500, 1000)  # ~1 байт на пакет
-
-    # 3. Нестандартні порти
-    for idx in nonstandard_port_indices:
-        service = df.at[idx, 'service']
-        if service in nonstandard_ports and nonstandard_ports[service]:
-            df.at[idx, 'dst_port'] = random.choice(nonstandard_ports[service])
-        else:
-            df.at[idx, 'dst_port'] = random.randint(10000, 65535)
-    
+    misconfig_type = rng.integers(0, 3, len(misconfig_rows))
+
+    # Нетипові TTL значення
+    rows = misconfig_rows[misconfig_type == 0]
+    columns['sttl'][rows] = rng.choice([1, 2, 255, 254], len(rows))
+    columns['dttl'][rows] = rng.choice([1, 2, 255, 254], len(rows))
+
+    # Нетипові розміри вікна TCP
+    rows = misconfig_rows[misconfig_type == 1]
+    columns['swin'][rows] = rng.choice([1, 2, 3, 65535, 65534], len(rows))
+    columns['dwin'][rows] = rng.choice([1, 2, 3, 65535, 65534], len(rows))
+
+    # Невідповідність пакетів і байтів (~1 байт на пакет)
+    rows = misconfig_rows[misconfig_type == 2]
+    columns['spkts'][rows] = rng.integers(500, 1000, len(rows), endpoint=True)
+    columns['sbytes'][rows] = rng.integers(500, 1000, len(rows), endpoint=True)
+
+    # 3. Нестандартні порти: випадковий порт зі списку сервісу або з верхнього діапазону
+    service_idx = pd.Categorical(df['service'], categories=services).codes[nonstandard_port_rows]
+    known = service_idx >= 0
+    counts = np.where(known, _nonstandard_port_counts[np.maximum(service_idx, 0)], 0)
+    has_list = counts > 0
+    pick = (rng.random(len(nonstandard_port_rows)) * np.maximum(counts, 1)).astype(np.int64)
+    ports = rng.integers(10000, 65535, len(nonstandard_port_rows), endpoint=True)
+    ports[has_list] = _nonstandard_port_lut[service_idx[has_list], pick[has_list]]
+    columns['dst_port'][nonstandard_port_rows] = ports
+
+    for col, values in columns.items():
+        df[col] = values
+    return df
+
+
+def generate_dataset(n_rows=N_ROWS, seed=SEED, base_time=None, span_seconds=30*24*60*60):
+    # seed може бути числом, np.random.SeedSequence (для шардів) або готовим Generator (для потоку)
+    rng = np.random.default_rng(seed)
+    df = generate_traffic(n_rows, rng, base_time, span_seconds)
+
+    if ANOMALY_CONFIG['enable_anomalies']:
+        # Як і в попередній версії генератора, аномалії вносяться двома проходами
+        df = generate_anomalies_without_labeling(df, rng)
+        df = generate_anomalies_without_labeling(df, rng)
+
+    # Перетворення даних та обмеження для підвищення реалізму
+    # Округлення значень з плаваючою крапкою до 6 знаків після коми
+    df[FLOAT_COLUMNS] = df[FLOAT_COLUMNS].round(6)
     return df
 
-# Використовуємо нову функцію замість старої
-# df = generate_anomalies(df)  # Коментуємо стару функцію
-df = generate_anomalies_without_labeling(df)  # Використовуємо нову функцію
-
-# Видаляємо колонки anomaly та anomaly_type
-if 'anomaly' in df.columns:
-    df = df.drop('anomaly', axis=1)
-if 'anomaly_type' in df.columns:
-    df = df.drop('anomaly_type', axis=1)
-
-# Генеруємо аномалії
-df = generate_anomalies_without_labeling(df)
-
-# Перетворення даних та обмеження для підвищення реалізму
-# Округлення значень з плаваючою крапкою до 6 знаків після коми
-for col in ['dur', 'rate', 'sload', 'dload', 'sinpkt', 'dinpkt', 'sjit', 'djit', 'tcprtt', 'synack', 'ackdat']:
-    df[col] = df[col].round(6)
-
-# Збереження даних в CSV
-output_path = "data/dataset1.csv"
-df.to_csv(output_path, index=False)
-
-print(f"Створено датасет з {len(df)} рядками у файлі {output_path}")
-print(f"Нормальні з'єднання: {(df['anomaly'] == 0).sum()}")
-print(f"Аномальні з'єднання: {(df['anomaly'] == 1).sum()}")
-print(f"Типи аномалій: {df[df['anomaly'] == 1]['anomaly_type'].value_counts().to_dict()}")
-print(f"Колонки: {', '.join(df.columns)}")
\ No newline at end of file
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather')
+
+
+def shard_sizes(n_rows, shards):
+    base, extra = divmod(n_rows, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def write_frame(df, output_path, output_format):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if output_format == 'csv':
+        df.to_csv(output_path, index=False)
+    elif output_format == 'parquet':
+        df.to_parquet(output_path, index=False)
+    elif output_format == 'feather':
+        df.to_feather(output_path)
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+
+def generate_shard(task):
+    n_rows, id_offset, seed_sequence, base_time, output_path, output_format = task
+    df = generate_dataset(n_rows, seed_sequence, base_time)
+    df['id'] += id_offset
+    write_frame(df, output_path, output_format)
+    return output_path, len(df)
+
+
+def shard_paths(output, shards, output_format):
+    if shards == 1:
+        return [output]
+    # Кілька шардів пишемо в каталог поруч: data/dataset1.csv -> data/dataset1/part-00000.csv
+    directory = os.path.splitext(output)[0]
+    return [os.path.join(directory, f"part-{i:05d}.{output_format}") for i in range(shards)]
+
+
+def generate_sharded(n_rows, seed=SEED, shards=1, output="data/dataset1.csv",
+                     output_format='csv', workers=None, base_time=None):
+    # Фіксуємо базовий час один раз, щоб усі шарди (і повторні запуски) його поділяли
+    if base_time is None:
+        base_time = datetime.now() - timedelta(days=30)
+    # Незалежна послідовність seed для кожного шарду: результат не залежить від кількості процесів
+    seed_sequences = np.random.SeedSequence(seed).spawn(shards)
+    sizes = shard_sizes(n_rows, shards)
+    offsets = np.cumsum([0] + sizes[:-1])
+    tasks = [
+        (size, int(offset), seed_sequence, base_time, path, output_format)
+        for size, offset, seed_sequence, path
+        in zip(sizes, offsets, seed_sequences, shard_paths(output, shards, output_format))
+    ]
+    if workers == 1 or shards == 1:
+        return [generate_shard(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_shard, tasks))
+
+
+def _traffic_batches(rate, batch_seconds, seed, start_time):
+    # Нескінченна послідовність упорядкованих за часом порцій без затримок
+    rng = np.random.default_rng(seed)
+    current = start_time or datetime.now()
+    pending = 0.0
+    next_id = 1
+    while True:
+        pending += rate * batch_seconds
+        n_rows = int(pending)
+        pending -= n_rows
+        batch = generate_dataset(n_rows, rng, current, batch_seconds)
+        batch = batch.sort_values('start_time', kind='stable', ignore_index=True)
+        batch['id'] = np.arange(next_id, next_id + n_rows)
+        next_id += n_rows
+        current += timedelta(seconds=batch_seconds)
+        yield batch
+
+
+def iter_traffic(rate, batch_seconds=1.0, seed=SEED, start_time=None, realtime=True, max_batches=None):
+    """Потік синтетичних з'єднань зі швидкістю rate подій/с порціями по batch_seconds.
+
+    Порції впорядковані за start_time і йдуть одна за одною без перекриття.
+    З realtime=True ітератор витримує темп реального часу, інакше віддає порції одразу.
+    """
+    deadline = time.monotonic()
+    for index, batch in enumerate(_traffic_batches(rate, batch_seconds, seed, start_time)):
+        if max_batches is not None and index >= max_batches:
+            return
+        if realtime:
+            deadline += batch_seconds
+            time.sleep(max(0.0, deadline - time.monotonic()))
+        yield batch
+
+
+async def aiter_traffic(rate, batch_seconds=1.0, seed=SEED, start_time=None, realtime=True,
+                        max_batches=None):
+    # Асинхронний варіант iter_traffic: очікування не блокує цикл подій
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    for index, batch in enumerate(_traffic_batches(rate, batch_seconds, seed, start_time)):
+        if max_batches is not None and index >= max_batches:
+            return
+        if realtime:
+            deadline += batch_seconds
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+        yield batch
+
+
+class RollingTrafficWriter:
+    """Дописує порції в CSV-сегменти каталогу, відкриваючи новий сегмент після max_bytes.
+
+    Зберігаються лише останні keep сегментів, тож обсяг на диску обмежений.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, keep=10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(f for f in os.listdir(directory) if f.startswith('traffic-'))
+        self.segment = int(existing[-1][8:14]) if existing else 0
+        self._path = None
+
+    def _segment_path(self):
+        return os.path.join(self.directory, f"traffic-{self.segment:06d}.csv")
+
+    def write(self, batch):
+        if self._path is None or os.path.getsize(self._path) >= self.max_bytes:
+            self.segment += 1
+            self._path = self._segment_path()
+            self._prune()
+        header = not os.path.exists(self._path)
+        batch.to_csv(self._path, mode='a', header=header, index=False)
+        return self._path
+
+    def _prune(self):
+        segments = sorted(f for f in os.listdir(self.directory) if f.startswith('traffic-'))
+        for name in segments[:max(0, len(segments) - self.keep + 1)]:
+            os.remove(os.path.join(self.directory, name))
+
+
+def stream_to_directory(directory, rate, batch_seconds=1.0, seed=SEED, duration=None,
+                        max_bytes=64 * 1024 * 1024, keep=10):
+    writer = RollingTrafficWriter(directory, max_bytes, keep)
+    max_batches = None if duration is None else int(duration / batch_seconds)
+    total = 0
+    for batch in iter_traffic(rate, batch_seconds, seed, max_batches=max_batches):
+        path = writer.write(batch)
+        total += len(batch)
+        print(f"{batch['start_time'].iloc[-1] if len(batch) else '-'}: +{len(batch)} ({total}) -> {path}")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерація синтетичного мережевого трафіку")
+    parser.add_argument('--rows', type=int, default=N_ROWS, help="загальна кількість рядків")
+    parser.add_argument('--seed', type=int, default=SEED, help="базовий seed")
+    parser.add_argument('--shards', type=int, default=1, help="кількість шардів (файлів)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="кількість процесів (за замовчуванням - кількість ядер)")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--output', default="data/dataset1.csv",
+                        help="файл для одного шарду або основа назви каталогу для кількох")
+    parser.add_argument('--base-time', type=datetime.fromisoformat, default=None,
+                        help="початок часового діапазону (ISO 8601); задайте для відтворюваності")
+    parser.add_argument('--stream', action='store_true',
+                        help="безперервно генерувати трафік у реальному часі")
+    parser.add_argument('--rate', type=float, default=1000, help="подій за секунду в режимі --stream")
+    parser.add_argument('--batch-seconds', type=float, default=1.0, help="тривалість однієї порції")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="скільки секунд генерувати потік (за замовчуванням - без обмеження)")
+    parser.add_argument('--stream-dir', default="data/stream", help="каталог для сегментів потоку")
+    parser.add_argument('--max-file-mb', type=float, default=64, help="розмір одного сегмента потоку")
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        stream_to_directory(args.stream_dir, args.rate, args.batch_seconds, args.seed,
+                            args.duration, int(args.max_file_mb * 1024 * 1024))
+        return
+
+    if args.shards < 1 or args.rows < 0:
+        parser.error("--shards must be >= 1 and --rows must be >= 0")
+
+    results = generate_sharded(args.rows, args.seed, args.shards, args.output,
+                               args.output_format, args.workers, args.base_time)
+
+    total = sum(rows for _, rows in results)
+    print(f"Створено датасет з {total} рядками у {len(results)} файлах")
+    for path, rows in results:
+        print(f"  {path}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
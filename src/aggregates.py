@@ -0,0 +1,140 @@
+import pandas as pd
+import numpy as np
+
+from src.config import COUNTRY_METRICS
+from src.data_loader import iter_chunks
+
+COUNT_COLUMNS = ['proto', 'service', 'state']
+COUNTRY_COLUMNS = ['src_country', 'dst_country']
+
+
+def _value_counts(values):
+    counts = values.value_counts(sort=False)
+    counts = counts[counts > 0]
+    # Категорії різних порцій не збігаються, тому зводимо індекс до звичайних значень
+    counts.index = counts.index.astype(object)
+    return counts
+
+
+def _add(total, part):
+    if total is None:
+        return part.astype('float64')
+    return total.add(part, fill_value=0)
+
+
+class TrafficAggregates:
+    """Інкрементальні агрегати для панелі, які можна оновлювати порціями й об'єднувати.
+
+    Розмір стану залежить лише від кількості різних значень (протоколів, країн тощо),
+    а не від кількості оброблених рядків.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.hourly_bytes = np.zeros(24)
+        self.day_hour_bytes = np.zeros((7, 24))
+        self.counts = {col: None for col in COUNT_COLUMNS}
+        self.country_flows = {col: None for col in COUNTRY_COLUMNS}
+        self.country_sums = {col: None for col in COUNTRY_COLUMNS}
+        self.country_counts = {col: None for col in COUNTRY_COLUMNS}
+        self.anomaly_counts = None
+        self.anomaly_type_counts = None
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+
+        if 'start_time' in chunk.columns and 'sbytes' in chunk.columns:
+            start_time = pd.to_datetime(chunk['start_time'], errors='coerce')
+            valid = start_time.notna().to_numpy()
+            hour = start_time.dt.hour.to_numpy()[valid].astype(np.int64)
+            day = start_time.dt.dayofweek.to_numpy()[valid].astype(np.int64)
+            # Як і groupby().sum(), пропущені байти не враховуємо
+            weights = np.nan_to_num(chunk['sbytes'].to_numpy(dtype='float64')[valid])
+            self.hourly_bytes += np.bincount(hour, weights=weights, minlength=24)
+            self.day_hour_bytes += np.bincount(day * 24 + hour, weights=weights,
+                                               minlength=7 * 24).reshape(7, 24)
+
+        for col in COUNT_COLUMNS:
+            if col in chunk.columns:
+                self.counts[col] = _add(self.counts[col], _value_counts(chunk[col]))
+
+        metrics = [m for m in COUNTRY_METRICS if m in chunk.columns]
+        for col in COUNTRY_COLUMNS:
+            if col not in chunk.columns:
+                continue
+            grouped = chunk.groupby(col, observed=True)
+            flows = grouped.size()
+            sums = grouped[metrics].sum()
+            counts = grouped[metrics].count()
+            for frame in (flows, sums, counts):
+                frame.index = frame.index.astype(object)
+            self.country_flows[col] = _add(self.country_flows[col], flows)
+            self.country_sums[col] = _add(self.country_sums[col], sums)
+            self.country_counts[col] = _add(self.country_counts[col], counts)
+
+        if 'anomaly' in chunk.columns:
+            self.anomaly_counts = _add(self.anomaly_counts, _value_counts(chunk['anomaly']))
+            if 'anomaly_type' in chunk.columns:
+                types = chunk.loc[chunk['anomaly'] == 1, 'anomaly_type']
+                self.anomaly_type_counts = _add(self.anomaly_type_counts, _value_counts(types))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.hourly_bytes += other.hourly_bytes
+        self.day_hour_bytes += other.day_hour_bytes
+        for col in COUNT_COLUMNS:
+            if other.counts[col] is not None:
+                self.counts[col] = _add(self.counts[col], other.counts[col])
+        for col in COUNTRY_COLUMNS:
+            if other.country_flows[col] is None:
+                continue
+            self.country_flows[col] = _add(self.country_flows[col], other.country_flows[col])
+            self.country_sums[col] = _add(self.country_sums[col], other.country_sums[col])
+            self.country_counts[col] = _add(self.country_counts[col], other.country_counts[col])
+        if other.anomaly_counts is not None:
+            self.anomaly_counts = _add(self.anomaly_counts, other.anomaly_counts)
+        if other.anomaly_type_counts is not None:
+            self.anomaly_type_counts = _add(self.anomaly_type_counts,
+                                            other.anomaly_type_counts)
+        return self
+
+    def hourly_traffic(self):
+        return pd.DataFrame({'hour': np.arange(24), 'sbytes': self.hourly_bytes})
+
+    def value_counts(self, col):
+        counts = self.counts[col]
+        if counts is None:
+            return pd.Series(dtype='int64')
+        return counts.astype('int64').sort_values(ascending=False)
+
+    def country_traffic(self, country_col):
+        if self.country_flows[country_col] is None:
+            return pd.DataFrame(columns=[country_col, 'total_bytes', 'count'])
+        flows = self.country_flows[country_col]
+        return pd.DataFrame({
+            country_col: flows.index,
+            'total_bytes': self.country_sums[country_col]['sbytes'].reindex(flows.index).to_numpy(),
+            'count': flows.astype('int64').to_numpy(),
+        })
+
+    def country_means(self, country_col, metric):
+        sums = self.country_sums[country_col]
+        if sums is None:
+            return pd.DataFrame(columns=[country_col, metric])
+        means = sums[metric] / self.country_counts[country_col][metric]
+        return means.rename_axis(country_col).reset_index(name=metric)
+
+
+def aggregate_file(file_path, chunksize=None):
+    aggregates = TrafficAggregates()
+    for chunk in iter_chunks(file_path, chunksize):
+        aggregates.update(chunk)
+    return aggregates
+
+
+def aggregate_files(file_paths, chunksize=None):
+    total = TrafficAggregates()
+    for file_path in file_paths:
+        total.merge(aggregate_file(file_path, chunksize))
+    return total
@@ -0,0 +1,136 @@
+import pandas as pd
+import numpy as np
+
+from src.data_loader import iter_chunks
+
+# Біти правил; порядок у RULES - це й пріоритет для anomaly_type (перше правило, що спрацювало)
+RULE_DDOS = 1
+RULE_WRONG_TTL = 2
+RULE_WINDOW_SIZE = 4
+RULE_PACKET_SIZE = 8
+RULE_NONSTANDARD_PORT = 16
+
+RULES = [
+    (RULE_DDOS, 'ddos'),
+    (RULE_WRONG_TTL, 'misconfig:wrong_ttl'),
+    (RULE_WINDOW_SIZE, 'misconfig:window_size'),
+    (RULE_PACKET_SIZE, 'misconfig:packet_size'),
+    (RULE_NONSTANDARD_PORT, 'nonstandard_port'),
+]
+
+DDOS_PKT_RATE = 1000     # пакетів за секунду
+DDOS_MAX_DUR = 0.1       # секунд
+TTL_RANGE = (3, 253)     # допустимі TTL включно
+WINDOW_RANGE = (4, 65533)
+MIN_PKT_BYTES = 10       # середній розмір пакета для потоків із понад MIN_PKTS пакетів
+MIN_PKTS = 100
+
+SERVICE_PORTS = {
+    'http': 80, 'https': 443, 'dns': 53, 'ftp': 21, 'ssh': 22, 'smtp': 25,
+    'pop3': 110, 'imap': 143, 'telnet': 23, 'ntp': 123, 'rdp': 3389
+}
+
+# Для кожного значення маски - код типу першого правила, що спрацювало (0 - норма)
+_TYPE_CODES = np.zeros(1 << len(RULES), dtype=np.int8)
+for _mask in range(1, len(_TYPE_CODES)):
+    _TYPE_CODES[_mask] = next(i + 1 for i, (bit, _) in enumerate(RULES) if _mask & bit)
+TYPE_NAMES = [''] + [name for _, name in RULES]
+
+
+def _outside(values, lo, hi):
+    # Цілі: (v - lo) як беззнакове > (hi - lo) - одна операція замість двох порівнянь
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        unsigned = np.dtype(f'uint{values.dtype.itemsize * 8}')
+        return (values - values.dtype.type(lo)).view(unsigned) > (hi - lo)
+    return (values < lo) | (values > hi)
+
+
+def _has(chunk, *columns):
+    return all(col in chunk.columns for col in columns)
+
+
+def _service_codes(service):
+    if isinstance(service.dtype, pd.CategoricalDtype):
+        return service.cat.codes.to_numpy(), service.cat.categories
+    codes, uniques = pd.factorize(service)
+    return codes, uniques
+
+
+def port_lookup(categories):
+    # Очікуваний порт для кожного коду сервісу; -1 - сервіс без стандартного порту
+    lut = np.full(len(categories) + 1, -1, dtype=np.int32)
+    for code, name in enumerate(categories):
+        lut[code] = SERVICE_PORTS.get(name, -1)
+    return lut
+
+
+def detect(chunk):
+    """Бітова маска (uint8) усіх правил, що спрацювали для кожного рядка, за один прохід.
+
+    Правила, для яких у порції немає потрібних колонок, пропускаються.
+    """
+    mask = np.zeros(len(chunk), dtype=np.uint8)
+
+    if _has(chunk, 'spkts', 'dur'):
+        spkts = chunk['spkts'].to_numpy()
+        dur = chunk['dur'].to_numpy()
+        # spkts / dur > rate без ділення (dur >= 0); для dur == 0 збігається з оригінальним inf
+        mask |= ((spkts > DDOS_PKT_RATE * dur) & (dur < DDOS_MAX_DUR)).view(np.uint8)
+
+    if _has(chunk, 'sttl', 'dttl'):
+        fired = _outside(chunk['sttl'].to_numpy(), *TTL_RANGE) | _outside(chunk['dttl'].to_numpy(), *TTL_RANGE)
+        mask |= fired.view(np.uint8) << 1
+
+    if _has(chunk, 'swin', 'dwin'):
+        fired = _outside(chunk['swin'].to_numpy(), *WINDOW_RANGE) | _outside(chunk['dwin'].to_numpy(), *WINDOW_RANGE)
+        mask |= fired.view(np.uint8) << 2
+
+    if _has(chunk, 'spkts', 'sbytes'):
+        spkts = chunk['spkts'].to_numpy()
+        # sbytes / spkts < MIN_PKT_BYTES при spkts > MIN_PKTS, теж без ділення
+        fired = (spkts > MIN_PKTS) & (chunk['sbytes'].to_numpy() < MIN_PKT_BYTES * spkts)
+        mask |= fired.view(np.uint8) << 3
+
+    if _has(chunk, 'service', 'dst_port'):
+        codes, categories = _service_codes(chunk['service'])
+        expected = port_lookup(categories)[codes]  # код -1 (пропуск) потрапляє в останню комірку
+        fired = (expected >= 0) & (chunk['dst_port'].to_numpy() != expected)
+        mask |= fired.view(np.uint8) << 4
+
+    return mask
+
+
+def type_labels(mask):
+    # Тип за пріоритетом RULES; порожній рядок - правила не спрацювали
+    return pd.Categorical.from_codes(_TYPE_CODES[mask], categories=TYPE_NAMES)
+
+
+def rule_counts(mask):
+    # Скільки разів спрацювало кожне правило (рядок може рахуватися в кількох)
+    return pd.Series({name: int(np.count_nonzero(mask & bit)) for bit, name in RULES})
+
+
+def label(df):
+    """Повертає копію кадру з колонками anomaly, anomaly_type і anomaly_rules (маска)."""
+    mask = detect(df)
+    return df.assign(anomaly=(mask != 0).astype(np.uint8), anomaly_type=type_labels(mask),
+                     anomaly_rules=mask)
+
+
+def detect_chunks(chunks):
+    # Правила не мають стану між рядками, тож порції обробляються незалежно
+    for chunk in chunks:
+        yield label(chunk)
+
+
+def detect_file(file_path, chunksize=None):
+    """Сумарні лічильники правил для файлу будь-якого розміру, порція за порцією."""
+    totals = pd.Series(0, index=[name for _, name in RULES])
+    rows = anomalies = 0
+    for chunk in iter_chunks(file_path, chunksize):
+        mask = detect(chunk)
+        rows += len(mask)
+        anomalies += int(np.count_nonzero(mask))
+        totals += rule_counts(mask)
+    return {'rows': rows, 'anomalies': anomalies, 'rules': totals}
@@ -0,0 +1,161 @@
+import pandas as pd
+import numpy as np
+import json
+
+from src.config import NUMERIC_COLUMNS, BASELINE_GROUP_COLUMNS, BASELINE_MIN_COUNT, BASELINE_Z_THRESHOLD
+
+
+def _group_keys(df, group_columns):
+    # Коди груп рядків і відповідні ключі; кожна колонка факторизується окремо,
+    # а комбінації кодуються одним цілим, що значно швидше за MultiIndex із рядків
+    codes = np.zeros(len(df), dtype=np.int64)
+    levels = []
+    missing = np.zeros(len(df), dtype=bool)
+    for col in group_columns:
+        col_codes, uniques = pd.factorize(df[col])
+        missing |= col_codes < 0
+        codes = codes * (len(uniques) + 1) + col_codes
+        levels.append((col_codes, np.asarray(uniques, dtype=object)))
+    codes[missing] = -1
+    codes = pd.factorize(codes)[0]
+    group_rows = np.full(codes.max() + 1 if len(codes) else 0, -1, dtype=np.int64)
+    valid = codes >= 0
+    group_rows[codes[valid][::-1]] = np.flatnonzero(valid)[::-1]
+    keys = [tuple(uniques[col_codes[row]] for col_codes, uniques in levels) for row in group_rows]
+    return codes, keys
+
+
+class ServiceBaseline:
+    """Потокові середнє та дисперсія метрик для кожної групи service/proto.
+
+    Для кожної групи й колонки зберігаються кількість, середнє і сума квадратів відхилень
+    (M2). Порції й незалежні моделі об'єднуються за формулою Чана, тому оновлення коштує
+    O(розмір порції), а моделі з різних воркерів можна зливати без повторного навчання.
+    Метрики трафіку мають важкі хвости, тож за замовчуванням статистики рахуються для log1p.
+    """
+
+    def __init__(self, columns=None, group_columns=None, log_scale=True):
+        self.columns = list(columns or NUMERIC_COLUMNS)
+        self.group_columns = list(group_columns or BASELINE_GROUP_COLUMNS)
+        self.log_scale = log_scale
+        index = pd.MultiIndex.from_tuples([], names=self.group_columns)
+        self.count = pd.DataFrame(columns=self.columns, index=index, dtype='float64')
+        self.mean = self.count.copy()
+        self.m2 = self.count.copy()
+
+    def _values(self, chunk):
+        values = chunk[self.columns].to_numpy(dtype='float64')
+        if self.log_scale:
+            # Від'ємні значення (помилки вимірювання) не мають логарифма - ігноруємо їх
+            values = np.log1p(np.where(values >= 0, values, np.nan))
+        return values
+
+    def _batch_stats(self, chunk):
+        codes, uniques = _group_keys(chunk, self.group_columns)
+        values = self._values(chunk)
+        valid = ~np.isnan(values)
+        groups = len(uniques)
+        count = np.zeros((groups, len(self.columns)))
+        total = np.zeros_like(count)
+        for j in range(len(self.columns)):
+            ok = valid[:, j] & (codes >= 0)
+            count[:, j] = np.bincount(codes[ok], minlength=groups)
+            total[:, j] = np.bincount(codes[ok], weights=values[ok, j], minlength=groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        deviation = np.where(valid, values - mean[codes], 0.0)
+        m2 = np.zeros_like(count)
+        for j in range(len(self.columns)):
+            m2[:, j] = np.bincount(codes[codes >= 0], weights=deviation[codes >= 0, j] ** 2, minlength=groups)
+        index = pd.MultiIndex.from_tuples(uniques, names=self.group_columns)
+        frame = lambda data: pd.DataFrame(data, index=index, columns=self.columns)
+        return frame(count), frame(np.nan_to_num(mean)), frame(m2)
+
+    def _combine(self, count, mean, m2):
+        # Формула Чана для паралельного об'єднання (n, середнє, M2)
+        index = self.count.index.union(count.index)
+        n_a = self.count.reindex(index, fill_value=0.0)
+        mean_a = self.mean.reindex(index, fill_value=0.0)
+        m2_a = self.m2.reindex(index, fill_value=0.0)
+        n_b = count.reindex(index, fill_value=0.0)
+        mean_b = mean.reindex(index, fill_value=0.0)
+        m2_b = m2.reindex(index, fill_value=0.0)
+
+        n = n_a + n_b
+        share = (n_b / n).fillna(0.0)
+        delta = mean_b - mean_a
+        self.count = n
+        self.mean = mean_a + delta * share
+        self.m2 = m2_a + m2_b + delta ** 2 * n_a * share
+        return self
+
+    def update(self, chunk):
+        if chunk.empty:
+            return self
+        return self._combine(*self._batch_stats(chunk))
+
+    def merge(self, other):
+        return self._combine(other.count, other.mean, other.m2)
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1).clip(lower=1))
+
+    def score(self, chunk, min_count=None):
+        """z-оцінки кожної метрики відносно базової лінії групи рядка і загальна оцінка score
+        (максимальний модуль z). Рядки груп, яких немає в моделі або які замалі, отримують NaN.
+        """
+        min_count = BASELINE_MIN_COUNT if min_count is None else min_count
+        codes, uniques = _group_keys(chunk, self.group_columns)
+        positions = self.count.index.get_indexer(pd.MultiIndex.from_tuples(uniques, names=self.group_columns))
+        rows = np.where(codes >= 0, positions[codes], -1)
+
+        # Додатковий рядок NaN для невідомих груп, щоб обійтися одним take
+        def table(frame):
+            return np.vstack([frame.to_numpy(dtype='float64'), np.full((1, len(self.columns)), np.nan)])
+
+        count = table(self.count)[rows]
+        std = table(self.std())[rows]
+        mean = table(self.mean)[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (self._values(chunk) - mean) / np.where(std > 0, std, np.nan)
+        z[count < min_count] = np.nan
+        scores = pd.DataFrame(z, columns=self.columns, index=chunk.index)
+        scores['score'] = np.nanmax(np.abs(z), axis=1, initial=0.0, where=~np.isnan(z))
+        scores.loc[np.isnan(z).all(axis=1), 'score'] = np.nan
+        return scores
+
+    def score_and_update(self, chunk, threshold=None):
+        # Онлайн-режим: спершу оцінюємо за поточною моделлю, потім додаємо порцію до неї
+        threshold = BASELINE_Z_THRESHOLD if threshold is None else threshold
+        scores = self.score(chunk)
+        self.update(chunk)
+        return scores, (scores['score'] > threshold).to_numpy()
+
+    def to_dict(self):
+        return {
+            'columns': self.columns,
+            'group_columns': self.group_columns,
+            'log_scale': self.log_scale,
+            'groups': [list(key) for key in self.count.index],
+            'count': self.count.to_numpy().tolist(),
+            'mean': self.mean.to_numpy().tolist(),
+            'm2': self.m2.to_numpy().tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        model = cls(state['columns'], state['group_columns'], state['log_scale'])
+        index = pd.MultiIndex.from_tuples([tuple(key) for key in state['groups']], names=model.group_columns)
+        for name in ('count', 'mean', 'm2'):
+            data = np.asarray(state[name], dtype='float64').reshape(len(index), len(model.columns))
+            setattr(model, name, pd.DataFrame(data, index=index, columns=model.columns))
+        return model
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,393 @@
+import argparse
+import copy
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.config import ANALYSIS_COLUMNS, ARTIFACTS_DIR
+from src.data_loader import load_clean_file, file_fingerprint, geoip_fingerprint
+from src.cube import TrafficCube, measure_mean
+from src.moments import MomentCube
+from src.sketches import SketchCube
+from src.baseline import ServiceBaseline
+from src.heavy_hitters import TalkerSketches, TALKER_WEIGHTS
+from src.anomaly_detector import detect, type_labels, rule_counts
+from src.ddos_detector import detect_ddos
+from src.ip_utils import ints_to_ips
+
+MANIFEST = 'manifest.json'
+TOP_TALKERS = 20
+
+
+def artifacts_root():
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ARTIFACTS_DIR)
+
+
+def artifact_dir(file_path, root=None):
+    # data/dataset1.csv -> data/artifacts/dataset1.csv-<хеш шляху>/: однакові імена з різних
+    # каталогів (шарди dataset.py - усі part-00000.csv) не ділять один каталог
+    digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(root or artifacts_root(), f"{os.path.basename(file_path)}-{digest}")
+
+
+def source_stamp(file_path, numeric_columns=None):
+    # Артефакти дійсні лише для тієї ж версії файлу, набору колонок і бази GeoIP
+    _, mtime_ns, size = file_fingerprint(file_path)
+    stamp = {'mtime_ns': mtime_ns, 'size': size,
+             'columns': list(numeric_columns or ANALYSIS_COLUMNS), 'geoip': geoip_fingerprint()}
+    return json.loads(json.dumps(stamp))
+
+
+def _write_json(path, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False, indent=1, default=str)
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Запис і читання структур, які панель може взяти замість побудови на місці.
+# Кожен writer повертає параметри, потрібні reader-у; вони зберігаються в маніфесті.
+
+def _write_cube(directory, cube):
+    cube.cells.to_parquet(os.path.join(directory, 'cube.parquet'), index=False)
+    return {'dimensions': cube.dimensions, 'measures': cube.measures}
+
+
+def _read_cube(directory, params):
+    cells = pd.read_parquet(os.path.join(directory, 'cube.parquet'))
+    return TrafficCube(cells, params['dimensions'], params['measures'])
+
+
+def _write_moments(directory, moments):
+    moments.cells.to_parquet(os.path.join(directory, 'moments.parquet'), index=False)
+    return {'dimensions': moments.dimensions, 'columns': moments.columns, 'shift': moments.shift.tolist()}
+
+
+def _read_moments(directory, params):
+    cells = pd.read_parquet(os.path.join(directory, 'moments.parquet'))
+    return MomentCube(cells, params['dimensions'], params['columns'], np.asarray(params['shift']))
+
+
+def _write_sketches(directory, sketches):
+    sketches.cells.to_parquet(os.path.join(directory, 'sketch_cells.parquet'), index=False)
+    for col, table in sketches.tables.items():
+        table.to_parquet(os.path.join(directory, f'sketch_{col}.parquet'), index=False)
+    return {'dimensions': sketches.dimensions, 'alpha': sketches.alpha, 'columns': list(sketches.tables)}
+
+
+def _read_sketches(directory, params):
+    cells = pd.read_parquet(os.path.join(directory, 'sketch_cells.parquet'))
+    tables = {col: pd.read_parquet(os.path.join(directory, f'sketch_{col}.parquet'))
+              for col in params['columns']}
+    return SketchCube(cells, tables, params['dimensions'], params['alpha'])
+
+
+def _write_baseline(directory, baseline):
+    baseline.save(os.path.join(directory, 'baseline.json'))
+    return {}
+
+
+def _read_baseline(directory, params):
+    return ServiceBaseline.load(os.path.join(directory, 'baseline.json'))
+
+
+ARTIFACTS = {
+    'cube': (_write_cube, _read_cube),
+    'moments': (_write_moments, _read_moments),
+    'sketches': (_write_sketches, _read_sketches),
+    'baseline': (_write_baseline, _read_baseline),
+}
+
+
+def load_artifact(file_path, name, numeric_columns=None, root=None):
+    """Структура name з артефактів пакетного запуску або None, якщо їх немає чи вони застарілі."""
+    directory = artifact_dir(file_path, root)
+    try:
+        manifest = _read_json(os.path.join(directory, MANIFEST))
+        if manifest['source'] != source_stamp(file_path, numeric_columns):
+            return None
+        params = manifest['artifacts'].get(name)
+        return None if params is None else ARTIFACTS[name][1](directory, params)
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring unreadable artifacts in {directory}: {e}")
+        return None
+
+
+def build_structures(df, numeric_columns=None):
+    # Ті самі агрегати, що будує панель; повертає (структури, тривалість кожного етапу)
+    columns = list(numeric_columns or ANALYSIS_COLUMNS)
+    structures, timings = {}, {}
+
+    def timed(name, build):
+        started = time.perf_counter()
+        structures[name] = build()
+        timings[name] = time.perf_counter() - started
+
+    timed('cube', lambda: TrafficCube.build(df))
+    timed('moments', lambda: MomentCube.build(df, columns))
+    timed('sketches', lambda: SketchCube.build(df, columns))
+    model = ServiceBaseline()
+    if all(col in df.columns for col in model.columns + model.group_columns):
+        timed('baseline', lambda: model.update(df))
+    timed('talkers', lambda: TalkerSketches.build(df))
+    timed('anomaly_mask', lambda: detect(df))
+    if all(col in df.columns for col in ['dst_ip', 'src_ip', 'spkts', 'start_time']):
+        timed('ddos_targets', lambda: detect_ddos(df)[1])
+    return structures, timings
+
+
+def _readable(frame):
+    converted = {col: ints_to_ips(frame[col].to_numpy()) for col in ('src_ip', 'dst_ip')
+                 if col in frame.columns and frame[col].dtype == np.uint32}
+    return frame.assign(**converted) if converted else frame
+
+
+def summarize(structures, rows):
+    """Звіт у JSON: показники заголовка панелі, розподіли, правила аномалій і найактивніші вузли."""
+    cube = structures['cube']
+    by_proto = cube.rollup(['proto'])
+    summary = {
+        'rows': rows,
+        'sessions': int(by_proto['count'].sum()),
+        'mean_dur': float(by_proto['dur_sum'].sum() / max(by_proto['dur_n'].sum(), 1)),
+        'total_sbytes': float(by_proto['sbytes_sum'].sum()),
+        'protocols': dict(zip(by_proto['proto'].astype(str), by_proto['count'].astype(int).tolist())),
+    }
+    if 'service' in cube.dimensions:
+        by_service = cube.rollup(['service'])
+        summary['services'] = dict(zip(by_service['service'].astype(str),
+                                       by_service['count'].astype(int).tolist()))
+    if 'hour' in cube.dimensions:
+        by_hour = cube.rollup(['hour']).sort_values('hour')
+        summary['hourly'] = {
+            'hour': by_hour['hour'].astype(int).tolist(),
+            'sbytes': by_hour['sbytes_sum'].tolist(),
+            'mean_dur': measure_mean(by_hour, 'dur').tolist(),
+        }
+
+    if 'anomaly_mask' in structures:
+        mask = structures['anomaly_mask']
+        types = pd.Series(type_labels(mask)).value_counts()
+        summary['anomalies'] = {
+            'detected': int(np.count_nonzero(mask)),
+            'rules': rule_counts(mask).to_dict(),
+            'types': {name: int(count) for name, count in types.items() if name},
+        }
+    if 'ddos_targets' in structures:
+        summary['ddos_targets'] = len(structures['ddos_targets'])
+
+    talkers = structures['talkers']
+    summary['top_talkers'] = {}
+    for dimension in talkers.available():
+        for weight in TALKER_WEIGHTS:
+            top = talkers.top(dimension, weight, TOP_TALKERS)
+            if top is None:
+                continue
+            slack, cms_error, _ = talkers.error_bounds(dimension, weight)
+            summary['top_talkers'][f'{dimension}/{weight}'] = {
+                'slack': slack, 'cms_error': cms_error,
+                'rows': _readable(top).to_dict(orient='records'),
+            }
+    return summary
+
+
+def _write_artifact_files(tmp_dir, structures, summary, stamp, timings):
+    artifacts = {}
+    for name, (writer, _) in ARTIFACTS.items():
+        if name in structures:
+            artifacts[name] = writer(tmp_dir, structures[name])
+    if 'ddos_targets' in structures:
+        _readable(structures['ddos_targets']).to_parquet(os.path.join(tmp_dir, 'ddos_targets.parquet'),
+                                                         index=False)
+    _write_json(os.path.join(tmp_dir, 'summary.json'), summary)
+    _write_json(os.path.join(tmp_dir, MANIFEST), {
+        'source': stamp, 'artifacts': artifacts, 'timings': timings,
+        'created': pd.Timestamp.now().isoformat(),
+    })
+
+
+def _replace_dir(tmp_dir, directory):
+    # os.replace не підміняє непорожній каталог: старий спершу відсуваємо в унікальний каталог.
+    # Якщо інший записувач встиг поставити свій між цими кроками - повторюємо; виграє останній
+    parent = os.path.dirname(directory)
+    while True:
+        try:
+            os.replace(tmp_dir, directory)
+            return
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+        old_dir = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.', suffix='.old', dir=parent)
+        try:
+            os.replace(directory, os.path.join(old_dir, 'previous'))
+        except FileNotFoundError:
+            pass
+        finally:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def write_artifacts(directory, structures, summary, stamp, timings):
+    # Пишемо в тимчасовий каталог і підміняємо цілим, щоб панель не побачила половину запису.
+    # Тимчасовий каталог у кожного записувача свій, тож паралельні записи не чіпають чужих файлів
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.', suffix='.tmp', dir=parent)
+    try:
+        # mkdtemp створює каталог лише для власника; артефакти мають читати й інші процеси
+        os.chmod(tmp_dir, 0o755)
+        _write_artifact_files(tmp_dir, structures, summary, stamp, timings)
+        _replace_dir(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def process_file(task):
+    file_path, root, numeric_columns, keep_structures = task
+    started = time.perf_counter()
+    stamp = source_stamp(file_path, numeric_columns)
+    df = load_clean_file(file_path, numeric_columns, os.path.basename(file_path))
+    load_seconds = time.perf_counter() - started
+    structures, timings = build_structures(df, numeric_columns)
+    timings = {'load': load_seconds, **timings}
+    summary = summarize(structures, len(df))
+    directory = write_artifacts(artifact_dir(file_path, root), structures, summary, stamp, timings)
+    result = {'path': file_path, 'artifacts': directory, 'rows': len(df),
+              'seconds': time.perf_counter() - started}
+    if keep_structures:
+        # Для об'єднання в батьківському процесі - лише злиювані структури, без масок рядків
+        result['structures'] = {name: structures[name] for name in ARTIFACTS.keys() | {'talkers'}
+                                if name in structures}
+        result['summary'] = summary
+    return result
+
+
+def _schema(name, structure):
+    # Те, що має збігатися у структур різних файлів, щоб їх можна було злити
+    if name == 'cube':
+        return {'dimensions': structure.dimensions, 'measures': structure.measures}
+    if name == 'moments':
+        return {'dimensions': structure.dimensions, 'columns': list(structure.columns)}
+    if name == 'sketches':
+        return {'dimensions': structure.dimensions, 'columns': sorted(structure.tables)}
+    return None
+
+
+def check_mergeable(results):
+    """ValueError з іменами файлів, якщо структури файлів мають різні схеми (виміри, міри, колонки)."""
+    first = results[0]
+    for name, structure in first['structures'].items():
+        expected = _schema(name, structure)
+        for result in results[1:]:
+            other = result['structures'].get(name)
+            if other is None:
+                raise ValueError(f"Cannot merge {name}: {result['path']} has no {name}, "
+                                 f"{first['path']} does")
+            actual = _schema(name, other)
+            if actual != expected:
+                raise ValueError(f"Cannot merge {name}: {first['path']} has {expected}, "
+                                 f"{result['path']} has {actual}")
+    for result in results[1:]:
+        extra = result['structures'].keys() - first['structures'].keys()
+        if extra:
+            raise ValueError(f"Cannot merge {', '.join(sorted(extra))}: present in {result['path']}, "
+                             f"missing in {first['path']}")
+
+
+def merge_results(results, directory):
+    """Об'єднані артефакти кількох файлів (наприклад, сегментів одного дня) без повторного читання.
+
+    Це звіт для перегляду (summary.json і Parquet): об'єднаний набір не належить жодному
+    вхідному файлу, тож load_artifact його не підхоплює. Структури results не змінюються.
+    """
+    check_mergeable(results)
+    merged = {}
+    for result in results:
+        for name, structure in result['structures'].items():
+            # Перша структура копіюється: злиття змінює її на місці, а results лишаються результатами окремих файлів
+            merged[name] = copy.deepcopy(structure) if name not in merged else merged[name].merge(structure)
+    rows = sum(result['rows'] for result in results)
+    anomalies = {'detected': 0, 'rules': {}, 'types': {}}
+    for result in results:
+        part = result['summary']['anomalies']
+        anomalies['detected'] += part['detected']
+        for key in ('rules', 'types'):
+            for name, count in part[key].items():
+                anomalies[key][name] = anomalies[key].get(name, 0) + count
+    # Вікна DDoS можуть перетинати межі файлів, тож цілі в об'єднаний звіт не переносимо
+    summary = summarize(merged, rows)
+    summary['anomalies'] = anomalies
+    summary['sources'] = [result['path'] for result in results]
+    stamp = {'sources': [source_stamp(result['path']) for result in results]}
+    return write_artifacts(directory, merged, summary, stamp, {})
+
+
+def expand_inputs(inputs):
+    # Файли, каталоги (усі *.csv у них - наприклад, шарди dataset.py чи сегменти потоку) і шаблони
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*.csv'))))
+        elif any(ch in item for ch in '*?['):
+            paths.extend(sorted(glob.glob(item)))
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+def run(inputs, root=None, workers=None, numeric_columns=None, merge_name=None):
+    paths = expand_inputs(inputs)
+    tasks = [(path, root, list(numeric_columns or ANALYSIS_COLUMNS), merge_name is not None)
+             for path in paths]
+    if workers == 1 or len(tasks) <= 1:
+        results = [process_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_file, tasks))
+    merged = None
+    if merge_name and results:
+        merged = merge_results(results, os.path.join(root or artifacts_root(), merge_name))
+    return results, merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Пакетний розрахунок агрегатів панелі без Streamlit (JSON/Parquet-артефакти)")
+    parser.add_argument('inputs', nargs='+', help="CSV-файли, каталоги з CSV або шаблони (data/stream/*.csv)")
+    parser.add_argument('--output', default=None,
+                        help=f"каталог артефактів (за замовчуванням {ARTIFACTS_DIR})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="кількість процесів (за замовчуванням - кількість ядер)")
+    parser.add_argument('--merge', default=None, metavar='NAME',
+                        help="додатково записати об'єднані артефакти всіх файлів у <output>/NAME "
+                             "(лише звіт: панель їх не завантажує)")
+    args = parser.parse_args(argv)
+
+    try:
+        results, merged = run(args.inputs, args.output, args.workers, merge_name=args.merge)
+    except ValueError as e:
+        parser.error(str(e))
+    if not results:
+        parser.error("no input files found")
+    for result in results:
+        print(f"  {result['path']}: {result['rows']} rows, {result['seconds']:.2f} s -> {result['artifacts']}")
+    if merged:
+        print(f"Merged artifacts: {merged}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,4 +3,115 @@ PLOTS_DIR = "plots/"
 
 COLUMNS_OF_INTEREST = ['dur', 'proto', 'service', 'sbytes', 'dbytes', 'spkts', 'dpkts']
 NUMERIC_COLUMNS = ['dur', 'sbytes', 'dbytes', 'spkts', 'dpkts']
+# Числові колонки, які аналізує панель (і пакетний запуск, що готує для неї артефакти)
+ANALYSIS_COLUMNS = ['dur', 'spkts', 'dpkts', 'sbytes', 'dbytes', 'rate',
+                    'sttl', 'dttl', 'sload', 'dload', 'sloss', 'dloss',
+                    'sinpkt', 'dinpkt', 'sjit', 'djit', 'tcprtt', 'synack', 'ackdat']
 CATEGORICAL_COLUMNS = ['proto', 'service']
+
+# Скільки завантажених датасетів тримати в пам'яті (LRU)
+DATASET_CACHE_SIZE = 4
+
+# Бінарна (Feather) копія поруч із кожним CSV: data/dataset1.csv -> data/dataset1.csv.feather
+BINARY_CACHE_ENABLED = True
+BINARY_CACHE_SUFFIX = ".feather"
+
+# Компактна схема колонок трафіку, що застосовується під час завантаження.
+# Доповнює NUMERIC_COLUMNS/CATEGORICAL_COLUMNS: рядки з малою кількістю значень -> category,
+# TTL/порти/вікна -> uint8/uint16, дробові метрики -> float32, мітки часу -> datetime64.
+# Цілочисельний тип застосовується лише тоді, коли всі значення в нього вміщаються.
+# 'ip' - адреси розбираються в uint32 (IPv4) або пари uint64 <col>_hi/<col>_lo (є IPv6).
+COLUMN_DTYPES = {
+    'id': 'uint32',
+    'proto': 'category',
+    'service': 'category',
+    'state': 'category',
+    'src_country': 'category',
+    'dst_country': 'category',
+    'attack_cat': 'category',
+    'sttl': 'uint8',
+    'dttl': 'uint8',
+    'swin': 'uint16',
+    'dwin': 'uint16',
+    'src_port': 'uint16',
+    'dst_port': 'uint16',
+    'src_ip': 'ip',
+    'dst_ip': 'ip',
+    'spkts': 'uint32',
+    'dpkts': 'uint32',
+    'sbytes': 'uint32',
+    'dbytes': 'uint32',
+    'sloss': 'uint32',
+    'dloss': 'uint32',
+    'stcpb': 'uint32',
+    'dtcpb': 'uint32',
+    'is_attack': 'uint8',
+    'label': 'uint8',
+    'anomaly': 'uint8',
+    'dur': 'float32',
+    'rate': 'float32',
+    'sload': 'float32',
+    'dload': 'float32',
+    'sinpkt': 'float32',
+    'dinpkt': 'float32',
+    'sjit': 'float32',
+    'djit': 'float32',
+    'tcprtt': 'float32',
+    'synack': 'float32',
+    'ackdat': 'float32',
+    'start_time': 'datetime64[ns]',
+    'end_time': 'datetime64[ns]',
+}
+
+# Розмір порції (рядків) для потокового читання великих CSV
+CHUNK_ROWS = 500_000
+
+# Метрики, які агрегуються за країнами (вкладка геовізуалізації)
+COUNTRY_METRICS = ['sbytes', 'dbytes', 'spkts', 'dpkts', 'dur', 'sloss', 'dloss', 'sjit', 'djit']
+
+# Скільки обчислених результатів розділів панелі (графіки, згортки) тримати в пам'яті
+VIEW_CACHE_SIZE = 256
+
+# Максимум сирих точок на графік; понад це scatter/box перемикаються на агреговані подання
+PLOT_POINT_BUDGET = 20_000
+HISTOGRAM_BINS = 50
+# Кількість комірок по кожній осі для 2D-гістограми щільності замість scatter
+DENSITY_BINS = 120
+
+# Віконний детектор DDoS за ціллю (dst_ip або dst_ip + dst_port)
+DDOS_WINDOW_SECONDS = 600
+DDOS_MAX_FLOWS = 500          # з'єднань до цілі за вікно
+DDOS_MAX_PKT_RATE = 2000.0    # пакетів за секунду до цілі, усереднено за вікно
+DDOS_MAX_SOURCES = 200        # різних src_ip до цілі за вікно
+
+# Базові лінії "нормального" трафіку для кожної групи service/proto
+BASELINE_GROUP_COLUMNS = ['service', 'proto']
+BASELINE_MIN_COUNT = 30        # менші групи не оцінюються - їхня дисперсія ненадійна
+BASELINE_Z_THRESHOLD = 4.0
+
+# Найбільша кількість бінів часового ряду, що заповнюються нулями між зайнятими бінами.
+# Довший діапазон (наприклад, через одну мітку часу з 1970 року) повертається лише зайнятими бінами
+TIMESERIES_MAX_BINS = 500_000
+
+# Відносна похибка квантильних скетчів (оцінка квантиля в межах ±1% від точного значення)
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Найактивніші вузли (top-k): лічильників на скетч і розміри таблиці Count-Min
+TOPK_CAPACITY = 512
+TOPK_CMS_WIDTH = 1 << 14      # степінь двійки
+TOPK_CMS_DEPTH = 4
+
+# Локальна база GeoIP (діапазони IPv4): CSV з колонками початок, кінець, код країни ISO 3166-1
+# alpha-2 (формати DB-IP/IP2Location Lite). Межі - "a.b.c.d" або цілі числа. Якщо файлу немає,
+# колонки країн не додаються
+GEOIP_DB_PATH = "data/geoip.csv"
+
+# Результати пакетного запуску (python -m src.batch_runner): каталог на кожен вхідний файл
+ARTIFACTS_DIR = "data/artifacts"
+
+# Профілювання перезапусків панелі (src/profiling.py): журнал етапів з ротацією і файл метрик
+# у текстовому форматі Prometheus (для textfile collector). None вимикає відповідний запис
+PROFILE_LOG_PATH = "logs/profile.log"
+PROFILE_LOG_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_LOG_BACKUPS = 3
+PROFILE_METRICS_PATH = "logs/dashboard.prom"
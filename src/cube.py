@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+
+CUBE_DIMENSIONS = ['date', 'hour', 'day_of_week', 'proto', 'service', 'state',
+                   'src_country', 'dst_country', 'anomaly']
+CUBE_MEASURES = ['sbytes', 'dbytes', 'spkts', 'dpkts', 'dur', 'sloss', 'dloss', 'sjit', 'djit']
+
+
+def sum_cells(cells, dimensions):
+    # Підсумовуються лише числові міри; решта колонок, що не є вимірами, відкидається
+    values = [col for col in cells.columns
+              if col not in dimensions and pd.api.types.is_numeric_dtype(cells[col])]
+    if not dimensions:
+        return cells[values].sum().to_frame().T
+    return cells.groupby(dimensions, observed=True, sort=False, dropna=False)[values].sum().reset_index()
+
+
+def cell_codes(df, dimensions):
+    # Номер комірки для кожного рядка і кадр ключів комірок (по одному рядку на комірку)
+    codes = np.zeros(len(df), dtype=np.int64)
+    for col in dimensions:
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        # Перенумеровуємо після кожного виміру, щоб добуток кардинальностей не переповнив int64
+        codes = pd.factorize(codes * len(uniques) + col_codes)[0]
+    first_rows = np.full(codes.max() + 1 if len(codes) else 0, 0, dtype=np.int64)
+    first_rows[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    keys = df[dimensions].iloc[first_rows].reset_index(drop=True)
+    return codes, keys
+
+
+def select_cells(cells, dimensions, equals=None, time_range=None):
+    # Комірки, що відповідають фільтрам; фільтри за відсутніми вимірами ігноруються
+    mask = np.ones(len(cells), dtype=bool)
+    for col, value in (equals or {}).items():
+        if col in dimensions:
+            mask &= (cells[col] == value).to_numpy()
+    if time_range is not None and 'date' in dimensions:
+        start, end = (pd.Timestamp(t) for t in time_range)
+        mask &= ((cells['date'] >= start.normalize()) & (cells['date'] < end)).to_numpy()
+    return cells if mask.all() else cells[mask]
+
+
+class TrafficCube:
+    """Попередньо агреговані комірки за вимірами фільтрів.
+
+    Кожна комірка зберігає кількість з'єднань, суми та кількість непорожніх значень
+    кожної метрики. Будь-яку комбінацію фільтрів можна отримати згортанням комірок,
+    тому розмір куба залежить від кількості різних значень вимірів, а не від рядків.
+    """
+
+    def __init__(self, cells, dimensions, measures):
+        self.cells = cells
+        self.dimensions = dimensions
+        self.measures = measures
+
+    @classmethod
+    def build(cls, df, dimensions=None, measures=None):
+        dimensions = [d for d in (dimensions or CUBE_DIMENSIONS) if d in df.columns]
+        measures = [m for m in (measures or CUBE_MEASURES) if m in df.columns]
+        grouped = df.groupby(dimensions, observed=True, sort=False, dropna=False)
+        cells = grouped.size().rename('count').to_frame()
+        values = grouped[measures]
+        cells = cells.join(values.sum().add_suffix('_sum')).join(values.count().add_suffix('_n'))
+        return cls(cells.reset_index(), dimensions, measures)
+
+    def merge(self, other):
+        if (self.dimensions, self.measures) != (other.dimensions, other.measures):
+            raise ValueError(f"Cannot merge cubes with different schemas: dimensions {self.dimensions}, "
+                             f"measures {self.measures} vs {other.dimensions}, {other.measures}")
+        cells = pd.concat([self.cells, other.cells], ignore_index=True)
+        self.cells = sum_cells(cells, self.dimensions)
+        return self
+
+    def update(self, chunk):
+        return self.merge(TrafficCube.build(chunk, self.dimensions, self.measures))
+
+    def select(self, equals=None, time_range=None):
+        return select_cells(self.cells, self.dimensions, equals, time_range)
+
+    def rollup(self, by, equals=None, time_range=None):
+        # by - список вимірів результату; решта вимірів підсумовується
+        cells = self.select(equals, time_range).drop(columns=[d for d in self.dimensions if d not in by])
+        return sum_cells(cells, list(by))
+
+
+def measure_mean(rolled, measure):
+    return rolled[f'{measure}_sum'] / rolled[f'{measure}_n']
@@ -1,8 +1,80 @@
 import pandas as pd
+import numpy as np
+import time
 
-def clean_data(df, numeric_columns):
-    df = df.dropna()
-    for col in numeric_columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df = df.dropna()  # Після приведення типів ще раз чистимо
-    return df
+from src.profiling import span
+
+
+def _null_mask(values):
+    # Цілі та булеві колонки не можуть містити пропусків - пропускаємо їх без сканування
+    if values.dtype.kind in 'iub':
+        return None
+    return values.isna().to_numpy()
+
+
+def clean_data(df, numeric_columns, inplace=False, return_report=False):
+    timings = {}
+    rows_in = len(df)
+
+    # 1. Приводимо до чисел лише ті колонки, що ще не числові (після схеми типів їх зазвичай немає)
+    started = time.perf_counter()
+    coerced = {
+        col: pd.to_numeric(df[col], errors='coerce')
+        for col in numeric_columns
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col])
+    }
+    timings['coerce'] = time.perf_counter() - started
+
+    # 2. Одна спільна маска замість двох dropna
+    started = time.perf_counter()
+    valid = np.ones(rows_in, dtype=bool)
+    dropped_by_column = {}
+    for col in df.columns:
+        nulls = _null_mask(coerced[col] if col in coerced else df[col])
+        if nulls is None:
+            continue
+        null_count = int(nulls.sum())
+        if null_count:
+            dropped_by_column[col] = null_count
+            valid &= ~nulls
+    timings['mask'] = time.perf_counter() - started
+
+    # 3. Застосовуємо маску; якщо нічого не відкинуто і не перетворено - кадр не копіюється
+    started = time.perf_counter()
+    all_valid = bool(valid.all())
+    if inplace:
+        for col, values in coerced.items():
+            df[col] = values
+        if not all_valid:
+            df.drop(index=df.index[~valid], inplace=True)
+        result = df
+    else:
+        result = df.assign(**coerced) if coerced else df
+        if not all_valid:
+            result = result[valid]
+    timings['filter'] = time.perf_counter() - started
+
+    if not return_report:
+        return result
+    report = {
+        'rows_in': rows_in,
+        'rows_out': len(result),
+        'rows_dropped': rows_in - len(result),
+        'dropped_by_column': dropped_by_column,
+        'timings': timings,
+    }
+    return result, report
+
+
+def add_time_columns(df):
+    # Похідні часові колонки рахуються один раз, а не на кожному перезапуску панелі
+    if 'start_time' not in df.columns:
+        return df
+    with span('to_datetime', rows_in=len(df)):
+        start_time = pd.to_datetime(df['start_time'])
+    return df.assign(
+        start_time=start_time,
+        hour=start_time.dt.hour.astype('int8'),
+        day_of_week=start_time.dt.dayofweek.astype('int8'),
+        date=start_time.dt.normalize(),
+    )
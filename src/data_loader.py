@@ -1,22 +1,297 @@
 import pandas as pd
+import numpy as np
+import io
+import json
 import os
 
-def load_dataset(dataset_type='synthetic'):
+from src.cache import LRUCache
+from src.ip_utils import encode_ip_column
+from src.geoip import GeoIPResolver, add_country_columns
+from src.data_cleaner import clean_data, add_time_columns
+from src.profiling import span
+from src.config import (DATASET_CACHE_SIZE, BINARY_CACHE_ENABLED, BINARY_CACHE_SUFFIX, COLUMN_DTYPES,
+                        CHUNK_ROWS, VIEW_CACHE_SIZE, GEOIP_DB_PATH)
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # без pyarrow працюємо тільки з CSV
+    pa = None
+    feather = None
+
+# Кеш розібраних CSV між перезапусками Streamlit: ключ - (шлях, mtime, розмір),
+# тому зміна файлу на диску автоматично інвалідує запис
+_dataset_cache = LRUCache(DATASET_CACHE_SIZE)
+# Похідні структури (очищені кадри, індекси тощо) за ключем (відбиток файлу, назва)
+_derived_cache = LRUCache(DATASET_CACHE_SIZE * 8)
+# Результати розділів панелі за ключем (відбиток, стан фільтрів, розділ, параметри)
+_view_cache = LRUCache(VIEW_CACHE_SIZE)
+
+
+def _base_path():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def dataset_path(dataset_type='synthetic'):
+
+    base_path = _base_path()
+    data_path = os.path.join(base_path, "data")
 
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_path, "data") 
-    
     if dataset_type.lower() == 'real':
-        file_path = os.path.join(data_path, "dataset.csv")
-        print(f"Loading real dataset from {file_path}")
-    else:
-        file_path = os.path.join(data_path, "dataset1.csv")
-        print(f"Loading synthetic dataset from {file_path}")
-    
+        return os.path.join(data_path, "dataset.csv")
+    return os.path.join(data_path, "dataset1.csv")
+
+
+def file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def _read_time_dtypes(dtypes=None):
+    # Категорії задаємо вже в read_csv, щоб не тримати в пам'яті проміжні рядки
+    dtypes = COLUMN_DTYPES if dtypes is None else dtypes
+    return {col: dtype for col, dtype in dtypes.items() if dtype == 'category'}
+
+
+def _fits_integer(values, dtype):
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return False
+    arr = values.to_numpy()
+    if len(arr) == 0:
+        return True
+    if arr.dtype.kind == 'f':
+        if not np.isfinite(arr).all() or not (arr == np.floor(arr)).all():
+            return False
+    info = np.iinfo(dtype)
+    return arr.min() >= info.min and arr.max() <= info.max
+
+
+def apply_schema(df, dtypes=None):
+    dtypes = COLUMN_DTYPES if dtypes is None else dtypes
+    converted = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == 'ip':
+            # Рядкові адреси (~60 байт) -> uint32 (4 байти) або пари uint64 для IPv6
+            if values.dtype != np.uint32 and f'{col}_hi' not in df.columns:
+                encoded = encode_ip_column(values)
+                if encoded is not None and '' in encoded:
+                    converted[col] = encoded['']
+                elif encoded is not None:
+                    converted[col] = values.astype('category')
+                    converted.update({col + suffix: part for suffix, part in encoded.items()})
+            continue
+        if df[col].dtype == dtype:
+            continue
+        if dtype == 'category':
+            converted[col] = values.astype('category')
+        elif np.dtype(dtype).kind in 'iu':
+            # Значення поза діапазоном або з пропусками лишаємо як є - їх розбере clean_data
+            if _fits_integer(values, dtype):
+                converted[col] = values.astype(dtype)
+        elif np.dtype(dtype).kind == 'f' and pd.api.types.is_numeric_dtype(values):
+            converted[col] = values.astype(dtype)
+        elif np.dtype(dtype).kind == 'M':
+            # Нерозпізнані мітки часу стають NaT і відкидаються під час очищення
+            converted[col] = pd.to_datetime(values, errors='coerce').astype(dtype)
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def memory_report(df):
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+    })
+    report['bytes_per_row'] = report['bytes'] / max(len(df), 1)
+    report['share'] = report['bytes'] / max(report['bytes'].sum(), 1)
+    return report.sort_values('bytes', ascending=False)
+
+
+def sidecar_path(file_path):
+    return file_path + BINARY_CACHE_SUFFIX
+
+
+def _sidecar_stamp(key):
+    # Прив'язуємо бінарну копію до конкретної версії CSV і схеми типів
+    return json.dumps({'mtime_ns': key[1], 'size': key[2], 'schema': COLUMN_DTYPES},
+                      sort_keys=True).encode()
+
+
+def _open_sidecar(file_path, key):
+    # Повертає IPC reader лише для свіжої бінарної копії, інакше None
+    path = sidecar_path(file_path)
+    if feather is None or not os.path.exists(path):
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+    except (OSError, pa.ArrowException) as e:
+        print(f"Ignoring unreadable binary cache {path}: {e}")
+        return None
+    metadata = reader.schema.metadata or {}
+    if metadata.get(b'source_fingerprint') != _sidecar_stamp(key):
+        return None  # CSV змінився після конвертації
+    return reader
+
+
+def _read_sidecar(file_path, key):
+    reader = _open_sidecar(file_path, key)
+    if reader is None:
+        return None
+    try:
+        # split_blocks дозволяє числовим колонкам посилатися на memory map без копій
+        return reader.read_all().to_pandas(split_blocks=True)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Ignoring unreadable binary cache {sidecar_path(file_path)}: {e}")
+        return None
+
+
+def _write_sidecar(file_path, key, df):
+    if feather is None:
+        return
+    path = sidecar_path(file_path)
+    tmp_path = path + ".tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'source_fingerprint'] = _sidecar_stamp(key)
+        table = table.replace_schema_metadata(metadata)
+        # Без стиснення, щоб подальші читання могли працювати через memory map
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Could not write binary cache {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_source(file_path, key):
+    if BINARY_CACHE_ENABLED:
+        with span('read_binary') as s:
+            df = _read_sidecar(file_path, key)
+            s.rows_out = None if df is None else len(df)
+        if df is not None:
+            return df
+    with span('read_csv') as s:
+        df = pd.read_csv(file_path, dtype=_read_time_dtypes())
+        s.rows_out = len(df)
+    with span('apply_schema', rows_in=len(df)):
+        df = apply_schema(df)
+    if BINARY_CACHE_ENABLED:
+        with span('write_binary', rows_in=len(df)):
+            _write_sidecar(file_path, key, df)
+    return df
+
+
+def convert_to_binary(file_path):
+    # Явний крок конвертації (наприклад, після копіювання нових захоплень)
+    key = file_fingerprint(file_path)
+    if _open_sidecar(file_path, key) is not None:
+        return sidecar_path(file_path)
+    df = apply_schema(pd.read_csv(file_path, dtype=_read_time_dtypes()))
+    _write_sidecar(file_path, key, df)
+    return sidecar_path(file_path)
+
+
+def _read_csv_cached(file_path, description="dataset"):
+    key = file_fingerprint(file_path)
+    df = _dataset_cache.get(key)
+    if df is None:
+        print(f"Loading {description} from {file_path}")
+        df = _read_source(file_path, key)
+        # Старі версії того ж файлу більше не знадобляться
+        for old_key in _dataset_cache.keys():
+            if old_key[0] == key[0]:
+                _dataset_cache.pop(old_key)
+        _dataset_cache.put(key, df)
+    # Поверхнева копія: виклики можуть додавати/замінювати колонки, не чіпаючи кеш
+    return df.copy(deep=False)
+
+
+def dataset_fingerprint(dataset_type='synthetic'):
+    return file_fingerprint(dataset_path(dataset_type))
+
+
+def cached_derived(fingerprint, name, builder):
+    # Будує похідну структуру один раз для конкретної версії файлу
+    key = (fingerprint, name)
+    value = _derived_cache.get(key)
+    if value is None:
+        value = builder()
+        _derived_cache.put(key, value)
+    return value
+
+
+def cached_view(key, builder):
+    value = _view_cache.get(key)
+    if value is None:
+        value = builder()
+        _view_cache.put(key, value)
+    return value
+
+
+def clear_cache():
+    _dataset_cache.clear()
+    _derived_cache.clear()
+    _view_cache.clear()
+
+
+def load_dataset(dataset_type='synthetic'):
+
+    file_path = dataset_path(dataset_type)
+    description = "real dataset" if dataset_type.lower() == 'real' else "synthetic dataset"
+
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
-    
-    return pd.read_csv(file_path)
+
+    return _read_csv_cached(file_path, description)
+
+def geoip_path():
+    return os.path.join(_base_path(), GEOIP_DB_PATH)
+
+
+def geoip_fingerprint():
+    path = geoip_path()
+    return file_fingerprint(path) if os.path.exists(path) else None
+
+
+def load_geoip():
+    # Розібрана база GeoIP або None, якщо файлу немає; перебудовується лише після зміни файлу
+    fingerprint = geoip_fingerprint()
+    if fingerprint is None:
+        return None
+    return cached_derived(fingerprint, 'geoip', lambda: GeoIPResolver.from_csv(geoip_path()))
+
+
+def load_clean_file(file_path, numeric_columns=(), description="data"):
+    # Очищення виконується один раз на версію файлу, а не на кожен перезапуск панелі
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Data file not found: {file_path}")
+    resolver = load_geoip()
+
+    def build():
+        raw = _read_csv_cached(file_path, description)
+        with span('clean_data', rows_in=len(raw)) as s:
+            df, report = clean_data(raw, list(numeric_columns), return_report=True)
+            s.rows_out = len(df)
+        print(f"Cleaned {description}: {report['rows_in']} -> {report['rows_out']} rows")
+        df = add_time_columns(df)
+        # Країни за IP для захоплень, що містять лише адреси
+        with span('geoip', rows_in=len(df)):
+            return add_country_columns(df, resolver)
+
+    df = cached_derived(file_fingerprint(file_path),
+                        ('clean', tuple(numeric_columns), geoip_fingerprint()), build)
+    return df.copy(deep=False)
+
+
+def load_clean_dataset(dataset_type='synthetic', numeric_columns=()):
+    description = "real dataset" if dataset_type.lower() == 'real' else "synthetic dataset"
+    return load_clean_file(dataset_path(dataset_type), numeric_columns, description)
 
 def load_data(file_path=None):
 
@@ -26,4 +301,20 @@ def load_data(file_path=None):
     else:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Data file not found: {file_path}")
-        return pd.read_csv(file_path)
+        return _read_csv_cached(file_path, "data")
+
+
+def iter_chunks(file_path, chunksize=None, columns=None):
+    # Потокове читання: у пам'яті одночасно лише одна порція фіксованого розміру
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Data file not found: {file_path}")
+    reader = pd.read_csv(file_path, dtype=_read_time_dtypes(), usecols=columns,
+                         chunksize=chunksize or CHUNK_ROWS)
+    with reader:
+        for chunk in reader:
+            yield apply_schema(chunk)
+
+
+def parse_csv_block(header, block):
+    # Розбір фрагмента CSV (наприклад, нових рядків файлу, що росте) за окремо збереженим заголовком
+    return apply_schema(pd.read_csv(io.BytesIO(header + block), dtype=_read_time_dtypes()))
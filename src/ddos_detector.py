@@ -0,0 +1,206 @@
+import pandas as pd
+import numpy as np
+
+from src.config import DDOS_WINDOW_SECONDS, DDOS_MAX_FLOWS, DDOS_MAX_PKT_RATE, DDOS_MAX_SOURCES
+
+STAT_COLUMNS = ['flows', 'pkt_rate', 'sources']
+
+
+def _target_columns(by_port):
+    return ['dst_ip', 'dst_port'] if by_port else ['dst_ip']
+
+
+def _target_codes(df, by_port):
+    # Одна ціла мітка цілі замість пари (IP, порт)
+    if by_port:
+        return pd.MultiIndex.from_frame(df[['dst_ip', 'dst_port']]).factorize()[0]
+    return pd.factorize(df['dst_ip'])[0]
+
+
+def _times(df):
+    return df['start_time'].to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _count_until(events, keys, ranks, stride):
+    # Скільки подій (упакованих як ключ * stride + ранг) мають той самий ключ і ранг <= ranks
+    base = keys * stride
+    return np.searchsorted(events, base + ranks, side='right') - np.searchsorted(events, base, side='left')
+
+
+def window_stats(df, window_seconds=None, by_port=False):
+    """Статистики ковзного вікна (t - W, t] до цілі кожного з'єднання на момент його початку.
+
+    Повертає кадр з індексом df і колонками flows (з'єднань до цілі у вікні),
+    pkt_rate (пакетів за секунду у вікні) і sources (різних src_ip у вікні).
+    Час замінюється рангом серед усіх моментів, а ціль і ранг пакуються в одне int64,
+    тому все зводиться до сортувань і searchsorted - O(n log n).
+    """
+    window = int((window_seconds or DDOS_WINDOW_SECONDS) * 1_000_000_000)
+    n = len(df)
+    if n == 0:
+        return pd.DataFrame(columns=STAT_COLUMNS, index=df.index)
+    stride = n + 1
+    keys = _target_codes(df, by_port).astype(np.int64)
+    times = _times(df)
+
+    # Ранги рахуються у відсортованому за часом порядку - монотонні запити searchsorted
+    # значно швидші за довільні
+    by_time = np.argsort(times, kind='stable')
+    time_axis = times[by_time]
+    rank = np.empty(n, dtype=np.int64)
+    rank[by_time] = np.searchsorted(time_axis, time_axis, side='left')
+    # Кількість моментів <= t - W: з'єднання з рангом нижче за неї випадають з вікна
+    window_start = np.empty(n, dtype=np.int64)
+    window_start[by_time] = np.searchsorted(time_axis, time_axis - window, side='right')
+
+    # Порядок (ціль, час): вікно кожного рядка - суцільний відрізок цього порядку
+    composite = keys * stride + rank
+    order = np.argsort(composite, kind='stable')
+    composite = composite[order]
+    sorted_keys = keys[order]
+    base = sorted_keys * stride
+    end = np.searchsorted(composite, base + rank[order], side='right')
+    start = np.searchsorted(composite, base + window_start[order], side='left')
+
+    flows = end - start
+    packets = np.concatenate([[0], np.cumsum(np.nan_to_num(df['spkts'].to_numpy(dtype='float64'))[order])])
+    pkt_rate = (packets[end] - packets[start]) / (window / 1_000_000_000)
+
+    # Різні джерела: кожна пара (ціль, src_ip) "покриває" моменти [t_k, t_k + W) після
+    # кожного свого з'єднання. Зливаємо перекривні інтервали пари і рахуємо, скільки
+    # інтервалів цілі покривають момент запиту: початки <= t мінус кінці <= t
+    src = pd.factorize(df['src_ip'])[0].astype(np.int64)
+    pairs = pd.factorize(keys * (src.max() + 1) + src)[0].astype(np.int64)
+    pair_order = np.argsort(pairs * stride + rank, kind='stable')
+    pair_ids, pair_times = pairs[pair_order], times[pair_order]
+    gap_before = np.ones(n, dtype=bool)
+    gap_before[1:] = (pair_ids[1:] != pair_ids[:-1]) | (pair_times[1:] - pair_times[:-1] >= window)
+    gap_after = np.ones(n, dtype=bool)
+    gap_after[:-1] = gap_before[1:]
+
+    # Початок інтервалу - момент з'єднання (його ранг); кінець t + W <= t_q рівносильне
+    # "кількість моментів < t + W" <= ранг t_q
+    start_events = np.sort(keys[pair_order][gap_before] * stride + rank[pair_order][gap_before])
+    end_times = pair_times[gap_after] + window
+    end_events = np.sort(keys[pair_order][gap_after] * stride + np.searchsorted(time_axis, end_times, side='left'))
+    sorted_rank = rank[order]
+    sources = (_count_until(start_events, sorted_keys, sorted_rank, stride)
+               - _count_until(end_events, sorted_keys, sorted_rank, stride))
+
+    stats = np.empty((n, 3))
+    stats[order, 0] = flows
+    stats[order, 1] = pkt_rate
+    stats[order, 2] = sources
+    result = pd.DataFrame(stats, columns=STAT_COLUMNS, index=df.index)
+    return result.astype({'flows': 'int64', 'sources': 'int64'})
+
+
+def _exceeds(stats, max_flows, max_pkt_rate, max_sources):
+    return ((stats['flows'] > max_flows) | (stats['pkt_rate'] > max_pkt_rate)
+            | (stats['sources'] > max_sources))
+
+
+def detect_ddos(df, window_seconds=None, by_port=False, max_flows=None, max_pkt_rate=None,
+                max_sources=None):
+    """Пакетний режим: маска з'єднань, що прийшли до цілі під час перевищення порогів,
+    і зведення за цілями (перший/останній момент, пікові значення статистик).
+    """
+    max_flows = DDOS_MAX_FLOWS if max_flows is None else max_flows
+    max_pkt_rate = DDOS_MAX_PKT_RATE if max_pkt_rate is None else max_pkt_rate
+    max_sources = DDOS_MAX_SOURCES if max_sources is None else max_sources
+
+    stats = window_stats(df, window_seconds, by_port)
+    flagged = _exceeds(stats, max_flows, max_pkt_rate, max_sources).to_numpy()
+    target_columns = _target_columns(by_port)
+    hits = df.loc[flagged, target_columns + ['start_time']].join(stats[flagged])
+    targets = hits.groupby(target_columns, observed=True, sort=False).agg(
+        first_seen=('start_time', 'min'), last_seen=('start_time', 'max'),
+        flagged_flows=('start_time', 'size'), max_flows=('flows', 'max'),
+        max_pkt_rate=('pkt_rate', 'max'), max_sources=('sources', 'max'),
+    ).reset_index().sort_values('flagged_flows', ascending=False, ignore_index=True)
+    return flagged, targets
+
+
+class StreamingDDoSDetector:
+    """Потоковий режим на фіксованих (tumbling) вікнах, сумісний зі споживачами LiveTail.
+
+    Стан - лише відкриті вікна: лічильники на (вікно, ціль) і не більше max_sources + 1
+    різних джерел на (вікно, ціль), бо після перевищення порогу точна кількість не потрібна.
+    Вікно закривається, коли надходять дані на два вікна новіші (одне вікно на запізнення).
+    """
+
+    def __init__(self, window_seconds=None, by_port=False, max_flows=None, max_pkt_rate=None,
+                 max_sources=None):
+        self.window_seconds = window_seconds or DDOS_WINDOW_SECONDS
+        self.keys = _target_columns(by_port)
+        self.max_flows = DDOS_MAX_FLOWS if max_flows is None else max_flows
+        self.max_pkt_rate = DDOS_MAX_PKT_RATE if max_pkt_rate is None else max_pkt_rate
+        self.max_sources = DDOS_MAX_SOURCES if max_sources is None else max_sources
+        self.counts = None
+        self.sources = None
+        self.watermark = None
+        self.alerts = pd.DataFrame()
+        # Типи колонок цілі в порціях: ключі групуються як object, а в сповіщеннях типи
+        # відновлюються, щоб IP у uint32 лишались uint32 (і показувались як адреси)
+        self.key_dtypes = {}
+
+    def _window_ids(self, chunk):
+        return _times(chunk) // (self.window_seconds * 1_000_000_000)
+
+    def update(self, chunk):
+        if not all(col in chunk.columns for col in self.keys + ['src_ip', 'spkts', 'start_time']):
+            return self
+        chunk = chunk[chunk['start_time'].notna()]
+        if chunk.empty:
+            return self
+        for col in self.keys:
+            dtype = self.key_dtypes.setdefault(col, chunk[col].dtype)
+            if dtype != chunk[col].dtype:
+                self.key_dtypes[col] = np.dtype(object)
+        frame = chunk[self.keys + ['src_ip']].astype(object).assign(
+            window=self._window_ids(chunk), spkts=chunk['spkts'].to_numpy(dtype='float64'))
+        group = ['window'] + self.keys
+
+        counts = frame.groupby(group, sort=False).agg(flows=('spkts', 'size'), packets=('spkts', 'sum'))
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+        sources = frame[group + ['src_ip']].drop_duplicates()
+        if self.sources is not None:
+            sources = pd.concat([self.sources, sources], ignore_index=True).drop_duplicates()
+        self.sources = sources[sources.groupby(group, sort=False).cumcount() <= self.max_sources]
+
+        newest = int(frame['window'].max())
+        self.watermark = newest if self.watermark is None else max(self.watermark, newest)
+        self._close(lambda window: window < self.watermark - 1)
+        return self
+
+    def flush(self):
+        self._close(lambda window: window == window)
+        return self.alerts
+
+    def _close(self, is_closed):
+        if self.counts is None:
+            return
+        windows = self.counts.index.get_level_values('window')
+        closed = is_closed(windows)
+        if not closed.any():
+            return
+        done = self.counts[closed]
+        self.counts = self.counts[~closed]
+        group = ['window'] + self.keys
+        source_closed = is_closed(self.sources['window'].to_numpy())
+        distinct = self.sources[source_closed].groupby(group, sort=False).size()
+        self.sources = self.sources[~source_closed]
+
+        stats = pd.DataFrame({
+            'flows': done['flows'].astype('int64'),
+            'pkt_rate': done['packets'] / self.window_seconds,
+            'sources': distinct.reindex(done.index, fill_value=0).astype('int64'),
+        })
+        alerts = stats[_exceeds(stats, self.max_flows, self.max_pkt_rate, self.max_sources)].reset_index()
+        if alerts.empty:
+            return
+        alerts.insert(0, 'window_start', pd.to_datetime(alerts.pop('window') * self.window_seconds, unit='s'))
+        # Цілочисельні ключі (IP, порти) повертаються до свого типу; змішані лишаються object
+        alerts = alerts.astype({col: dtype for col, dtype in self.key_dtypes.items() if dtype.kind in 'iu'})
+        self.alerts = pd.concat([self.alerts, alerts], ignore_index=True)
@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+
+from src.ip_utils import IPIndex
+
+FILTER_COLUMNS = ['proto', 'service', 'state', 'anomaly']
+IP_COLUMNS = ['src_ip', 'dst_ip']
+
+
+def _smallest_int_dtype(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class FilterIndex:
+    """Індекс для фільтрів бічної панелі, що будується один раз на датасет.
+
+    Для кожної колонки зберігаються коди значень і відсортовані списки номерів рядків
+    для кожного значення, для часу - порядок рядків за start_time, для IP - відсортовані
+    адреси (IPIndex) для запитів за підмережею. select() перетинає
+    їх в один вектор номерів рядків, не створюючи проміжних кадрів.
+    """
+
+    def __init__(self, df, columns=None, time_column='start_time'):
+        self.n_rows = len(df)
+        self.codes = {}
+        self.lookup = {}
+        self.row_ids = {}
+        self.offsets = {}
+
+        for col in columns or FILTER_COLUMNS:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=True)
+            codes = codes.astype(_smallest_int_dtype(len(uniques)))
+            # Стабільне сортування кодів дає для кожного значення вже відсортовані номери рядків
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            missing = len(codes) - counts.sum()
+            self.codes[col] = codes
+            self.lookup[col] = {value: code for code, value in enumerate(uniques)}
+            self.row_ids[col] = order[missing:]
+            self.offsets[col] = np.concatenate([[0], np.cumsum(counts)])
+
+        self.ip_indexes = {}
+        for col in IP_COLUMNS:
+            index = IPIndex.for_column(df, col)
+            if index is not None:
+                self.ip_indexes[col] = index
+
+        self.times = None
+        if time_column in df.columns:
+            times = df[time_column].to_numpy(dtype='datetime64[ns]').view('int64')
+            self.times = times
+            self.time_order = np.argsort(times, kind='stable')
+            self.sorted_times = times[self.time_order]
+
+    def values(self, col):
+        return list(self.lookup.get(col, {}))
+
+    def time_bounds(self):
+        valid = self.sorted_times[self.sorted_times != np.iinfo(np.int64).min]
+        if len(valid) == 0:
+            return None
+        return pd.Timestamp(valid[0]), pd.Timestamp(valid[-1])
+
+    def rows_for(self, col, value):
+        code = self.lookup[col].get(value)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        offsets = self.offsets[col]
+        return self.row_ids[col][offsets[code]:offsets[code + 1]]
+
+    def _time_slice(self, start, end):
+        # [start, end) у наносекундах -> позиції в порядку за часом
+        lo, hi = np.searchsorted(self.sorted_times, [start, end], side='left')
+        return lo, hi
+
+    def select(self, equals=None, time_range=None, subnets=None):
+        """Повертає відсортовані номери рядків, що проходять усі фільтри, або None без фільтрів.
+
+        equals - словник {колонка: значення}; time_range - пара (початок, кінець) з
+        включним початком і виключним кінцем; subnets - словник {IP-колонка: (версія,
+        перша адреса, остання адреса)}, див. ip_utils.cidr_range.
+        """
+        equals = {col: value for col, value in (equals or {}).items() if col in self.codes}
+        subnets = {col: bounds for col, bounds in (subnets or {}).items() if col in self.ip_indexes}
+        if time_range is not None and self.times is None:
+            time_range = None
+        if not equals and time_range is None and not subnets:
+            return None
+
+        if time_range is not None:
+            start, end = (pd.Timestamp(t).value for t in time_range)
+            lo, hi = self._time_slice(start, end)
+            time_size = hi - lo
+        else:
+            time_size = self.n_rows + 1
+
+        # Починаємо з найвибірковішого фільтра, решту перевіряємо лише на його рядках
+        candidates = {col: self.rows_for(col, value) for col, value in equals.items()}
+        # Розмір вибірки підмережі відомий з двох двійкових пошуків, рядки беремо лише для базової
+        subnet_sizes = {col: self.ip_indexes[col].size(*bounds)
+                        for col, bounds in subnets.items()}
+        sizes = {**{col: len(rows) for col, rows in candidates.items()}, **subnet_sizes}
+        base_col = min(sizes, key=sizes.get, default=None)
+        if base_col is not None and sizes[base_col] <= time_size:
+            if base_col in subnets:
+                ids = self.ip_indexes[base_col].rows_in(*subnets.pop(base_col))
+            else:
+                ids = candidates.pop(base_col)
+        else:
+            ids = np.sort(self.time_order[lo:hi])
+            time_range = None
+
+        for col, rows in candidates.items():
+            if len(ids) == 0:
+                break
+            ids = ids[self.codes[col][ids] == self.lookup[col][equals[col]]]
+        for col, bounds in subnets.items():
+            if len(ids) == 0:
+                break
+            ids = ids[self.ip_indexes[col].contains(ids, *bounds)]
+        if time_range is not None and len(ids):
+            t = self.times[ids]
+            ids = ids[(t >= start) & (t < end)]
+        return ids
+
+    def take(self, df, ids):
+        return df if ids is None else df.take(ids)
@@ -0,0 +1,160 @@
+import pandas as pd
+import numpy as np
+
+from src.ip_utils import ipv4_to_int, ipv4_values
+
+# Колонки країн, що виводяться з адрес, якщо їх немає в самих даних
+COUNTRY_SOURCES = {'src_ip': 'src_country', 'dst_ip': 'dst_country'}
+# Код для адрес поза діапазонами бази (приватні мережі тощо), як у DB-IP/MaxMind
+UNKNOWN_COUNTRY = 'ZZ'
+
+# Значення таблиці блоків /24, для якого потрібен точний пошук по діапазонах
+_MIXED = -2
+_BLOCK_BITS = 8
+
+# ISO 3166-1 alpha-2 -> alpha-3 (хороплет plotly приймає alpha-3)
+_ISO_PAIRS = """
+AD AND AE ARE AF AFG AG ATG AI AIA AL ALB AM ARM AO AGO AQ ATA AR ARG AS ASM AT AUT AU AUS AW ABW
+AX ALA AZ AZE BA BIH BB BRB BD BGD BE BEL BF BFA BG BGR BH BHR BI BDI BJ BEN BL BLM BM BMU BN BRN
+BO BOL BQ BES BR BRA BS BHS BT BTN BV BVT BW BWA BY BLR BZ BLZ CA CAN CC CCK CD COD CF CAF CG COG
+CH CHE CI CIV CK COK CL CHL CM CMR CN CHN CO COL CR CRI CU CUB CV CPV CW CUW CX CXR CY CYP CZ CZE
+DE DEU DJ DJI DK DNK DM DMA DO DOM DZ DZA EC ECU EE EST EG EGY EH ESH ER ERI ES ESP ET ETH FI FIN
+FJ FJI FK FLK FM FSM FO FRO FR FRA GA GAB GB GBR GD GRD GE GEO GF GUF GG GGY GH GHA GI GIB GL GRL
+GM GMB GN GIN GP GLP GQ GNQ GR GRC GS SGS GT GTM GU GUM GW GNB GY GUY HK HKG HM HMD HN HND HR HRV
+HT HTI HU HUN ID IDN IE IRL IL ISR IM IMN IN IND IO IOT IQ IRQ IR IRN IS ISL IT ITA JE JEY JM JAM
+JO JOR JP JPN KE KEN KG KGZ KH KHM KI KIR KM COM KN KNA KP PRK KR KOR KW KWT KY CYM KZ KAZ LA LAO
+LB LBN LC LCA LI LIE LK LKA LR LBR LS LSO LT LTU LU LUX LV LVA LY LBY MA MAR MC MCO MD MDA ME MNE
+MF MAF MG MDG MH MHL MK MKD ML MLI MM MMR MN MNG MO MAC MP MNP MQ MTQ MR MRT MS MSR MT MLT MU MUS
+MV MDV MW MWI MX MEX MY MYS MZ MOZ NA NAM NC NCL NE NER NF NFK NG NGA NI NIC NL NLD NO NOR NP NPL
+NR NRU NU NIU NZ NZL OM OMN PA PAN PE PER PF PYF PG PNG PH PHL PK PAK PL POL PM SPM PN PCN PR PRI
+PS PSE PT PRT PW PLW PY PRY QA QAT RE REU RO ROU RS SRB RU RUS RW RWA SA SAU SB SLB SC SYC SD SDN
+SE SWE SG SGP SH SHN SI SVN SJ SJM SK SVK SL SLE SM SMR SN SEN SO SOM SR SUR SS SSD ST STP SV SLV
+SX SXM SY SYR SZ SWZ TC TCA TD TCD TF ATF TG TGO TH THA TJ TJK TK TKL TL TLS TM TKM TN TUN TO TON
+TR TUR TT TTO TV TUV TW TWN TZ TZA UA UKR UG UGA UM UMI US USA UY URY UZ UZB VA VAT VC VCT VE VEN
+VG VGB VI VIR VN VNM VU VUT WF WLF WS WSM YE YEM YT MYT ZA ZAF ZM ZMB ZW ZWE
+""".split()
+ISO2_TO_ISO3 = dict(zip(_ISO_PAIRS[::2], _ISO_PAIRS[1::2]))
+
+# Назви країн, які генерує dataset.py
+COUNTRY_NAME_ISO3 = {
+    'Україна': 'UKR',
+    'США': 'USA',
+    'Німеччина': 'DEU',
+    'Польща': 'POL',
+    'Франція': 'FRA',
+    'Китай': 'CHN',
+    'Велика Британія': 'GBR',
+    'Канада': 'CAN',
+    'Індія': 'IND',
+    'Японія': 'JPN',
+    'Австралія': 'AUS',
+    'Бразилія': 'BRA',
+    'Південна Корея': 'KOR',
+    'Італія': 'ITA',
+    'Іспанія': 'ESP',
+    'Нідерланди': 'NLD',
+    'Швеція': 'SWE',
+    'Сінгапур': 'SGP',
+    'Ізраїль': 'ISR',
+    'ОАЕ': 'ARE',
+}
+
+
+def country_iso3(values):
+    # Коди alpha-3 для хороплету: з назв синтетичного датасету, кодів alpha-2 або вже alpha-3
+    values = pd.Series(values, copy=False).astype(str)
+    iso3 = values.map(COUNTRY_NAME_ISO3).fillna(values.str.upper().map(ISO2_TO_ISO3))
+    known_iso3 = values.str.upper().isin(set(ISO2_TO_ISO3.values()))
+    return iso3.where(iso3.notna() | ~known_iso3, values.str.upper())
+
+
+def _parse_bounds(values):
+    # Межа діапазону: ціле число або "a.b.c.d"; IPv6 і заголовок стають некоректними
+    values = values.astype(str).str.strip()
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+    is_number = np.isfinite(numbers) & (numbers >= 0) & (numbers < 2 ** 32)
+    parsed, valid = ipv4_to_int(values.where(~is_number, ''))
+    parsed = np.where(is_number, np.nan_to_num(numbers), parsed).astype(np.uint32)
+    return parsed, valid | is_number
+
+
+class GeoIPResolver:
+    """Визначення країни за IPv4 по відсортованих діапазонах локальної бази.
+
+    Діапазони [start, end] зберігаються як відсортовані масиви uint32. Поверх них один раз
+    будується таблиця на кожен блок /24: код країни, якщо весь блок лежить в одному
+    діапазоні (чи поза всіма), або позначка змішаного блоку. Пошук колонки - одне
+    індексування таблиці; двійковий пошук (np.searchsorted) виконується лише для адрес у
+    змішаних блоках. Діапазони не повинні перетинатися.
+    """
+
+    def __init__(self, starts, ends, countries):
+        starts = np.asarray(starts, dtype=np.uint32)
+        ends = np.asarray(ends, dtype=np.uint32)
+        codes, categories = pd.factorize(pd.Series(countries, copy=False).astype(str), sort=True)
+        categories = list(categories)
+        if UNKNOWN_COUNTRY not in categories:
+            categories.append(UNKNOWN_COUNTRY)
+        self.countries = pd.Index(categories)
+        self.unknown_code = self.countries.get_loc(UNKNOWN_COUNTRY)
+
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.codes = codes[order].astype(np.int16)
+
+        block_starts = np.arange(1 << (32 - _BLOCK_BITS), dtype=np.uint32) << _BLOCK_BITS
+        self.block_codes = self._search(block_starts)
+        # Блок змішаний, якщо всередині нього (не на його початку) починається чи закінчується діапазон
+        bounds = np.concatenate([self.starts.astype(np.uint64), self.ends.astype(np.uint64) + 1])
+        bounds = bounds[(bounds < 2 ** 32) & (bounds % (1 << _BLOCK_BITS) != 0)]
+        self.block_codes[bounds >> _BLOCK_BITS] = _MIXED
+
+    @classmethod
+    def from_csv(cls, path):
+        table = pd.read_csv(path, header=None, usecols=[0, 1, 2], names=['start', 'end', 'country'],
+                            dtype=str, keep_default_na=False)
+        starts, start_ok = _parse_bounds(table['start'])
+        ends, end_ok = _parse_bounds(table['end'])
+        countries = table['country'].str.strip().str.upper()
+        countries = countries.where(countries.str.fullmatch('[A-Z]{2}'), UNKNOWN_COUNTRY)
+        valid = start_ok & end_ok & (starts <= ends)
+        return cls(starts[valid], ends[valid], countries[valid].to_numpy())
+
+    def _search(self, ips):
+        if len(self.starts) == 0:
+            return np.full(len(ips), self.unknown_code, dtype=np.int16)
+        positions = np.searchsorted(self.starts, ips, side='right') - 1
+        clipped = np.maximum(positions, 0)
+        inside = (positions >= 0) & (ips <= self.ends[clipped])
+        return np.where(inside, self.codes[clipped], self.unknown_code).astype(np.int16)
+
+    def lookup(self, ips):
+        """Коди країн (номери в self.countries) для масиву IPv4 у uint32."""
+        ips = np.asarray(ips, dtype=np.uint32)
+        codes = self.block_codes[ips >> _BLOCK_BITS]
+        mixed = np.flatnonzero(codes == _MIXED)
+        if len(mixed):
+            codes[mixed] = self._search(ips[mixed])
+        return codes
+
+    def resolve(self, ips, valid=None):
+        # Категорійна колонка країн; некоректні адреси й IPv6 - UNKNOWN_COUNTRY
+        codes = self.lookup(ips)
+        if valid is not None:
+            codes[~valid] = self.unknown_code
+        return pd.Categorical.from_codes(codes, categories=self.countries)
+
+
+def add_country_columns(df, resolver):
+    # Колонки країн з бази GeoIP додаються лише там, де їх немає в самих даних
+    if resolver is None:
+        return df
+    added = {}
+    for ip_col, country_col in COUNTRY_SOURCES.items():
+        if country_col in df.columns:
+            continue
+        values = ipv4_values(df, ip_col)
+        if values is not None:
+            added[country_col] = resolver.resolve(*values)
+    return df.assign(**added) if added else df
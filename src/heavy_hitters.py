@@ -0,0 +1,311 @@
+import copy
+
+import pandas as pd
+import numpy as np
+
+from src.config import CHUNK_ROWS, TOPK_CAPACITY, TOPK_CMS_WIDTH, TOPK_CMS_DEPTH
+from src.ip_utils import ipv4_to_int, ints_to_ips
+
+# Виміри "найактивніших вузлів" і колонки їхніх ключів
+TALKER_DIMENSIONS = {
+    'src_ip': ['src_ip'],
+    'dst_ip': ['dst_ip'],
+    'pair': ['src_ip', 'dst_ip'],
+    'dst_port': ['dst_port'],
+}
+# Ваги: кількість з'єднань або сума колонок
+TALKER_WEIGHTS = {
+    'flows': [],
+    'bytes': ['sbytes', 'dbytes'],
+    'packets': ['spkts', 'dpkts'],
+}
+_IP_COLUMNS = {'src_ip', 'dst_ip'}
+
+
+class CountMinSketch:
+    """Count-Min: оцінка ваги будь-якого ключа у фіксованій таблиці depth x width.
+
+    Оцінка ніколи не менша за справжню вагу. Хешування multiply-shift дає ймовірність
+    колізії не більше 2/width, тому завищення в одному рядку в середньому не перевищує
+    2W/width (W - сумарна вага), а мінімум по depth рядках перевищує 2e·W/width з
+    імовірністю не більше e^-depth. Таблиці з однаковими розмірами зливаються додаванням.
+    """
+
+    def __init__(self, width=None, depth=None, seed=0):
+        self.width = width or TOPK_CMS_WIDTH
+        self.depth = depth or TOPK_CMS_DEPTH
+        if self.width & (self.width - 1):
+            raise ValueError("width must be a power of two")
+        rng = np.random.default_rng(seed)
+        # Непарні множники й довільні зсуви, спільні для всіх скетчів з тим самим seed
+        self.multipliers = rng.integers(0, 1 << 64, self.depth, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.offsets = rng.integers(0, 1 << 64, self.depth, dtype=np.uint64, endpoint=False)
+        self.shift = np.uint64(64 - (self.width.bit_length() - 1))
+        self.table = np.zeros((self.depth, self.width))
+        self.total = 0.0
+
+    def _buckets(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        # Множення за модулем 2^64 - старші біти добутку і є номером кошика
+        return ((keys * self.multipliers[:, None] + self.offsets[:, None]) >> self.shift).astype(np.intp)
+
+    def update(self, keys, weights):
+        # keys можуть повторюватися; ваги одного ключа просто додаються
+        weights = np.asarray(weights, dtype='float64')
+        for row, buckets in enumerate(self._buckets(keys)):
+            self.table[row] += np.bincount(buckets, weights=weights, minlength=self.width)
+        self.total += weights.sum()
+        return self
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth) or \
+                not np.array_equal(self.multipliers, other.multipliers):
+            raise ValueError("Count-Min sketches with different hashing cannot be merged")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def estimate(self, keys):
+        buckets = self._buckets(keys)
+        return self.table[np.arange(self.depth)[:, None], buckets].min(axis=0)
+
+    def error_bound(self):
+        # Завищення, яке перевищується з імовірністю не більше e^-depth
+        return 2 * np.e * self.total / self.width
+
+
+class HeavyHitters:
+    """Найважчі ключі потоку: лічильники Misra-Gries і Count-Min для оцінок.
+
+    Зберігається не більше capacity ключів з лічильниками lower, які ніколи не
+    перевищують справжньої ваги. Справжня вага кожного ключа не більша за
+    lower + slack, де slack = (W - сума лічильників) / (capacity + 1) <= W / (capacity + 1),
+    тож будь-який ключ, важчий за slack, гарантовано відстежується (це та сама межа, що й у
+    Space-Saving). Злиття - додавання лічильників і віднімання (capacity + 1)-го найбільшого;
+    воно зберігає межі (Agarwal et al., "Mergeable Summaries"), тому порції, файли й вузли
+    обробляються окремо. Ключі з нульовим лічильником лишаються кандидатами, упорядкованими
+    за оцінкою Count-Min.
+    """
+
+    def __init__(self, capacity=None, width=None, depth=None):
+        self.capacity = capacity or TOPK_CAPACITY
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0)
+        self.total = 0.0
+        self.cms = CountMinSketch(width, depth)
+        # Вихідні значення для ключів-хешів, лише для відстежуваних ключів
+        self.labels = {}
+
+    def update(self, keys, weights=None):
+        keys = np.asarray(keys, dtype=np.uint64)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        return self.update_counts(unique, np.bincount(inverse, weights=weights, minlength=len(unique)))
+
+    def update_counts(self, keys, counts, labels=None):
+        # keys - різні ключі порції, counts - їхні сумарні ваги
+        self.cms.update(keys, counts)
+        return self._combine(keys, counts, counts.sum(), labels)
+
+    def merge(self, other):
+        self.cms.merge(other.cms)
+        return self._combine(other.keys, other.counts, other.total, other.labels)
+
+    def _combine(self, keys, counts, total, labels):
+        keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]), minlength=len(keys))
+        self.total += total
+        if len(keys) > self.capacity:
+            cut = np.partition(counts, len(counts) - self.capacity - 1)[len(counts) - self.capacity - 1]
+            # Рівні лічильники (зокрема нульові) упорядковуємо за оцінкою Count-Min
+            keep = np.lexsort((-self.cms.estimate(keys), -counts))[:self.capacity]
+            keys, counts = keys[keep], np.maximum(counts[keep] - cut, 0)
+        self.keys, self.counts = keys, counts
+        if labels or self.labels:
+            merged = {**(labels or {}), **self.labels}
+            self.labels = {key: merged[key] for key in keys.tolist() if key in merged}
+        return self
+
+    def slack(self):
+        return (self.total - self.counts.sum()) / (self.capacity + 1)
+
+    def top(self, n=20):
+        """Кадр key/lower/estimate/upper для n ключів з найбільшою оцінкою.
+
+        lower і upper - детерміновані межі справжньої ваги; estimate - оцінка Count-Min,
+        обмежена зверху upper.
+        """
+        upper = self.counts + self.slack()
+        estimate = np.maximum(np.minimum(self.cms.estimate(self.keys), upper), self.counts)
+        order = np.lexsort((-self.counts, -estimate))[:n]
+        return pd.DataFrame({
+            'key': self.keys[order],
+            'lower': self.counts[order],
+            'estimate': estimate[order],
+            'upper': upper[order],
+        })
+
+
+def _text_values(values):
+    # Однаковий текстовий запис значення, хоч би яким був тип колонки в цій порції
+    if values.name in _IP_COLUMNS and values.dtype == np.uint32:
+        return pd.Series(ints_to_ips(values.to_numpy()), index=values.index)
+    if values.dtype.kind == 'f':
+        numbers = values.to_numpy()
+        if np.all(np.isnan(numbers) | (numbers == np.floor(numbers))):
+            return values.astype('Int64').astype(str)
+    return values.astype(str)
+
+
+def key_labels(df, columns):
+    # Значення ключів-хешів у тому вигляді, з якого рахується хеш
+    return pd.DataFrame({col: _text_values(df[col]) for col in columns})
+
+
+def flow_keys(df, columns, hashed=None):
+    """Ключі uint64 для колонок і ознака того, що це хеші, а не самі значення.
+
+    Цілі колонки (IP у uint32, порти) пакуються без втрат - одна колонка як є, пара -
+    у старші й молодші 32 біти; решта (наприклад, рядкові IPv6) хешується з текстового
+    запису значень. hashed=True примусово хешує і цілі колонки.
+    """
+    values = [df[col] for col in columns]
+    if not hashed and all(v.dtype.kind in 'iu' for v in values):
+        if len(values) == 1:
+            return values[0].to_numpy().astype(np.uint64), False
+        if len(values) == 2 and all(v.dtype.itemsize <= 4 for v in values):
+            high, low = (v.to_numpy().astype(np.uint64) for v in values)
+            return (high << np.uint64(32)) | low, False
+    return pd.util.hash_pandas_object(key_labels(df, columns), index=False).to_numpy(), True
+
+
+def packed_frame(df, columns, dtypes):
+    """Колонки, приведені до цілих типів dtypes, і маска рядків, що в них вміщаються (або None).
+
+    Потрібне, коли вимір уже пакує ключі, а в порції колонка лишилась іншого типу - наприклад,
+    рядкові IP через одну некоректну адресу в блоці. Рядки без цілого значення пропускаються.
+    """
+    if all(df[col].dtype == dtypes[col] for col in columns):
+        return df, None
+    converted = {}
+    valid = np.ones(len(df), dtype=bool)
+    for col in columns:
+        values, dtype = df[col], np.dtype(dtypes[col])
+        if values.dtype == dtype:
+            converted[col] = values.to_numpy()
+            continue
+        if col in _IP_COLUMNS and values.dtype.kind not in 'iuf':
+            parsed, ok = ipv4_to_int(values)
+            numbers = parsed.astype('float64')
+        else:
+            numbers = pd.to_numeric(pd.Series(values.to_numpy(dtype=object)),
+                                    errors='coerce').to_numpy(dtype='float64')
+            ok = np.isfinite(numbers)
+            ok[ok] = numbers[ok] == np.floor(numbers[ok])
+        info = np.iinfo(dtype)
+        ok &= (numbers >= info.min) & (numbers <= info.max)
+        converted[col] = np.where(ok, numbers, 0).astype(dtype)
+        valid &= ok
+    frame = pd.DataFrame(converted)
+    return frame[valid].reset_index(drop=True), valid
+
+
+def decode_keys(keys, columns, dtypes):
+    keys = np.asarray(keys, dtype=np.uint64)
+    if len(columns) == 1:
+        return pd.DataFrame({columns[0]: keys.astype(dtypes[columns[0]])})
+    high, low = keys >> np.uint64(32), keys & np.uint64(0xFFFFFFFF)
+    return pd.DataFrame({columns[0]: high.astype(dtypes[columns[0]]),
+                         columns[1]: low.astype(dtypes[columns[1]])})
+
+
+class TalkerSketches:
+    """HeavyHitters для кожної пари (вимір, вага) з TALKER_DIMENSIONS і TALKER_WEIGHTS.
+
+    Оновлюється порціями під час завантаження або споживачем LiveTail; кожен вимір
+    групується один раз на порцію, а ваги рахуються по вже згрупованих ключах.
+    Кодування ключів виміру (упаковані цілі чи хеші) фіксується першою порцією, а
+    наступні порції приводяться до нього, навіть якщо тип колонки в них інший.
+    """
+
+    def __init__(self, capacity=None, width=None, depth=None):
+        self.params = (capacity, width, depth)
+        self.sketches = {}
+        self.dtypes = {}
+        self.hashed = {}
+
+    @classmethod
+    def build(cls, df, chunk_rows=None, **params):
+        talkers = cls(**params)
+        step = chunk_rows or CHUNK_ROWS
+        for start in range(0, len(df), step):
+            talkers.update(df.iloc[start:start + step])
+        return talkers
+
+    def update(self, chunk):
+        weights = {name: chunk[cols].sum(axis=1, min_count=1).fillna(0).to_numpy(dtype='float64')
+                   if cols else None
+                   for name, cols in TALKER_WEIGHTS.items() if all(c in chunk.columns for c in cols)}
+        for dimension, columns in TALKER_DIMENSIONS.items():
+            if len(chunk) == 0 or not all(col in chunk.columns for col in columns):
+                continue
+            keys, rows = self._keys(chunk, dimension, columns)
+            unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            labels = None
+            if self.hashed[dimension]:
+                labels = dict(zip(unique.tolist(),
+                                  key_labels(chunk.iloc[first], columns).itertuples(index=False, name=None)))
+            for name, values in weights.items():
+                sketch = self.sketches.setdefault((dimension, name), HeavyHitters(*self.params))
+                if values is not None and rows is not None:
+                    values = values[rows]
+                counts = np.bincount(inverse, weights=values, minlength=len(unique))
+                sketch.update_counts(unique, counts.astype('float64'), labels)
+        return self
+
+    def _keys(self, chunk, dimension, columns):
+        # Ключі порції в кодуванні виміру і маска рядків, для яких ключ є (None - для всіх)
+        if dimension not in self.hashed:
+            keys, hashed = flow_keys(chunk, columns)
+            self.hashed[dimension] = hashed
+            self.dtypes[dimension] = {col: chunk[col].dtype for col in columns}
+            return keys, None
+        if self.hashed[dimension]:
+            return flow_keys(chunk, columns, hashed=True)[0], None
+        frame, rows = packed_frame(chunk, columns, self.dtypes[dimension])
+        return flow_keys(frame, columns)[0], rows
+
+    def merge(self, other):
+        for dimension, hashed in other.hashed.items():
+            if self.hashed.get(dimension, hashed) != hashed:
+                raise ValueError(f"Cannot merge talker sketches for {dimension}: "
+                                 "one side packs keys, the other hashes them")
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                # Копія: подальші оновлення цього об'єкта не повинні змінювати other
+                self.sketches[key] = copy.deepcopy(sketch)
+        self.dtypes = {**other.dtypes, **self.dtypes}
+        self.hashed = {**other.hashed, **self.hashed}
+        return self
+
+    def available(self):
+        return list(dict.fromkeys(dimension for dimension, _ in self.sketches))
+
+    def top(self, dimension, weight='flows', n=20):
+        """Кадр з колонками ключа виміру і межами lower/estimate/upper (див. HeavyHitters.top)."""
+        sketch = self.sketches.get((dimension, weight))
+        if sketch is None:
+            return None
+        table = sketch.top(n)
+        columns = TALKER_DIMENSIONS[dimension]
+        if self.hashed[dimension]:
+            values = pd.DataFrame([sketch.labels[key] for key in table['key'].tolist()], columns=columns)
+        else:
+            values = decode_keys(table['key'].to_numpy(), columns, self.dtypes[dimension])
+        return pd.concat([values, table.drop(columns='key')], axis=1)
+
+    def error_bounds(self, dimension, weight='flows'):
+        # Детермінована межа (slack) і ймовірнісна межа Count-Min з імовірністю її виконання
+        sketch = self.sketches[(dimension, weight)]
+        return sketch.slack(), sketch.cms.error_bound(), 1 - np.exp(-sketch.cms.depth)
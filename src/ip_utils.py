@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+import ipaddress
+
+# Таблиці тексту для старших і молодших 16 біт IPv4: форматування без циклу по рядках
+_IP_HIGH_TEXT = np.array([f"{i >> 8}.{i & 0xFF}." for i in range(65536)], dtype=object)
+_IP_LOW_TEXT = np.array([f"{i >> 8}.{i & 0xFF}" for i in range(65536)], dtype=object)
+
+_IPV4_MAX_LEN = 15
+_DOT = ord('.')
+_ZERO = ord('0')
+# IPv4 у просторі IPv6 (::ffff:a.b.c.d) - для змішаних колонок
+_IPV4_MAPPED_HI = np.uint64(0)
+_IPV4_MAPPED_LO = np.uint64(0xFFFF << 32)
+
+
+def ints_to_ips(values):
+    # Векторне перетворення uint32 -> "a.b.c.d"
+    values = np.asarray(values, dtype=np.uint32)
+    return _IP_HIGH_TEXT[values >> 16] + _IP_LOW_TEXT[values & 0xFFFF]
+
+
+def ipv4_to_int(values):
+    """Векторний розбір рядків "a.b.c.d" у uint32 без виклику ipaddress на кожен рядок.
+
+    Повертає (адреси, маска коректних значень); некоректні рядки та пропуски дають 0 і False.
+    """
+    values = pd.Series(values, copy=False)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Розбираємо лише категорії, рядки отримують результат за кодом
+        parsed, ok = ipv4_to_int(pd.Series(values.cat.categories.astype(str)))
+        codes = values.cat.codes.to_numpy()
+        parsed, ok = np.append(parsed, np.uint32(0)), np.append(ok, False)
+        return parsed[codes], ok[codes]
+
+    text = values.where(values.notna(), '').astype(str)
+    try:
+        raw = np.array(text.to_numpy(), dtype=f'S{_IPV4_MAX_LEN + 1}')
+    except UnicodeEncodeError:
+        raw = np.array(text.str.encode('ascii', errors='replace').to_numpy(), dtype=f'S{_IPV4_MAX_LEN + 1}')
+    chars = raw.view(np.uint8).reshape(len(raw), _IPV4_MAX_LEN + 1)
+
+    result = np.zeros(len(raw), dtype=np.uint32)
+    octet = np.zeros(len(raw), dtype=np.uint32)
+    digits = np.zeros(len(raw), dtype=np.uint8)
+    dots = np.zeros(len(raw), dtype=np.uint8)
+    octets = np.zeros(len(raw), dtype=np.uint8)
+    # Рядок, довший за IPv4, заповнює всі байти без завершального нуля
+    valid = chars[:, _IPV4_MAX_LEN] == 0
+    # Символи до першого нульового байта: цифри накопичуються в октет, крапка або кінець його закриває
+    for position in range(_IPV4_MAX_LEN + 1):
+        column = chars[:, position]
+        is_digit = (column >= _ZERO) & (column <= _ZERO + 9)
+        is_dot = column == _DOT
+        closes = is_dot | (column == 0)
+        valid &= is_digit | closes
+        octet = np.where(is_digit, octet * 10 + (column - _ZERO), octet)
+        digits = np.where(is_digit, digits + 1, digits)
+        # Порожній октет (дві крапки поспіль, крапка на початку) - помилка
+        valid &= ~(is_dot & (digits == 0)) & (digits <= 3) & (octet <= 255)
+        closed = closes & (digits > 0)
+        result = np.where(closed, (result << 8) | octet, result)
+        octets += closed
+        dots += is_dot
+        octet = np.where(closes, 0, octet)
+        digits = np.where(closes, 0, digits)
+    valid &= (dots == 3) & (octets == 4)
+    return np.where(valid, result, 0).astype(np.uint32), valid
+
+
+def ips_to_pairs(values):
+    """Адреси IPv4/IPv6 як пари uint64 (старші, молодші 64 біти 128-бітного числа).
+
+    IPv4 відображаються в ::ffff:0:0/96. ipaddress викликається лише для унікальних
+    значень з двокрапкою; повертає (hi, lo, маска коректних).
+    """
+    values = pd.Series(values, copy=False)
+    v4, valid = ipv4_to_int(values)
+    hi = np.full(len(values), _IPV4_MAPPED_HI, dtype=np.uint64)
+    lo = _IPV4_MAPPED_LO | v4.astype(np.uint64)
+    text = values.astype(str)
+    is_v6 = text.str.contains(':', regex=False).to_numpy() & values.notna().to_numpy()
+    if is_v6.any():
+        codes, uniques = pd.factorize(text[is_v6])
+        parsed_hi = np.zeros(len(uniques), dtype=np.uint64)
+        parsed_lo = np.zeros(len(uniques), dtype=np.uint64)
+        parsed_ok = np.zeros(len(uniques), dtype=bool)
+        for i, address in enumerate(uniques):
+            try:
+                number = int(ipaddress.IPv6Address(address))
+            except ValueError:
+                continue
+            parsed_hi[i], parsed_lo[i], parsed_ok[i] = number >> 64, number & 0xFFFFFFFFFFFFFFFF, True
+        hi[is_v6] = parsed_hi[codes]
+        lo[is_v6] = parsed_lo[codes]
+        valid[is_v6] = parsed_ok[codes]
+    return hi, lo, valid
+
+
+def encode_ip_column(values):
+    """Компактне подання колонки IP для завантаження.
+
+    Лише IPv4 без пропусків -> {'': uint32}; є IPv6 -> {'_hi': uint64, '_lo': uint64}
+    (рядкову колонку тоді варто лишити для відображення); інакше None - колонку
+    лишаємо як є, пропуски розбере clean_data.
+    """
+    values = pd.Series(values, copy=False)
+    v4, valid = ipv4_to_int(values)
+    if valid.all():
+        return {'': v4}
+    hi, lo, valid = ips_to_pairs(values)
+    if valid.all() and (hi != _IPV4_MAPPED_HI).any():
+        return {'_hi': hi, '_lo': lo}
+    return None
+
+
+def ipv4_values(df, col):
+    """IPv4-адреси колонки в будь-якому з подань apply_schema: (uint32, маска IPv4) або None."""
+    if col not in df.columns:
+        return None
+    values = df[col]
+    if values.dtype == np.uint32:
+        return values.to_numpy(), np.ones(len(values), dtype=bool)
+    if f'{col}_hi' in df.columns:
+        hi, lo = df[f'{col}_hi'].to_numpy(), df[f'{col}_lo'].to_numpy()
+        mapped = (hi == _IPV4_MAPPED_HI) & ((lo & ~np.uint64(0xFFFFFFFF)) == _IPV4_MAPPED_LO)
+        return np.where(mapped, lo & np.uint64(0xFFFFFFFF), 0).astype(np.uint32), mapped
+    return ipv4_to_int(values)
+
+
+def cidr_range(network):
+    """Мережа "10.0.0.0/8" або "2001:db8::/32" -> (версія, перша адреса, остання адреса)."""
+    network = ipaddress.ip_network(network.strip(), strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _split128(number):
+    return np.uint64(number >> 64), np.uint64(number & 0xFFFFFFFFFFFFFFFF)
+
+
+class IPIndex:
+    """Відсортований індекс адрес для запитів за діапазоном (CIDR) двійковим пошуком.
+
+    Для uint32-колонки ключ - сама адреса; для пари hi/lo рядки впорядковані за (hi, lo),
+    а діапазон шукається спочатку за hi, потім за lo на межах.
+    """
+
+    def __init__(self, values=None, hi=None, lo=None):
+        if values is not None:
+            self.version = 4
+            self.values = np.asarray(values, dtype=np.uint32)
+            self.order = np.argsort(self.values, kind='stable')
+            self.sorted_values = self.values[self.order]
+        else:
+            self.version = 6
+            self.hi = np.asarray(hi, dtype=np.uint64)
+            self.lo = np.asarray(lo, dtype=np.uint64)
+            self.order = np.lexsort((self.lo, self.hi))
+            self.sorted_hi = self.hi[self.order]
+            self.sorted_lo = self.lo[self.order]
+
+    @classmethod
+    def for_column(cls, df, col):
+        if col in df.columns and df[col].dtype == np.uint32:
+            return cls(df[col].to_numpy())
+        if f'{col}_hi' in df.columns and f'{col}_lo' in df.columns:
+            return cls(hi=df[f'{col}_hi'].to_numpy(), lo=df[f'{col}_lo'].to_numpy())
+        return None
+
+    def _bounds(self, version, start, end):
+        # Діапазон [start, end] у ключах індексу; IPv4-мережа в IPv6-індексі - через ::ffff:0:0/96
+        if self.version == 4:
+            if version != 4:
+                return None
+            return start, end
+        if version == 4:
+            mapped = (0xFFFF << 32)
+            start, end = mapped | start, mapped | end
+        return _split128(start), _split128(end)
+
+    def _positions(self, version, start, end):
+        bounds = self._bounds(version, start, end)
+        if bounds is None:
+            return 0, 0
+        if self.version == 4:
+            lo = np.searchsorted(self.sorted_values, np.uint32(bounds[0]), side='left')
+            hi = np.searchsorted(self.sorted_values, np.uint32(bounds[1]), side='right')
+            return lo, hi
+        (start_hi, start_lo), (end_hi, end_lo) = bounds
+        first = np.searchsorted(self.sorted_hi, start_hi, side='left')
+        first_end = np.searchsorted(self.sorted_hi, start_hi, side='right')
+        lo = first + np.searchsorted(self.sorted_lo[first:first_end], start_lo, side='left')
+        last = np.searchsorted(self.sorted_hi, end_hi, side='left')
+        last_end = np.searchsorted(self.sorted_hi, end_hi, side='right')
+        hi = last + np.searchsorted(self.sorted_lo[last:last_end], end_lo, side='right')
+        return lo, max(lo, hi)
+
+    def size(self, version, start, end):
+        lo, hi = self._positions(version, start, end)
+        return hi - lo
+
+    def count(self, network):
+        return self.size(*cidr_range(network))
+
+    def rows_in(self, version, start, end):
+        # Відсортовані номери рядків з адресою в [start, end]
+        lo, hi = self._positions(version, start, end)
+        return np.sort(self.order[lo:hi])
+
+    def contains(self, ids, version, start, end):
+        # Маска для вже відібраних рядків (коли інший фільтр вибірковіший)
+        bounds = self._bounds(version, start, end)
+        if bounds is None:
+            return np.zeros(len(ids), dtype=bool)
+        if self.version == 4:
+            values = self.values[ids]
+            return (values >= bounds[0]) & (values <= bounds[1])
+        (start_hi, start_lo), (end_hi, end_lo) = bounds
+        hi, lo = self.hi[ids], self.lo[ids]
+        after_start = (hi > start_hi) | ((hi == start_hi) & (lo >= start_lo))
+        before_end = (hi < end_hi) | ((hi == end_hi) & (lo <= end_lo))
+        return after_start & before_end
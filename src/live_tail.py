@@ -0,0 +1,84 @@
+import glob
+import os
+
+from src.aggregates import TrafficAggregates
+from src.config import ANALYSIS_COLUMNS
+from src.data_cleaner import clean_data
+from src.data_loader import parse_csv_block
+
+# Скільки байтів читати за один крок, щоб не піднімати весь файл у пам'ять під час першого підключення
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+class LiveTail:
+    """Відстежує CSV-файл або каталог CSV-сегментів і подає лише нові рядки споживачам.
+
+    Кожен споживач має метод update(chunk), як TrafficAggregates, тому вартість
+    оновлення пропорційна кількості нових рядків, а не всій історії. consumers - словник
+    {назва: фабрика}, споживачі створюються тут і доступні як tail.consumers[назва].
+
+    Нові рядки проходять той самий clean_data, що й пакетне завантаження, тож живі агрегати
+    не містять рядків, які відкинула б звичайна панель. Якщо файл стає коротшим за прочитане
+    (його обрізали чи перезаписали), внесок уже прочитаних рядків не відокремити від
+    агрегатів, тому стан скидається повністю: споживачі створюються заново, а всі файли
+    перечитуються з початку. Сегменти, видалені ротацією, навпаки, лишаються в агрегатах.
+    """
+
+    def __init__(self, path, pattern='*.csv', consumers=None, numeric_columns=None):
+        self.path = path
+        self.pattern = pattern
+        self.factories = dict(consumers or {})
+        self.numeric_columns = list(ANALYSIS_COLUMNS if numeric_columns is None else numeric_columns)
+        self.last_rows = 0
+        self.reset()
+
+    def reset(self):
+        # Порожній стан: нові споживачі, усі файли читаються з початку
+        self.aggregates = TrafficAggregates()
+        self.consumers = {name: factory() for name, factory in self.factories.items()}
+        self.offsets = {}
+        self.headers = {}
+
+    def _files(self):
+        if os.path.isdir(self.path):
+            return sorted(glob.glob(os.path.join(self.path, self.pattern)))
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _read_file(self, file_path):
+        size = os.path.getsize(file_path)
+        offset = self.offsets.get(file_path, 0)
+        rows = 0
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            while offset < size:
+                block = f.read(min(BLOCK_BYTES, size - offset))
+                # Незавершений останній рядок дочитаємо наступного разу
+                end = block.rfind(b'\n') + 1
+                if end == 0:
+                    break
+                block = block[:end]
+                f.seek(offset + end)
+                offset += end
+                if file_path not in self.headers:
+                    header_end = block.index(b'\n') + 1
+                    self.headers[file_path] = block[:header_end]
+                    block = block[header_end:]
+                if block:
+                    chunk = clean_data(parse_csv_block(self.headers[file_path], block), self.numeric_columns)
+                    for consumer in [self.aggregates, *self.consumers.values()]:
+                        consumer.update(chunk)
+                    rows += len(chunk)
+        self.offsets[file_path] = offset
+        return rows
+
+    def poll(self):
+        files = self._files()
+        # Забуваємо сегменти, які видалила ротація
+        for stale in set(self.offsets) - set(files):
+            self.offsets.pop(stale)
+            self.headers.pop(stale, None)
+        # Файл обрізали або перезаписали: уже враховані рядки інакше порахувалися б двічі
+        if any(os.path.getsize(file_path) < self.offsets.get(file_path, 0) for file_path in files):
+            self.reset()
+        self.last_rows = sum(self._read_file(file_path) for file_path in files)
+        return self.last_rows
@@ -0,0 +1,121 @@
+import pandas as pd
+import numpy as np
+
+from src.config import CHUNK_ROWS
+from src.cube import sum_cells, select_cells, cell_codes
+
+# Виміри фільтрів бічної панелі: будь-яку їхню комбінацію можна зібрати з комірок
+MOMENT_DIMENSIONS = ['date', 'proto', 'service', 'state', 'anomaly']
+
+
+def _pair_names(columns):
+    rows, cols = np.triu_indices(len(columns))
+    return [f'{columns[i]}*{columns[j]}' for i, j in zip(rows, cols)], rows, cols
+
+
+def _cells_frame(keys, count, sums, products, columns, pair_names):
+    # Один суцільний блок значень замість сотень окремо вставлених колонок
+    values = pd.DataFrame(np.column_stack([count, sums, products]),
+                          columns=['count'] + list(columns) + list(pair_names))
+    return pd.concat([keys.reset_index(drop=True), values], axis=1)
+
+
+class MomentCube:
+    """Достатні статистики для кореляцій за комірками вимірів фільтрів.
+
+    Кожна комірка зберігає кількість рядків, суми колонок і суми попарних добутків
+    (верхній трикутник матриці). Значення зсуваються на загальне середнє датасету, щоб
+    різниця великих сум не з'їдала точність. Кореляційна матриця будь-якої вибірки
+    збирається підсумовуванням комірок - вартість не залежить від кількості рядків.
+    """
+
+    def __init__(self, cells, dimensions, columns, shift):
+        self.cells = cells
+        self.dimensions = dimensions
+        self.columns = columns
+        self.shift = shift
+        self.pair_names, self._rows, self._cols = _pair_names(columns)
+
+    @classmethod
+    def build(cls, df, columns, dimensions=None, shift=None, chunk_rows=None):
+        dimensions = [d for d in (dimensions or MOMENT_DIMENSIONS) if d in df.columns]
+        columns = [c for c in columns if c in df.columns]
+        if shift is None:
+            shift = np.nan_to_num(np.array([df[c].mean() for c in columns], dtype='float64'))
+        pair_names, rows, cols = _pair_names(columns)
+        codes, keys = cell_codes(df, dimensions)
+        n_cells = len(keys)
+
+        count = np.zeros(n_cells)
+        sums = np.zeros((n_cells, len(columns)))
+        products = np.zeros((n_cells, len(pair_names)))
+        step = chunk_rows or CHUNK_ROWS
+        for start in range(0, len(df), step):
+            # Порціями, щоб не тримати всю матрицю значень у float64
+            values = df[columns].iloc[start:start + step].to_numpy(dtype='float64') - shift
+            chunk_codes = codes[start:start + step]
+            # Як і в corr() після очищення: рядок враховується лише повністю заповненим
+            complete = np.isfinite(values).all(axis=1)
+            values, chunk_codes = values[complete], chunk_codes[complete]
+            count += np.bincount(chunk_codes, minlength=n_cells)
+            for j in range(len(columns)):
+                sums[:, j] += np.bincount(chunk_codes, weights=values[:, j], minlength=n_cells)
+            for t, (i, j) in enumerate(zip(rows, cols)):
+                products[:, t] += np.bincount(chunk_codes, weights=values[:, i] * values[:, j],
+                                              minlength=n_cells)
+
+        return cls(_cells_frame(keys, count, sums, products, columns, pair_names), dimensions, columns, shift)
+
+    def _reshift(self, shift):
+        # Перерахунок сум і добутків на інший зсув: x - b = (x - a) + (a - b)
+        delta = self.shift - shift
+        n = self.cells['count'].to_numpy()
+        sums = self.cells[self.columns].to_numpy()
+        products = (self.cells[self.pair_names].to_numpy()
+                    + sums[:, self._rows] * delta[self._cols]
+                    + sums[:, self._cols] * delta[self._rows]
+                    + n[:, None] * delta[self._rows] * delta[self._cols])
+        return _cells_frame(self.cells[self.dimensions], n, sums + n[:, None] * delta, products,
+                            self.columns, self.pair_names)
+
+    def merge(self, other):
+        # Порядок колонок теж важливий: від нього залежать назви добутків і _reshift
+        if (list(self.dimensions), list(self.columns)) != (list(other.dimensions), list(other.columns)):
+            raise ValueError(f"Cannot merge moment cubes with different schemas: dimensions {self.dimensions}, "
+                             f"columns {self.columns} vs {other.dimensions}, {other.columns}")
+        other_cells = other.cells if np.array_equal(other.shift, self.shift) else other._reshift(self.shift)
+        cells = pd.concat([self.cells, other_cells], ignore_index=True)
+        self.cells = sum_cells(cells, self.dimensions)
+        return self
+
+    def update(self, chunk):
+        return self.merge(MomentCube.build(chunk, self.columns, self.dimensions, self.shift))
+
+    def totals(self, equals=None, time_range=None):
+        # Кількість, вектор сум і повна матриця добутків для вибірки
+        cells = select_cells(self.cells, self.dimensions, equals, time_range)
+        n = float(cells['count'].sum())
+        sums = cells[self.columns].to_numpy().sum(axis=0)
+        upper = cells[self.pair_names].to_numpy().sum(axis=0)
+        products = np.zeros((len(self.columns), len(self.columns)))
+        products[self._rows, self._cols] = upper
+        products[self._cols, self._rows] = upper
+        return n, sums, products
+
+    def means(self, equals=None, time_range=None):
+        n, sums, _ = self.totals(equals, time_range)
+        return pd.Series(sums / n + self.shift if n else np.nan, index=self.columns)
+
+    def correlation(self, equals=None, time_range=None):
+        """Кореляційна матриця Пірсона (як DataFrame.corr()) для вибірки за фільтрами."""
+        n, sums, products = self.totals(equals, time_range)
+        k = len(self.columns)
+        if n < 2:
+            return pd.DataFrame(np.full((k, k), np.nan), index=self.columns, columns=self.columns)
+        mean = sums / n
+        covariance = products / n - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = covariance / np.outer(std, std)
+        corr = np.clip(np.where(np.outer(std, std) > 0, corr, np.nan), -1, 1)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
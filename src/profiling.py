@@ -0,0 +1,275 @@
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+from src.config import PROFILE_LOG_PATH, PROFILE_LOG_MAX_BYTES, PROFILE_LOG_BACKUPS, PROFILE_METRICS_PATH
+
+# Профайлер поточного перезапуску; кожен сеанс Streamlit виконується у своєму потоці
+_current = contextvars.ContextVar('profiler', default=None)
+_run_ids = itertools.count(1)
+
+# Накопичені за життя процесу значення для файлу метрик
+_metrics_lock = threading.Lock()
+_totals = {}
+_runs_total = 0
+_logger_lock = threading.Lock()
+
+# tracemalloc один на процес: трасування вмикається для першого користувача і вимикається після
+# останнього, а перезапуски з вимірюванням пам'яті виконуються по одному, бо reset_peak
+# скидає спільний пік
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+_traced_run_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        # Трасування, увімкнене не нами (python -X tracemalloc), не вимикаємо
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class Span:
+    """Один етап перезапуску: час, рядки на вході й виході і пам'ять.
+
+    allocated - приріст пам'яті, що лишилася виділеною після етапу, peak - найбільше
+    перевищення над рівнем на початку етапу; обидва None, якщо пам'ять не вимірювалась.
+    """
+
+    __slots__ = ('name', 'depth', 'rows_in', 'rows_out', 'seconds', 'allocated', 'peak',
+                 '_memory_start', '_child_peak')
+
+    def __init__(self, name, depth=0, rows_in=None):
+        self.name = name
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = None
+        self.allocated = None
+        self.peak = None
+        self._memory_start = 0
+        self._child_peak = 0
+
+    def as_dict(self):
+        return {'span': self.name, 'depth': self.depth, 'seconds': self.seconds,
+                'rows_in': self.rows_in, 'rows_out': self.rows_out,
+                'allocated_bytes': self.allocated, 'peak_bytes': self.peak}
+
+
+class Profiler:
+    """Етапи одного перезапуску панелі у порядку виконання (вкладені мають більшу глибину).
+
+    Пам'ять вимірюється через tracemalloc лише з trace_memory=True: трасування помітно
+    сповільнює pandas, тому вмикається тільки на час перезапуску з увімкненою панеллю.
+    tracemalloc бачить виділення numpy і Python, але не пули Arrow.
+
+    tracemalloc спільний для всього процесу, тож перезапуски з вимірюванням пам'яті різних
+    сеансів виконуються по черзі (інакше reset_peak одного сеансу стирав би пік іншого).
+    Виділення інших потоків, що працюють одночасно без вимірювання, теж потрапляють у цифри
+    пам'яті - на завантаженому сервері вони орієнтовні.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.run_id = next(_run_ids)
+        self.trace_memory = trace_memory
+        self.spans = []
+        self._stack = []
+
+    @contextmanager
+    def activate(self):
+        # Робить профайлер поточним для span() у цьому потоці
+        if self.trace_memory:
+            _traced_run_lock.acquire()
+            _start_tracing()
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+            if self.trace_memory:
+                _stop_tracing()
+                _traced_run_lock.release()
+
+    @contextmanager
+    def span(self, name, rows_in=None):
+        span = Span(name, len(self._stack), rows_in)
+        self.spans.append(span)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Пік скидається для вкладеного етапу, тож батьківський запам'ятовує свій до цього моменту
+            if self._stack:
+                self._stack[-1]._child_peak = max(self._stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+            span._memory_start = current
+        self._stack.append(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - started
+            self._stack.pop()
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, span._child_peak)
+                span.allocated = current - span._memory_start
+                span.peak = max(peak - span._memory_start, 0)
+                if self._stack:
+                    self._stack[-1]._child_peak = max(self._stack[-1]._child_peak, peak)
+
+    def table(self):
+        return pd.DataFrame([span.as_dict() for span in self.spans],
+                            columns=['span', 'depth', 'seconds', 'rows_in', 'rows_out',
+                                     'allocated_bytes', 'peak_bytes'])
+
+
+def span(name, rows_in=None):
+    """Етап поточного перезапуску; без активного профайлера (пакетний запуск, фрагменти) нічого не міряє.
+
+    Контекст повертає Span, якому можна задати rows_out:
+
+        with span('clean_data', rows_in=len(df)) as s:
+            df = clean_data(df, columns)
+            s.rows_out = len(df)
+    """
+    profiler = _current.get()
+    if profiler is None:
+        return nullcontext(Span(name, rows_in=rows_in))
+    return profiler.span(name, rows_in)
+
+
+def _resolve(path):
+    # Відносні шляхи - від кореня проєкту, як і шляхи до даних
+    if path is None or os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+
+
+def _profile_logger():
+    logger = logging.getLogger('dashboard.profile')
+    with _logger_lock:
+        if not logger.handlers:
+            path = _resolve(PROFILE_LOG_PATH)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=PROFILE_LOG_MAX_BYTES,
+                                          backupCount=PROFILE_LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    # Лічильники - цілими, секунди - з мікросекундною точністю
+    return str(value) if isinstance(value, int) else f"{value:.6f}"
+
+
+def _metric_lines(name, kind, help_text, values):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f'{name}{{span="{_label(stage)}"}} {_number(value)}' for stage, value in values.items()
+              if value is not None]
+    return lines
+
+
+def _write_metrics(path):
+    # Формат textfile collector (node_exporter): файл замінюється цілком, атомарно
+    last = {key: {stage: totals['last'][key] for stage, totals in _totals.items()}
+            for key in ('seconds', 'rows_in', 'rows_out', 'allocated', 'peak')}
+    lines = [
+        "# HELP dashboard_runs_total Profiled dashboard reruns.",
+        "# TYPE dashboard_runs_total counter",
+        f"dashboard_runs_total {_runs_total}",
+    ]
+    lines += _metric_lines('dashboard_span_seconds_total', 'counter', "Wall time spent in the span.",
+                           {stage: totals['seconds'] for stage, totals in _totals.items()})
+    lines += _metric_lines('dashboard_span_calls_total', 'counter', "Times the span was entered.",
+                           {stage: totals['calls'] for stage, totals in _totals.items()})
+    lines += _metric_lines('dashboard_span_last_seconds', 'gauge',
+                           "Wall time of the span in the latest rerun that entered it.", last['seconds'])
+    lines += _metric_lines('dashboard_span_last_rows_in', 'gauge',
+                           "Rows into the span in the latest rerun that entered it.", last['rows_in'])
+    lines += _metric_lines('dashboard_span_last_rows_out', 'gauge',
+                           "Rows out of the span in the latest rerun that entered it.", last['rows_out'])
+    lines += _metric_lines('dashboard_span_last_allocated_bytes', 'gauge',
+                           "Memory left allocated by the span in the latest traced rerun that entered it.", last['allocated'])
+    lines += _metric_lines('dashboard_span_last_peak_bytes', 'gauge',
+                           "Peak memory above the span start in the latest traced rerun that entered it.", last['peak'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+def _update_totals(profiler):
+    global _runs_total
+    _runs_total += 1
+    # Етап, що викликався кілька разів за перезапуск (наприклад, графіки), підсумовується
+    current = {}
+    for s in profiler.spans:
+        entry = current.setdefault(s.name, {'seconds': 0.0, 'calls': 0, 'rows_in': None, 'rows_out': None,
+                                            'allocated': None, 'peak': None})
+        entry['seconds'] += s.seconds or 0.0
+        entry['calls'] += 1
+        for key, value in (('rows_in', s.rows_in), ('rows_out', s.rows_out), ('allocated', s.allocated)):
+            if value is not None:
+                entry[key] = (entry[key] or 0) + value
+        if s.peak is not None:
+            entry['peak'] = max(entry['peak'] or 0, s.peak)
+    for name, entry in current.items():
+        totals = _totals.setdefault(name, {'seconds': 0.0, 'calls': 0, 'last': None})
+        totals['seconds'] += entry['seconds']
+        totals['calls'] += entry['calls']
+        previous = totals['last'] or {}
+        # Пам'ять з перезапуску без трасування не затирає останнього виміряного значення
+        if entry['allocated'] is None:
+            entry['allocated'], entry['peak'] = previous.get('allocated'), previous.get('peak')
+        totals['last'] = entry
+
+
+def export(profiler):
+    """Записує етапи перезапуску в журнал з ротацією і оновлює файл метрик Prometheus.
+
+    Шляхи - PROFILE_LOG_PATH і PROFILE_METRICS_PATH з конфігурації; None вимикає запис.
+    Помилки запису лише виводяться: профілювання не повинно ламати панель.
+    """
+    if not profiler.spans:
+        return
+    try:
+        if PROFILE_LOG_PATH is not None:
+            logger = _profile_logger()
+            for s in profiler.spans:
+                logger.info(json.dumps({'run': profiler.run_id, **s.as_dict()}, ensure_ascii=False))
+        with _metrics_lock:
+            _update_totals(profiler)
+            if PROFILE_METRICS_PATH is not None:
+                _write_metrics(_resolve(PROFILE_METRICS_PATH))
+    except OSError as e:
+        print(f"Could not export profile: {e}")
@@ -0,0 +1,147 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from src.config import PLOT_POINT_BUDGET, HISTOGRAM_BINS, DENSITY_BINS
+
+
+def _is_sketch(values):
+    # Замість сирих значень можна передати квантильний скетч (src.sketches.QuantileSketch)
+    return hasattr(values, 'box_stats')
+
+
+def _finite(values):
+    values = np.asarray(values, dtype='float64')
+    return values[np.isfinite(values)]
+
+
+def box_stats(values):
+    """Статистики коробкового графіка (як у plotly: лінійні квартилі, вуса за 1.5 IQR)."""
+    values = _finite(values)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': [q1], 'median': [median], 'q3': [q3],
+        'lowerfence': [inside.min()], 'upperfence': [inside.max()],
+        'mean': [values.mean()],
+    }
+
+
+def box_trace(values, name, orientation='v', budget=None, **kwargs):
+    # Малі вибірки передаємо як є (зі зображенням викидів), великі та скетчі - лише п'ятьма числами
+    axis = 'y' if orientation == 'v' else 'x'
+    position = 'x' if orientation == 'v' else 'y'
+    if _is_sketch(values):
+        stats = values.box_stats() or {}
+        return go.Box(**{position: [name]}, name=name, orientation=orientation, boxpoints=False,
+                      **stats, **kwargs)
+    values = np.asarray(values)
+    if len(values) <= (budget or PLOT_POINT_BUDGET):
+        return go.Box(**{axis: values}, name=name, orientation=orientation, **kwargs)
+    stats = box_stats(values) or {}
+    return go.Box(**{position: [name]}, name=name, orientation=orientation, boxpoints=False,
+                  **stats, **kwargs)
+
+
+def box_figure(groups, x, y, labels=None, title=None, budget=None):
+    """Аналог px.box(df, x=x, y=y, color=x) з агрегацією кожної групи на сервері.
+
+    groups - пари (значення x, значення y або скетч), наприклад df.groupby(x)[y] чи
+    SketchCube.sketches(y, by=x).items().
+    """
+    labels = labels or {}
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, (name, values) in enumerate(groups):
+        fig.add_trace(box_trace(values, str(name), budget=budget,
+                                marker_color=colors[i % len(colors)]))
+    fig.update_layout(title=title, xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+                      legend_title_text=labels.get(x, x))
+    return fig
+
+
+def histogram_figure(groups, nbins=None, marginal_box=False, barmode='relative', opacity=None,
+                     budget=None):
+    """Гістограма, біни якої рахуються на сервері: у браузер іде лише nbins стовпців на групу.
+
+    groups - список (назва, значення або скетч, колір); усі групи мають спільні межі бінів.
+    """
+    groups = [(name, values if _is_sketch(values) else _finite(values), color)
+              for name, values, color in groups]
+    bounds = [values.bounds() if _is_sketch(values) else (values.min(), values.max())
+              for _, values, _ in groups if len(values)]
+    if not bounds:
+        edges = np.array([0.0, 1.0])
+    else:
+        lo, hi = min(b[0] for b in bounds), max(b[1] for b in bounds)
+        edges = np.histogram_bin_edges([lo, hi], bins=nbins or HISTOGRAM_BINS)
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
+
+    if marginal_box:
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8],
+                            vertical_spacing=0.02)
+        bar_cell = dict(row=2, col=1)
+    else:
+        fig = go.Figure()
+        bar_cell = {}
+
+    for name, values, color in groups:
+        counts = values.histogram(edges) if _is_sketch(values) else np.histogram(values, bins=edges)[0]
+        fig.add_trace(go.Bar(x=centers, y=counts, width=widths, name=name, legendgroup=name,
+                             marker_color=color, opacity=opacity), **bar_cell)
+        if marginal_box:
+            fig.add_trace(box_trace(values, name, orientation='h', budget=budget, marker_color=color,
+                                    legendgroup=name, showlegend=False), row=1, col=1)
+    fig.update_layout(barmode=barmode, bargap=0)
+    return fig
+
+
+def density_figure(x_values, y_values, log_x=False, log_y=False, bins=None):
+    # 2D-гістограма щільності; на логарифмічних осях біни рівномірні в log10
+    xs = np.asarray(x_values, dtype='float64')
+    ys = np.asarray(y_values, dtype='float64')
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    if log_x:
+        valid &= xs > 0
+    if log_y:
+        valid &= ys > 0
+    xs, ys = xs[valid], ys[valid]
+    if log_x:
+        xs = np.log10(xs)
+    if log_y:
+        ys = np.log10(ys)
+
+    if len(xs) == 0:
+        return go.Figure()
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=bins or DENSITY_BINS)
+    if log_x:
+        x_edges = 10 ** x_edges
+    if log_y:
+        y_edges = 10 ** y_edges
+    counts = counts.T
+    # Порожні комірки прозорі, кольорова шкала логарифмічна, бо щільність різниться на порядки
+    z = np.where(counts > 0, np.log10(np.maximum(counts, 1)), np.nan)
+    fig = go.Figure(go.Heatmap(x=x_edges, y=y_edges, z=z, customdata=counts,
+                               colorscale='Viridis', colorbar=dict(title='log10(к-сть)'),
+                               hovertemplate='x=%{x}<br>y=%{y}<br>кількість=%{customdata}<extra></extra>'))
+    fig.update_xaxes(type='log' if log_x else 'linear')
+    fig.update_yaxes(type='log' if log_y else 'linear')
+    return fig
+
+
+def scatter_figure(df, x, y, color=None, size=None, hover_name=None, log_x=False, log_y=False,
+                   labels=None, title=None, budget=None, bins=None):
+    """px.scatter у межах бюджету точок (через WebGL), понад нього - карта щільності."""
+    labels = labels or {}
+    if len(df) <= (budget or PLOT_POINT_BUDGET):
+        return px.scatter(df, x=x, y=y, color=color, size=size, hover_name=hover_name,
+                          log_x=log_x, log_y=log_y, labels=labels, title=title, render_mode='webgl')
+    fig = density_figure(df[x], df[y], log_x, log_y, bins)
+    fig.update_layout(title=f"{title} (щільність, {len(df):,} з'єднань)" if title else None,
+                      xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
@@ -0,0 +1,201 @@
+import pandas as pd
+import numpy as np
+
+from src.config import SKETCH_RELATIVE_ACCURACY
+from src.cube import select_cells, cell_codes
+
+SKETCH_DIMENSIONS = ['date', 'proto', 'service', 'state', 'anomaly', 'anomaly_type']
+
+# Ключ бакета: 0 - нуль, ±(BIAS + b) - додатні/від'ємні значення в бакеті b логарифмічної шкали
+_BIAS = 1 << 20
+_KEY_OFFSET = 1 << 21
+_KEY_SPAN = 1 << 22
+_ZERO_THRESHOLD = 1e-9
+
+
+def _gamma(alpha):
+    return (1 + alpha) / (1 - alpha)
+
+
+def value_keys(values, alpha=None):
+    # Бакет b містить |x| з (gamma^(b-1), gamma^b]; будь-яке значення бакета відрізняється
+    # від його представника 2 * gamma^b / (gamma + 1) не більше ніж на alpha відносно
+    log_gamma = np.log(_gamma(alpha or SKETCH_RELATIVE_ACCURACY))
+    values = np.asarray(values, dtype='float64')
+    magnitude = np.abs(values)
+    nonzero = magnitude > _ZERO_THRESHOLD
+    buckets = np.ceil(np.log(np.where(nonzero, magnitude, 1.0)) / log_gamma).astype(np.int64)
+    return np.where(nonzero, np.sign(values).astype(np.int64) * (buckets + _BIAS), 0)
+
+
+def key_values(keys, alpha=None):
+    gamma = _gamma(alpha or SKETCH_RELATIVE_ACCURACY)
+    keys = np.asarray(keys, dtype=np.int64)
+    buckets = np.abs(keys) - _BIAS
+    return np.where(keys == 0, 0.0, np.sign(keys) * 2 * gamma ** buckets.astype('float64') / (gamma + 1))
+
+
+def _sum_by_key(keys, counts):
+    unique_keys, positions = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(positions, weights=counts, minlength=len(unique_keys))
+
+
+class QuantileSketch:
+    """Квантильний скетч з логарифмічними бакетами (у стилі DDSketch).
+
+    Будь-який квантиль повертається з відносною похибкою не більше alpha від точного
+    значення відповідного рангу. Об'єднання - це додавання лічильників однакових бакетів,
+    тому скетчі з різних порцій, файлів чи вузлів зливаються без втрати точності.
+    """
+
+    def __init__(self, keys, counts, alpha=None):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype='float64')
+        self.alpha = alpha or SKETCH_RELATIVE_ACCURACY
+
+    @classmethod
+    def from_values(cls, values, alpha=None):
+        values = np.asarray(values, dtype='float64')
+        keys = value_keys(values[np.isfinite(values)], alpha)
+        return cls(*_sum_by_key(keys, np.ones(len(keys))), alpha)
+
+    @property
+    def count(self):
+        return self.counts.sum()
+
+    def __len__(self):
+        return int(self.count)
+
+    def merge(self, other):
+        keys = np.concatenate([self.keys, other.keys])
+        counts = np.concatenate([self.counts, other.counts])
+        self.keys, self.counts = _sum_by_key(keys, counts)
+        return self
+
+    def values(self):
+        return key_values(self.keys, self.alpha)
+
+    def quantile(self, q):
+        # Ранг як у DDSketch: найменший бакет, накопичена кількість якого перевищує q * (n - 1)
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        cumulative = np.cumsum(self.counts)
+        positions = np.searchsorted(cumulative, np.asarray(q) * (self.count - 1), side='right')
+        return self.values()[np.minimum(positions, len(self.keys) - 1)]
+
+    def bounds(self):
+        if self.count == 0:
+            return np.nan, np.nan
+        values = self.values()
+        return values[0], values[-1]
+
+    def clip(self, upper):
+        # Скетч значень min(x, upper): бакети вище межі переносяться в бакет самої межі
+        upper_key = value_keys([upper], self.alpha)[0]
+        keys = np.minimum(self.keys, upper_key)
+        return QuantileSketch(*_sum_by_key(keys, self.counts), self.alpha)
+
+    def box_stats(self):
+        """Статистики коробкового графіка (квартилі й вуса за 1.5 IQR) зі скетча."""
+        if self.count == 0:
+            return None
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        values = self.values()
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        mean = np.dot(values, self.counts) / self.count
+        return {
+            'q1': [q1], 'median': [median], 'q3': [q3],
+            'lowerfence': [inside.min()], 'upperfence': [inside.max()],
+            'mean': [mean],
+        }
+
+    def histogram(self, edges):
+        # Кожен бакет іде в бін свого представника; похибка - лише на межах бінів
+        positions = np.searchsorted(edges, self.values(), side='right') - 1
+        # Правий край останнього біна включно, як у np.histogram
+        positions[self.values() == edges[-1]] = len(edges) - 2
+        valid = (positions >= 0) & (positions < len(edges) - 1)
+        return np.bincount(positions[valid], weights=self.counts[valid], minlength=len(edges) - 1)
+
+
+class SketchCube:
+    """Квантильні скетчі кожної числової колонки за комірками вимірів фільтрів.
+
+    Для кожної колонки зберігається таблиця (комірка, бакет, кількість), тож пам'ять
+    залежить від кількості комірок і зайнятих бакетів, а не рядків. Скетч будь-якої
+    вибірки і групи збирається підсумовуванням бакетів вибраних комірок.
+    """
+
+    def __init__(self, cells, tables, dimensions, alpha):
+        self.cells = cells
+        self.tables = tables
+        self.dimensions = dimensions
+        self.alpha = alpha
+
+    @classmethod
+    def build(cls, df, columns, dimensions=None, alpha=None):
+        alpha = alpha or SKETCH_RELATIVE_ACCURACY
+        dimensions = [d for d in (dimensions or SKETCH_DIMENSIONS) if d in df.columns]
+        codes, cells = cell_codes(df, dimensions)
+        tables = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = df[col].to_numpy(dtype='float64')
+            finite = np.isfinite(values)
+            # Пара (комірка, бакет) пакується в одне int64 - підрахунок одним np.unique
+            packed = codes[finite] * _KEY_SPAN + value_keys(values[finite], alpha) + _KEY_OFFSET
+            packed, counts = np.unique(packed, return_counts=True)
+            tables[col] = pd.DataFrame({
+                'cell': (packed // _KEY_SPAN).astype(np.int32),
+                'key': (packed % _KEY_SPAN - _KEY_OFFSET).astype(np.int32),
+                'count': counts.astype(np.int64),
+            })
+        return cls(cells, tables, dimensions, alpha)
+
+    def merge(self, other):
+        if list(self.dimensions) != list(other.dimensions) or sorted(self.tables) != sorted(other.tables):
+            raise ValueError(f"Cannot merge sketch cubes with different schemas: dimensions {self.dimensions}, "
+                             f"columns {sorted(self.tables)} vs {other.dimensions}, {sorted(other.tables)}")
+        if self.alpha != other.alpha:
+            raise ValueError(f"Cannot merge sketch cubes with different accuracy: {self.alpha} vs {other.alpha}")
+        # Спільна нумерація комірок обох кубів, потім додавання лічильників однакових бакетів
+        codes, cells = cell_codes(pd.concat([self.cells, other.cells], ignore_index=True), self.dimensions)
+        mine, theirs = codes[:len(self.cells)], codes[len(self.cells):]
+        tables = {}
+        for col in self.tables.keys() | other.tables.keys():
+            parts = []
+            for table, mapping in ((self.tables.get(col), mine), (other.tables.get(col), theirs)):
+                if table is not None:
+                    parts.append(table.assign(cell=mapping[table['cell'].to_numpy()].astype(np.int32)))
+            tables[col] = (pd.concat(parts, ignore_index=True)
+                           .groupby(['cell', 'key'], sort=True).sum().reset_index())
+        self.cells, self.tables = cells, tables
+        return self
+
+    def update(self, chunk):
+        return self.merge(SketchCube.build(chunk, list(self.tables), self.dimensions, self.alpha))
+
+    def sketches(self, column, by=None, equals=None, time_range=None):
+        """Словник {значення by: QuantileSketch} для вибірки (by=None - один скетч з ключем None)."""
+        selected = select_cells(self.cells, self.dimensions, equals, time_range)
+        table = self.tables[column]
+        rows = table[np.isin(table['cell'].to_numpy(), selected.index.to_numpy())]
+        if by is None:
+            group_codes, groups = np.zeros(len(rows), dtype=np.int64), [None]
+        else:
+            codes, groups = pd.factorize(selected[by], sort=True)
+            lookup = np.full(len(self.cells), -1, dtype=np.int64)
+            lookup[selected.index.to_numpy()] = codes
+            group_codes = lookup[rows['cell'].to_numpy()]
+
+        # Сортуємо за (група, бакет) і ріжемо на групи
+        keys = rows['key'].to_numpy(dtype=np.int64)
+        packed, counts = _sum_by_key(group_codes * _KEY_SPAN + keys + _KEY_OFFSET, rows['count'].to_numpy())
+        group_of = packed // _KEY_SPAN
+        bounds = np.searchsorted(group_of, np.arange(len(groups) + 1))
+        return {
+            group: QuantileSketch(packed[lo:hi] % _KEY_SPAN - _KEY_OFFSET, counts[lo:hi], self.alpha)
+            for group, lo, hi in zip(groups, bounds[:-1], bounds[1:])
+        }
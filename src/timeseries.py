@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+
+from src.config import TIMESERIES_MAX_BINS
+
+# Крок кожного рівня в хвилинах; кожен рівень ділиться на попередній без остачі
+RESOLUTIONS = {'1min': 1, '5min': 5, '1h': 60, '1d': 1440}
+_NAT = np.iinfo(np.int64).min
+
+
+def _coarsen(ids, table, factor):
+    # Сумуємо рядки, що потрапляють в один бін наступного рівня; ids відсортовані й різні
+    if len(ids) == 0:
+        return ids, table
+    ids = ids // factor
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    return ids[starts], np.add.reduceat(table, starts, axis=0)
+
+
+class TimeSeriesEngine:
+    """Часові ряди кількості з'єднань і сум метрик на кількох роздільностях.
+
+    Кожне з'єднання один раз відноситься до хвилинного біна (ціле число хвилин від
+    початку першої доби). Зберігаються лише зайняті хвилини (np.unique), тож одна далека
+    мітка часу не роздуває таблицю на десятиліття. Хвилинна таблиця рахується одним
+    bincount, 5min/1h/1d отримуються підсумовуванням рядків попереднього рівня, а нулями між
+    зайнятими бінами ряд заповнюється лише на запитаній роздільності (до TIMESERIES_MAX_BINS).
+    """
+
+    def __init__(self, df, time_column='start_time'):
+        self.df = df
+        times = df[time_column].to_numpy(dtype='datetime64[ns]').view('int64')
+        valid = times != _NAT
+        minutes = times[valid] // 60_000_000_000
+        # Початок вирівнюємо на добу, щоб межі всіх рівнів збігалися з floor() у pandas
+        self.origin = (int(minutes.min()) // 1440) * 1440 if len(minutes) else 0
+        # Зайняті хвилини (від origin) і номер зайнятої хвилини для кожного рядка
+        self.minutes, inverse = np.unique(minutes - self.origin, return_inverse=True)
+        self.bins = np.full(len(times), -1, dtype=np.int64)
+        self.bins[valid] = inverse.reshape(-1)
+        self._codes = {}
+        self._levels = {}
+
+    def _split(self, by):
+        if by not in self._codes:
+            codes, uniques = pd.factorize(self.df[by], sort=True)
+            self._codes[by] = (codes, uniques)
+        return self._codes[by]
+
+    def _minute_table(self, by, measure, rows):
+        bins = self.bins if rows is None else self.bins[rows]
+        if by is None:
+            codes, uniques = np.zeros(len(bins), dtype=np.intp), [measure or 'count']
+        else:
+            codes, uniques = self._split(by)
+            codes = codes if rows is None else codes[rows]
+        weights = None
+        if measure is not None:
+            weights = self.df[measure].to_numpy(dtype='float64')
+            weights = np.nan_to_num(weights if rows is None else weights[rows])
+        valid = (bins >= 0) & (codes >= 0)
+        groups = len(uniques)
+        flat = bins[valid] * groups + codes[valid]
+        table = np.bincount(flat, weights=None if weights is None else weights[valid],
+                            minlength=len(self.minutes) * groups)
+        return table.reshape(len(self.minutes), groups), uniques
+
+    def _build_levels(self, by, measure, rows):
+        table, uniques = self._minute_table(by, measure, rows)
+        ids = self.minutes
+        levels = {}
+        previous_step = None
+        for name, step in RESOLUTIONS.items():
+            if previous_step is not None:
+                ids, table = _coarsen(ids, table, step // previous_step)
+            levels[name] = (ids, table)
+            previous_step = step
+        return levels, uniques
+
+    def series(self, resolution='5min', by=None, measure=None, rows=None):
+        """Кадр з індексом 'time' і колонкою на кожне значення by (або одна колонка).
+
+        measure=None рахує з'єднання, інакше сумує колонку measure; rows - необов'язкові
+        номери рядків (наприклад, із FilterIndex.select) для підмножини.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if rows is None:
+            # Рівні для всього датасету будуються один раз на (by, measure)
+            key = (by, measure)
+            if key not in self._levels:
+                self._levels[key] = self._build_levels(by, measure, None)
+            levels, uniques = self._levels[key]
+        else:
+            levels, uniques = self._build_levels(by, measure, rows)
+
+        ids, table = levels[resolution]
+        # Відкидаємо порожні біни на краях діапазону, внутрішні нулі лишаються
+        nonzero = np.flatnonzero(table.any(axis=1))
+        if len(nonzero) == 0:
+            ids, table = ids[:0], table[:0]
+        else:
+            ids, table = ids[nonzero[0]:nonzero[-1] + 1], table[nonzero[0]:nonzero[-1] + 1]
+        if len(ids) and ids[-1] - ids[0] < TIMESERIES_MAX_BINS:
+            dense = np.zeros((ids[-1] - ids[0] + 1, table.shape[1]), dtype=table.dtype)
+            dense[ids - ids[0]] = table
+            ids, table = np.arange(ids[0], ids[-1] + 1), dense
+        step = RESOLUTIONS[resolution]
+        index = pd.to_datetime((self.origin + ids.astype(np.int64) * step) * 60, unit='s')
+        frame = pd.DataFrame(table, index=pd.Index(index, name='time'), columns=list(uniques))
+        if measure is None:
+            frame = frame.astype('int64')
+        return frame
@@ -0,0 +1,44 @@
+import json
+import os
+
+import dataset
+from src.batch_runner import run, artifact_dir, load_artifact, source_stamp, MANIFEST
+
+
+def _write_inputs(tmp_path, rows=(1500, 2500)):
+    # Два шарди з однаковим іменем у різних каталогах, як у виводі dataset.py
+    paths = []
+    for i, n_rows in enumerate(rows):
+        path = str(tmp_path / f"gen{i}" / "part-00000.csv")
+        dataset.write_frame(dataset.generate_dataset(n_rows, seed=i), path, 'csv')
+        paths.append(path)
+    return paths
+
+
+def test_same_named_inputs_get_separate_artifacts(tmp_path):
+    paths = _write_inputs(tmp_path)
+    root = str(tmp_path / "artifacts")
+
+    results, _ = run(paths, root=root, workers=2)
+
+    directories = [result['artifacts'] for result in results]
+    assert len(set(directories)) == 2
+    for path, result in zip(paths, results):
+        assert result['artifacts'] == artifact_dir(path, root)
+        with open(os.path.join(result['artifacts'], MANIFEST), encoding='utf-8') as f:
+            assert json.load(f)['source'] == source_stamp(path)
+        cube = load_artifact(path, 'cube', root=root)
+        assert int(cube.cells['count'].sum()) == result['rows']
+    assert not [name for name in os.listdir(root) if name not in map(os.path.basename, directories)]
+
+
+def test_merge_keeps_per_file_structures(tmp_path):
+    paths = _write_inputs(tmp_path)
+    root = str(tmp_path / "artifacts")
+
+    results, merged = run(paths, root=root, workers=1, merge_name='all')
+
+    for result in results:
+        assert int(result['structures']['cube'].cells['count'].sum()) == result['rows']
+    with open(os.path.join(merged, 'summary.json'), encoding='utf-8') as f:
+        assert json.load(f)['sessions'] == sum(result['rows'] for result in results)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from src.ddos_detector import StreamingDDoSDetector
+from src.ip_utils import ipv4_to_int
+
+
+def _flood(start, rows, target='10.0.0.1'):
+    # Багато джерел до однієї цілі протягом кількох секунд
+    sources, _ = ipv4_to_int(pd.Series([f"172.16.{i // 256}.{i % 256}" for i in range(rows)]))
+    return pd.DataFrame({
+        'start_time': pd.Timestamp(start) + pd.to_timedelta(np.arange(rows) % 60, unit='s'),
+        'src_ip': sources,
+        'dst_ip': np.full(rows, ipv4_to_int(pd.Series([target]))[0][0], dtype=np.uint32),
+        'spkts': np.full(rows, 10, dtype=np.uint32),
+    })
+
+
+def test_streaming_alerts_keep_ip_dtype():
+    detector = StreamingDDoSDetector(max_flows=100, max_sources=50)
+    detector.update(_flood('2026-01-01 00:00', 300))
+    detector.update(_flood('2026-01-01 01:00', 10))
+
+    alerts = detector.flush()
+
+    assert not alerts.empty
+    assert alerts['dst_ip'].dtype == np.uint32
+    assert ipv4_to_int(pd.Series(['10.0.0.1']))[0][0] in alerts['dst_ip'].tolist()
@@ -0,0 +1,20 @@
+import dataset
+from src.heavy_hitters import TalkerSketches
+from src.live_tail import LiveTail
+
+
+def test_rewritten_file_is_not_counted_twice(tmp_path):
+    path = str(tmp_path / "capture.csv")
+    dataset.write_frame(dataset.generate_dataset(3000, seed=1), path, 'csv')
+    tail = LiveTail(path, consumers={'talkers': TalkerSketches})
+    first = tail.poll()
+    assert 0 < first <= 3000
+    assert tail.aggregates.rows == first
+
+    # Файл перезаписано коротшим: агрегати мають відповідати лише новому вмісту
+    dataset.write_frame(dataset.generate_dataset(1000, seed=2), path, 'csv')
+    second = tail.poll()
+
+    assert 0 < second <= 1000
+    assert tail.aggregates.rows == second
+    assert tail.consumers['talkers'].sketches[('src_ip', 'flows')].total == second